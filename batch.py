@@ -0,0 +1,81 @@
+import sys
+import time
+
+from commands import CommandExecutor
+from profiler import cprofile_to
+
+class BatchRunner:
+    """Выполняет команды без GUI: напрямую через CommandExecutor."""
+
+    def __init__(self, vfs, logger, output=None, stop_on_error=False, profiler=None, profile_path=None,
+                 echo=True):
+        self.vfs = vfs
+        self.logger = logger
+        self.executor = CommandExecutor(vfs, logger, profiler=profiler)
+        # Файл для статистики cProfile по каждому запуску скрипта
+        self.profile_path = profile_path
+        self.output = output if output is not None else sys.stdout
+        self.stop_on_error = stop_on_error
+        # Печатать ли "$ команда" перед выводом и пустую строку после него
+        self.echo = echo
+        
+        self.commands_run = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        
+    def run_lines(self, lines):
+        start = time.perf_counter()
+        try:
+            with cprofile_to(self.profile_path):
+                self._run_lines(lines)
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self.output.flush()
+        return self.exit_status()
+        
+    def _run_lines(self, lines):
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+                
+            if not self.execute_line(line) and self.stop_on_error:
+                break
+            if self.executor.exit_requested:
+                break
+                
+    def run_script(self, script_path):
+        with open(script_path, 'r', encoding='utf-8') as f:
+            return self.run_lines(f)
+            
+    def execute_line(self, line):
+        if self.echo:
+            self.output.write(f"$ {line}\n")
+        self.commands_run += 1
+        
+        written = False
+        for chunk in self.executor.execute_line_iter(line):
+            if chunk:
+                self.output.write(chunk)
+                written = True
+        if written:
+            self.output.write("\n")
+        if self.echo:
+            self.output.write("\n")
+        
+        if not self.executor.last_success:
+            self.errors += 1
+            return False
+        return True
+        
+    def exit_status(self):
+        return 1 if self.errors else 0
+        
+    def report(self, stream=None):
+        stream = stream if stream is not None else sys.stderr
+        rate = self.commands_run / self.elapsed if self.elapsed > 0 else 0.0
+        stream.write(
+            f"{self.commands_run} commands, {self.errors} errors, "
+            f"{self.elapsed:.3f}s ({rate:.0f} commands/sec), "
+            f"exit status {self.exit_status()}\n"
+        )
@@ -1,81 +1,328 @@
+import itertools
 import os
+import re
+import time
 from datetime import datetime
 
+from parser import CommandParser, GlobWord, Pipeline
+from registry import CommandRegistry
+
+# Встроенные команды; каждый CommandExecutor работает с копией, в которую
+# плагины могут добавлять свои команды
+BUILTINS = CommandRegistry()
+builtin = BUILTINS.command
+
+NUMBER_PREFIX = re.compile(r'\s*-?\d+(\.\d+)?')
+
+# Условия find -> аргумент VFS.find
+FIND_TESTS = {"-name": "name", "-owner": "owner", "-type": "node_type", "-perm": "permissions"}
+
+def count(value):
+    """Неотрицательное целое для опций вида --limit N"""
+    number = int(value)
+    if number < 0:
+        raise ValueError(value)
+    return number
+
 class CommandExecutor:
-    def __init__(self, vfs, logger):
+    OUTPUT_CHUNK_LINES = 1000
+    LS_LINE_WIDTH = 80
+    
+    def __init__(self, vfs, logger, registry=None, profiler=None):
         self.vfs = vfs
         self.logger = logger
+        self.registry = registry if registry is not None else BUILTINS.copy()
+        # Профилировщик (profiler.Profiler) или None, если замеры выключены
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(vfs)
+        self.parser = CommandParser()
+        self.last_success = True
+        self.exit_requested = False
+        # Выполняемая строка верхнего уровня и ее номер в логе
+        self.current_line = None
+        self.line_number = None
         
     def execute(self, command, args):
+        return "".join(self.execute_iter(command, args))
+        
+    def execute_line(self, line):
+        return "".join(self.execute_line_iter(line))
+        
+    def execute_iter(self, command, args, chunk_lines=None):
+        """Выполняет команду и отдает вывод блоками строк по мере готовности.
+
+        Обработчик может вернуть строку или итератор строк; склеенные блоки
+        совпадают с результатом execute.
+        """
+        pipeline = Pipeline()
+        pipeline.stages.append((command, args))
+        return self.execute_pipeline(pipeline, chunk_lines)
+        
+    def execute_line_iter(self, line, chunk_lines=None):
+        """Выполняет строку с конвейерами, перенаправлением, ; и &&"""
+        # Каждое событие лога хранит строку верхнего уровня, из которой оно
+        # получено (вложенные $(...) относятся к ней же) - по ним сеанс воспроизводится
+        top_level = self.current_line is None
+        if top_level:
+            # Номер выдает логгер: у сессий сервера с общим логом номера не совпадают
+            self.line_number = self.logger.next_line_number()
+            self.current_line = line
         try:
-            if command == "exit":
-                result = "Exiting VFS emulator"
-            elif command == "ls":
-                result = self._ls(args)
-            elif command == "cd":
-                result = self._cd(args)
-            elif command == "date":
-                result = self._date(args)
-            elif command == "du":
-                result = self._du(args)
-            elif command == "pwd":
-                result = self._pwd(args)
-            elif command == "echo":
-                result = self._echo(args)
-            elif command == "chown":
-                result = self._chown(args)
-            elif command == "mv":
-                result = self._mv(args)
-            elif command == "help":
-                result = self._help(args)
-            else:
-                raise ValueError(f"Unknown command: {command}")
+            try:
+                sequence = self.parser.parse_line(line)
+            except ValueError as e:
+                self.last_success = False
+                yield f"Error: {str(e)}"
+                return
                 
-            self.logger.log_command(command, args, success=True)
-            return result
+            emitted = False
+            for connector, pipeline in sequence:
+                if connector == "&&" and not self.last_success:
+                    continue
+                if self.exit_requested:
+                    break
+                first = True
+                for chunk in self._run_pipeline(pipeline, chunk_lines):
+                    if not chunk:
+                        continue
+                    # Вывод команд, разделенных ; и &&, идет с новой строки
+                    if first and emitted:
+                        yield "\n"
+                    first = False
+                    emitted = True
+                    yield chunk
+        finally:
+            if top_level:
+                self.current_line = None
+                self.line_number = None
+                    
+    def _run_pipeline(self, pipeline, chunk_lines=None):
+        """Выполняет конвейер строки, сначала раскрывая его $(...).
+
+        Подстановка идет после предыдущих команд строки и пропускается вместе
+        с конвейером, если его отменил &&.
+        """
+        if "$(" in pipeline.text:
+            try:
+                pipeline = self.parser.parse_pipeline(pipeline.text, substitute=self._substitute)
+            except ValueError as e:
+                self.last_success = False
+                yield f"Error: {str(e)}"
+                return
+        yield from self.execute_pipeline(pipeline, chunk_lines)
+        
+    def execute_pipeline(self, pipeline, chunk_lines=None):
+        chunk_lines = chunk_lines or self.OUTPUT_CHUNK_LINES
+        emitted = False
+        try:
+            lines = None
+            last = len(pipeline.stages) - 1
+            for index, (command, args) in enumerate(pipeline.stages):
+                piped = index < last or pipeline.redirect is not None
+                lines = self._run_stage(command, args, lines, piped)
+                
+            if pipeline.redirect is not None:
+                operator, path = pipeline.redirect
+                text = "".join(line + "\n" for line in lines)
+                self.vfs.write_file(path, text, append=(operator == ">>"))
+                lines = ()
+                
+            chunk = []
+            for line in lines:
+                chunk.append(line)
+                if len(chunk) >= chunk_lines:
+                    yield ("\n" if emitted else "") + "\n".join(chunk)
+                    emitted = True
+                    chunk = []
+            if chunk:
+                yield ("\n" if emitted else "") + "\n".join(chunk)
+                
+            self.last_success = True
             
         except Exception as e:
-            self.logger.log_command(command, args, success=False, message=str(e))
-            return f"Error: {str(e)}"
+            self.last_success = False
+            yield ("\n" if emitted else "") + f"Error: {str(e)}"
             
-    def _ls(self, args):
-        detailed = '-l' in args or '-la' in args
-        show_all = '-a' in args or '-la' in args
+    def _run_stage(self, command, args, input, piped):
+        """Одна команда конвейера как ленивый генератор строк; пишет событие в лог.
+
+        Длительность команды - от запуска до завершения, включая чтение ее
+        вывода следующими командами конвейера.
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time() if self.profiler is not None else 0.0
+        try:
+            handler = self.registry.get(command)
+            if handler is None:
+                raise ValueError(f"Unknown command: {command}")
+            # В лог попадают аргументы как набраны, без раскрытых шаблонов
+            result = handler(self, self._expand_globs(args), input, piped)
+            if isinstance(result, str):
+                result = result.split("\n")
+            for line in result:
+                yield line
+        except GeneratorExit:
+            # Следующая команда конвейера прочитала все, что ей было нужно (head)
+            self._close_input(input)
+            self._finish_stage(command, args, wall_start, cpu_start, True)
+            raise
+        except Exception as e:
+            self._finish_stage(command, args, wall_start, cpu_start, False, str(e))
+            raise
+        # Предыдущие команды конвейера завершаются и попадают в лог раньше этой
+        self._close_input(input)
+        self._finish_stage(command, args, wall_start, cpu_start, True)
+        
+    def _expand_globs(self, args):
+        """Раскрывает шаблоны * ? [...] по путям VFS; без совпадений слово остается как есть"""
+        if not any(isinstance(arg, GlobWord) for arg in args):
+            return args
+        expanded = []
+        for arg in args:
+            if isinstance(arg, GlobWord):
+                expanded.extend(self.vfs.glob(arg.pattern) or [str(arg)])
+            else:
+                expanded.append(arg)
+        return expanded
         
-        # Фильтруем путь из аргументов
-        path_args = [arg for arg in args if not arg.startswith('-')]
-        path = path_args[0] if path_args else "."
+    def _finish_stage(self, command, args, wall_start, cpu_start, success, message=""):
+        duration = time.perf_counter() - wall_start
+        if self.profiler is not None and command in self.registry:
+            self.profiler.record(command, duration, time.thread_time() - cpu_start)
+        self.logger.log_command(command, args, success=success, message=message, duration=duration,
+                                line=self.current_line,
+                                line_number=self.line_number)
         
-        items = self.vfs.list_directory(path)
-        if items is None:
-            raise ValueError(f"Directory not found: {path}")
+    def _close_input(self, input):
+        close = getattr(input, "close", None)
+        if close is not None:
+            close()
+        
+    def line_mutates(self, line):
+        """Может ли строка изменить дерево VFS (проверка без выполнения $(...))"""
+        if "$(" in line:
+            return True
+        try:
+            tokens = self.parser.tokenize(line)
+        except ValueError:
+            return False
             
-        if not items:
-            return ""
+        command_position = True
+        for token, is_operator in tokens:
+            if is_operator:
+                if token in (">", ">>"):
+                    return True
+                command_position = True
+            elif command_position:
+                command = self.registry.get(token.lower())
+                if command is not None and command.mutates:
+                    return True
+                command_position = False
+        return False
+        
+    def _substitute(self, line):
+        """Вывод команды для подстановки $(...)"""
+        output = "".join(self.execute_line_iter(line))
+        if not self.last_success:
+            raise ValueError(f"Command substitution failed: {line}")
+        return output
+        
+    @builtin("ls", usage="ls [OPTIONS] [PATH...]", help="List directory contents (sorted by name)",
+             flags="laR", options={"--limit": count, "--offset": count},
+             option_help=[
+                 ("ls -l", "Detailed listing"),
+                 ("ls -a", "Show hidden files"),
+                 ("ls -la", "Detailed listing with hidden files"),
+                 ("ls -R", "List subdirectories recursively"),
+                 ("ls --limit N", "Show at most N entries per directory"),
+                 ("ls --offset N", "Skip the first N entries"),
+             ],
+             examples=[("ls -la", "Detailed listing with hidden files"),
+                       ("ls /home/user/*", "List files and directories matching a pattern")])
+    def _ls(self, args):
+        files = []
+        dirs = []
+        for path in args or ["."]:
+            node = self.vfs.current_dir if path == "." else self.vfs._find_node(path)
+            if node is None:
+                raise ValueError(f"Directory not found: {path}")
+            (files if node.is_file else dirs).append((path, node))
             
-        if detailed:
-            result = []
-            # Добавляем текущую и родительскую директории для -a
-            if show_all:
-                result.append(f"drwxr-xr-x {self.vfs.current_dir.owner:>8} {0:>8} .")
-                if self.vfs.current_dir.parent:
-                    result.append(f"drwxr-xr-x {self.vfs.current_dir.parent.owner:>8} {0:>8} ..")
+        return self._ls_operands(files, dirs, 'l' in args.flags, 'a' in args.flags, 'R' in args.flags,
+                                 args.options['offset'] or 0, args.options['limit'], args.piped)
+        
+    def _ls_operands(self, files, dirs, detailed, show_all, recursive, offset, limit, one_per_line):
+        """Листинг аргументов ls: файлы под путем, как он указан, затем директории.
+
+        При нескольких аргументах у каждой директории есть заголовок "путь:".
+        """
+        yield from self._ls_entries(files, detailed, one_per_line)
+        headers = len(files) + len(dirs) > 1
+        for index, (path, node) in enumerate(dirs):
+            if files or index:
+                yield ""
+            yield from self._ls_lines(node, path, detailed, show_all, recursive, offset, limit, one_per_line,
+                                      headers)
+        
+    def _ls_entries(self, entries, detailed, one_per_line):
+        """Строки листинга для пар (имя, узел)"""
+        line = []
+        width = 0
+        for name, child in entries:
+            if detailed:
+                type_char = '-' if child.is_file else 'd'
+                size = child.size if child.is_file else 0
+                yield f"{type_char}{child.permissions} {child.owner:>8} {size:>8} {name}"
+            elif one_per_line:
+                # В конвейер и в файл - по одному имени в строке, как у ls без терминала
+                yield name
+            else:
+                # Краткий формат: имена через пробел, перенос по ширине строки
+                if line and width + 1 + len(name) > self.LS_LINE_WIDTH:
+                    yield " ".join(line)
+                    line = []
+                    width = 0
+                width += len(name) + (1 if line else 0)
+                line.append(name)
+        if line:
+            yield " ".join(line)
+        
+    def _ls_lines(self, target_dir, path, detailed, show_all, recursive, offset, limit, one_per_line=False,
+                  header=False):
+        stack = [(path, target_dir)]
+        first = True
+        while stack:
+            dir_path, node = stack.pop()
+            if recursive or header:
+                if not first:
+                    yield ""
+                yield f"{dir_path}:"
+            first = False
             
-            for item in items:
-                if not show_all and item['name'].startswith('.'):
-                    continue
-                perm = item['permissions']
-                owner = item['owner']
-                size = item['size']
-                name = item['name']
-                type_char = '-' if item['type'] == 'file' else 'd'
-                result.append(f"{type_char}{perm} {owner:>8} {size:>8} {name}")
-            return "\n".join(result)
-        else:
-            names = [item['name'] for item in items 
-                    if show_all or not item['name'].startswith('.')]
-            return " ".join(names)
+            # Добавляем текущую и родительскую директории для -a
+            if detailed and show_all:
+                yield f"drwxr-xr-x {node.owner:>8} {0:>8} ."
+                if node.parent:
+                    yield f"drwxr-xr-x {node.parent.owner:>8} {0:>8} .."
+                    
+            subdirs = []
             
+            def entries(children):
+                for child in children:
+                    if recursive and not child.is_file:
+                        subdirs.append(child)
+                    yield child.name, child
+                    
+            yield from self._ls_entries(entries(self.vfs.iter_children(node, offset, limit, show_all)),
+                                        detailed, one_per_line)
+                
+            prefix = dir_path.rstrip("/")
+            for child in reversed(subdirs):
+                stack.append((f"{prefix}/{child.name}", child))
+                
+    @builtin("cd", usage="cd [PATH]", help="Change directory", max_args=1,
+             examples=[("cd /home/user", "Change to absolute path")])
     def _cd(self, args):
         if not args:
             path = "/"
@@ -87,12 +334,17 @@ class CommandExecutor:
         else:
             raise ValueError(f"Directory not found: {path}")
             
+    @builtin("date", usage="date [FORMAT]", help="Show current date and time", raw=True,
+             examples=[('date "+%Y-%m-%d"', "Custom date format")])
     def _date(self, args):
         format_str = args[0] if args else "%Y-%m-%d %H:%M:%S"
         return datetime.now().strftime(format_str)
         
+    @builtin("du", usage="du [--verify] [PATH]", help="Show disk usage",
+             options={"--verify": None}, max_args=1)
     def _du(self, args):
-        path = args[0] if args else "."
+        verify = args.options['verify']
+        path = args.get(0, ".")
         target_node = self.vfs._find_node(path) if path != "." else self.vfs.current_dir
         
         if not target_node:
@@ -100,7 +352,14 @@ class CommandExecutor:
             
         total_size = self.vfs.calculate_size(target_node)
         human_readable = self._human_readable_size(total_size)
-        return f"{total_size}\t{path}\t({human_readable})"
+        result = f"{total_size}\t{path}\t({human_readable})"
+        
+        if verify:
+            if not self.vfs.verify_aggregates(target_node):
+                size = self.vfs.compute_aggregates(target_node)[0]
+                raise ValueError(f"Cached size mismatch for {path}: cached {total_size}, actual {size}")
+            result += f"\n{target_node.file_count} files, {target_node.dir_count} directories (verified)"
+        return result
         
     def _human_readable_size(self, size):
         for unit in ['B', 'K', 'M', 'G']:
@@ -109,84 +368,351 @@ class CommandExecutor:
             size /= 1024.0
         return f"{size:.1f}T"
         
+    @builtin("pwd", help="Print working directory", max_args=0)
     def _pwd(self, args):
         return self.vfs.current_dir.get_path()
         
+    @builtin("echo", usage="echo [TEXT]", help="Display text", raw=True)
     def _echo(self, args):
         return " ".join(args)
         
+    @builtin("chown", usage="chown [-R] OWNER PATH...", help="Change file owner", flags="R", min_args=2,
+             mutates=True,
+             option_help=[("chown -R", "Change owner of directories and their contents")],
+             examples=[("chown user file.txt", "Change owner"),
+                       ("chown -R bob /home/user", "Change owner of a whole tree")])
     def _chown(self, args):
-        if len(args) < 2:
-            raise ValueError("Usage: chown OWNER FILE")
-            
         owner = args[0]
-        path = args[1]
+        paths = args.positional[1:]
+        nodes = self._existing_nodes(paths, "File not found")
         
-        node = self.vfs._find_node(path)
-        if not node:
-            raise ValueError(f"File not found: {path}")
+        recursive = 'R' in args.flags
+        if len(nodes) == 1 and not recursive:
+            old_owner = nodes[0].owner
+            self.vfs.set_owner(nodes[0], owner)
+            return f"Changed owner of {paths[0]} from {old_owner} to {owner}"
             
-        old_owner = node.owner
-        node.owner = owner
-        return f"Changed owner of {path} from {old_owner} to {owner}"
+        changed = sum(self.vfs.set_owner(node, owner, recursive) for node in nodes)
+        return f"Changed owner of {changed} nodes to {owner}"
+        
+    def _existing_nodes(self, paths, message):
+        """Узлы по путям; ошибка до каких-либо изменений, если путь не найден"""
+        nodes = []
+        for path in paths:
+            node = self.vfs._find_node(path)
+            if node is None:
+                raise ValueError(f"{message}: {path}")
+            nodes.append(node)
+        return nodes
         
+    def _destinations(self, sources, dest_path, verb):
+        """Пары (узел, каталог назначения, имя) для mv и cp с проверкой всех пар заранее.
+
+        Если DEST - существующий каталог, источники попадают в него под своими
+        именами; иначе источник должен быть один, и DEST - его новый путь.
+        """
+        nodes = self._existing_nodes(sources, "Source not found")
+        dest = self.vfs._find_node(dest_path)
+        if dest is not None and not dest.is_file:
+            targets = [(node, dest, node.name) for node in nodes]
+        elif len(nodes) > 1:
+            raise ValueError(f"Target is not a directory: {dest_path}")
+        else:
+            dest_parent, dest_name = self.vfs.split_path(dest_path)
+            if not dest_parent or dest_parent.is_file or dest_name in ("", ".", ".."):
+                raise ValueError(f"Invalid destination: {dest_path}")
+            targets = [(nodes[0], dest_parent, dest_name)]
+            
+        names = set()
+        for (node, parent, name), source in zip(targets, sources):
+            if node.parent is None:
+                raise ValueError(f"Cannot {verb} root directory")
+            if name in parent.children or name in names:
+                raise ValueError(f"Destination already exists: {parent.get_path().rstrip('/')}/{name}")
+            names.add(name)
+            ancestor = parent
+            while ancestor:
+                if ancestor is node:
+                    raise ValueError(f"Cannot {verb} {source} into itself")
+                ancestor = ancestor.parent
+        return targets
+        
+    @builtin("mv", usage="mv SOURCE... DEST", help="Move or rename files", min_args=2, mutates=True,
+             examples=[("mv old.txt new.txt", "Rename file"),
+                       ("mv *.txt docs", "Move files into a directory")])
     def _mv(self, args):
-        if len(args) < 2:
-            raise ValueError("Usage: mv SOURCE DEST")
+        sources = args.positional[:-1]
+        dest_path = args[-1]
+        targets = self._destinations(sources, dest_path, "move")
+        for node, parent, name in targets:
+            self.vfs.move_node(node, parent, name)
             
-        source_path = args[0]
-        dest_path = args[1]
+        if len(targets) == 1:
+            return f"Moved {sources[0]} to {dest_path}"
+        return f"Moved {len(targets)} items to {dest_path}"
         
-        source_node = self.vfs._find_node(source_path)
-        if not source_node:
-            raise ValueError(f"Source not found: {source_path}")
+    @builtin("cp", usage="cp [-r] SOURCE... DEST", help="Copy files and directories", flags="rR", min_args=2,
+             mutates=True,
+             option_help=[("cp -r", "Copy directories recursively")],
+             examples=[("cp -r /home/user /home/backup", "Copy a directory tree")])
+    def _cp(self, args):
+        sources = args.positional[:-1]
+        dest_path = args[-1]
+        recursive = bool(args.flags & {'r', 'R'})
+        
+        dest = self.vfs._find_node(dest_path)
+        if len(sources) == 1 and dest is not None and dest.is_file:
+            # Файл поверх существующего файла - перезапись содержимого
+            source = self._existing_nodes(sources, "Source not found")[0]
+            if not source.is_file:
+                raise ValueError(f"Cannot overwrite non-directory {dest_path} with directory {sources[0]}")
+            if source is not dest:
+                self.vfs.write_file(dest_path, source.data)
+            return f"Copied {sources[0]} to {dest_path}"
             
-        source_parent = source_node.parent
-        source_name = source_node.name
+        targets = self._destinations(sources, dest_path, "copy")
+        for (node, _, _), source in zip(targets, sources):
+            if not node.is_file and not recursive:
+                raise ValueError(f"-r not specified; omitting directory {source}")
+                
+        copied = 0
+        for node, parent, name in targets:
+            _, files, dirs = self.vfs.copy_node(node, parent, name)._subtree_counts()
+            copied += files + dirs
+            
+        if len(targets) == 1:
+            return f"Copied {sources[0]} to {dest_path}"
+        return f"Copied {len(targets)} items ({copied} nodes) to {dest_path}"
         
-        if "/" in dest_path:
-            dest_parts = dest_path.rstrip("/").split("/")
-            dest_name = dest_parts[-1]
-            dest_parent_path = "/".join(dest_parts[:-1]) if len(dest_parts) > 1 else "/"
-            dest_parent = self.vfs._find_node(dest_parent_path)
-        else:
-            dest_name = dest_path
-            dest_parent = self.vfs.current_dir
+    @builtin("rm", usage="rm [-r] PATH...", help="Remove files and directories", flags="rRf", min_args=1,
+             mutates=True,
+             option_help=[("rm -r", "Remove directories and their contents"),
+                          ("rm -f", "Ignore missing paths")],
+             examples=[("rm -r /tmp/build", "Remove a directory tree")])
+    def _rm(self, args):
+        recursive = bool(args.flags & {'r', 'R'})
+        paths = list(args)
+        if 'f' in args.flags:
+            paths = [path for path in paths if self.vfs._find_node(path) is not None]
+        nodes = self._existing_nodes(paths, "No such file or directory")
+        for node, path in zip(nodes, paths):
+            if node.parent is None:
+                raise ValueError("Cannot remove root directory")
+            if not node.is_file and not recursive:
+                raise ValueError(f"Is a directory: {path}")
+                
+        removed = 0
+        for node in nodes:
+            # Узел мог быть удален вместе с указанным раньше предком
+            if not self._attached(node):
+                continue
+            _, files, dirs = node._subtree_counts()
+            removed += files + dirs
+            self.vfs.remove_node(node)
+        if len(nodes) == 1 and nodes[0].is_file:
+            return f"Removed {paths[0]}"
+        return f"Removed {removed} nodes"
+        
+    def _attached(self, node):
+        while node.parent is not None:
+            node = node.parent
+        return node is self.vfs.root
+        
+    @builtin("find", usage="find [PATH] [TESTS]", help="Search for files and directories", raw=True,
+             option_help=[
+                 ("find -name GLOB", "Name matches a shell pattern"),
+                 ("find -owner USER", "Owned by USER"),
+                 ("find -type f|d", "Files or directories only"),
+                 ("find -perm PERM", "Exact permissions (rw-r--r-- or 644)"),
+             ],
+             examples=[("find / -name '*.txt'", "All text files")])
+    def _find(self, args):
+        path = "."
+        tests = list(args)
+        if tests and not tests[0].startswith("-"):
+            path = tests.pop(0)
+            
+        filters = {}
+        for i in range(0, len(tests), 2):
+            test = tests[i]
+            if test not in FIND_TESTS:
+                raise ValueError(f"Unknown test: {test}")
+            if i + 1 >= len(tests):
+                raise ValueError(f"Missing argument to {test}")
+            filters[FIND_TESTS[test]] = tests[i + 1]
+            
+        if filters.get("node_type") not in (None, "f", "d"):
+            raise ValueError(f"Invalid type: {filters['node_type']} (expected f or d)")
+        if "permissions" in filters:
+            filters["permissions"] = self._symbolic_permissions(filters["permissions"])
+            
+        start = self.vfs.current_dir if path == "." else self.vfs._find_node(path)
+        if start is None:
+            raise ValueError(f"Path not found: {path}")
+        return (node.get_path() for node in self.vfs.find(start, **filters))
+        
+    def _symbolic_permissions(self, value):
+        """Права в виде rwxr-xr-x; восьмеричная запись (755) переводится"""
+        if len(value) == 3 and all(digit in "01234567" for digit in value):
+            return "".join(flag if int(digit) & bit else "-"
+                           for digit in value for flag, bit in (("r", 4), ("w", 2), ("x", 1)))
+        if len(value) != 9 or any(char not in "rwx-" for char in value):
+            raise ValueError(f"Invalid permissions: {value}")
+        return value
+        
+    @builtin("cat", usage="cat [FILE...]", help="Print files or standard input",
+             examples=[("cat notes.txt", "Print file contents")])
+    def _cat(self, args):
+        if not args and args.input is None:
+            raise ValueError("Usage: cat FILE...")
+        return self._input_lines(args, args.positional)
+        
+    @builtin("grep", usage="grep [-ivc] PATTERN [FILE...]", help="Print lines matching a regular expression",
+             flags="ivc", min_args=1,
+             option_help=[
+                 ("grep -i", "Ignore case"),
+                 ("grep -v", "Print non-matching lines"),
+                 ("grep -c", "Print only the number of matching lines"),
+             ],
+             examples=[("ls -R / | grep txt", "Filter command output")])
+    def _grep(self, args):
+        try:
+            pattern = re.compile(args[0], re.IGNORECASE if 'i' in args.flags else 0)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern: {e}")
+        invert = 'v' in args.flags
+        
+        lines = (line for line in self._input_lines(args, args.positional[1:])
+                 if bool(pattern.search(line)) != invert)
+        if 'c' in args.flags:
+            return str(sum(1 for _ in lines))
+        return lines
+        
+    @builtin("head", usage="head [-n] [N] [FILE...]", help="Print the first N lines (default 10)", flags="n",
+             examples=[("ls -R / | head 5", "First five lines of output")])
+    def _head(self, args):
+        paths = args.positional
+        limit = 10
+        if paths and (paths[0].isdigit() or 'n' in args.flags):
+            if not paths[0].isdigit():
+                raise ValueError(f"Invalid line count: {paths[0]}")
+            limit = int(paths[0])
+            paths = paths[1:]
+        return itertools.islice(self._input_lines(args, paths), limit)
+        
+    @builtin("wc", usage="wc [-lwc] [FILE...]", help="Count lines, words and characters", flags="lwc")
+    def _wc(self, args):
+        lines = words = chars = 0
+        for line in self._input_lines(args, args.positional):
+            lines += 1
+            words += len(line.split())
+            chars += len(line) + 1
             
-        if not dest_parent or dest_parent.is_file:
-            raise ValueError(f"Invalid destination: {dest_path}")
+        selected = args.flags or {'l', 'w', 'c'}
+        counts = [str(value) for flag, value in (('l', lines), ('w', words), ('c', chars)) if flag in selected]
+        return " ".join(counts)
+        
+    @builtin("sort", usage="sort [-rnu] [FILE...]", help="Sort lines", flags="rnu",
+             option_help=[
+                 ("sort -r", "Reverse order"),
+                 ("sort -n", "Compare by leading number"),
+                 ("sort -u", "Drop duplicate lines"),
+             ])
+    def _sort(self, args):
+        lines = self._input_lines(args, args.positional)
+        if 'u' in args.flags:
+            lines = set(lines)
+        key = self._numeric_key if 'n' in args.flags else None
+        return sorted(lines, key=key, reverse='r' in args.flags)
+        
+    def _numeric_key(self, line):
+        match = NUMBER_PREFIX.match(line)
+        return (float(match.group(0)) if match else 0.0, line)
+        
+    def _input_lines(self, args, paths):
+        """Строки из файлов VFS, а без файлов - со стандартного ввода"""
+        if paths:
+            return (line for path in paths for line in self._file_lines(path))
+        if args.input is None:
+            raise ValueError("No input")
+        return args.input
+        
+    def _file_lines(self, path):
+        node = self.vfs._find_node(path)
+        if node is None:
+            raise ValueError(f"File not found: {path}")
+        if not node.is_file:
+            raise ValueError(f"Is a directory: {path}")
+        return node.content.splitlines()
+        
+    @builtin("stats", usage="stats [--reset] [NAME]", help="Show latency percentiles of commands and VFS operations",
+             options={"--reset": None}, max_args=1,
+             option_help=[("stats --reset", "Clear collected samples")],
+             examples=[("stats vfs.", "Only internal VFS operations")])
+    def _stats(self, args):
+        if self.profiler is None:
+            raise ValueError("Profiling is disabled (start with --profile)")
+        if args.options['reset']:
+            self.profiler.reset()
+            return "Statistics cleared"
+        return self.profiler.report(args.get(0))
+        
+    @builtin("save", usage="save FILE", help="Save VFS to a binary snapshot", min_args=1, max_args=1,
+             host_files=True)
+    def _save(self, args):
+        saved = self.vfs.save_snapshot(args[0])
+        return f"Saved {saved} nodes to {args[0]}"
+        
+    @builtin("load", usage="load FILE", help="Load VFS from a snapshot or JSON image", min_args=1, max_args=1,
+             mutates=True, host_files=True)
+    def _load(self, args):
+        if not os.path.exists(args[0]):
+            raise ValueError(f"File not found: {args[0]}")
             
-        if dest_name in dest_parent.children:
-            raise ValueError(f"Destination already exists: {dest_path}")
+        self.vfs.load_image(args[0])
+        root = self.vfs.root
+        return f"Loaded {root.file_count + root.dir_count + 1} nodes from {args[0]}"
+        
+    @builtin("snapshot", usage="snapshot [-d] [NAME]", help="Checkpoint the VFS in memory (list without NAME)",
+             flags="d", max_args=1, mutates=True,
+             option_help=[("snapshot -d NAME", "Delete a checkpoint")],
+             examples=[("snapshot clean", "Checkpoint before changes")])
+    def _snapshot(self, args):
+        if not args:
+            if 'd' in args.flags:
+                raise ValueError("Usage: snapshot -d NAME")
+            snapshots = self.vfs.list_snapshots()
+            if not snapshots:
+                return "No snapshots"
+            return [f"{name}\t{changes} changes" for name, changes in snapshots]
             
-        del source_parent.children[source_name]
-        source_node.name = dest_name
-        dest_parent.add_child(source_node)
+        name = args[0]
+        if 'd' in args.flags:
+            self.vfs.delete_snapshot(name)
+            return f"Deleted snapshot {name}"
+        self.vfs.create_snapshot(name)
+        return f"Created snapshot {name}"
+        
+    @builtin("rollback", usage="rollback NAME", help="Undo all changes made after a snapshot",
+             min_args=1, max_args=1, mutates=True,
+             examples=[("rollback clean", "Return to the checkpoint")])
+    def _rollback(self, args):
+        undone = self.vfs.rollback(args[0])
+        return f"Rolled back to {args[0]} ({undone} changes undone)"
+        
+    @builtin("compact", help="Compact the change journal into a new snapshot", max_args=0, mutates=True,
+             host_files=True)
+    def _compact(self, args):
+        if self.vfs.journal is None:
+            raise ValueError("Journal is disabled (start with --journal)")
+        count, path = self.vfs.journal.compact(self.vfs)
+        return f"Compacted {count} operations into {path}"
         
-        return f"Moved {source_path} to {dest_path}"
+    @builtin("exit", help="Exit the emulator", raw=True)
+    def _exit(self, args):
+        self.exit_requested = True
+        return "Exiting VFS emulator"
         
+    @builtin("help", usage="help [COMMAND]", help="Show this help message", max_args=1)
     def _help(self, args):
-        help_text = """Available commands:
-ls [OPTIONS] [PATH]    - List directory contents
-cd [PATH]              - Change directory  
-pwd                    - Print working directory
-date [FORMAT]          - Show current date and time
-du [PATH]              - Show disk usage
-chown OWNER FILE       - Change file owner
-mv SOURCE DEST         - Move or rename files
-echo [TEXT]            - Display text
-exit                   - Exit the emulator
-help                   - Show this help message
-
-Options:
-ls -l                  - Detailed listing
-ls -a                  - Show hidden files
-ls -la                 - Detailed listing with hidden files
-
-Examples:
-ls -la                 # Detailed listing with hidden files
-cd /home/user          # Change to absolute path
-chown user file.txt    # Change owner
-mv old.txt new.txt     # Rename file
-date "+%Y-%m-%d"       # Custom date format"""
-        return help_text
\ No newline at end of file
+        return self.registry.help_text(args.get(0))
@@ -0,0 +1,197 @@
+import os
+from bisect import bisect_left
+
+# Слово после них - снова имя команды
+COMMAND_SEPARATORS = ("|", ";", "&&", "$(")
+# Символы, которые при вставке имени экранируются обратной косой чертой
+SPECIAL_CHARS = set(" \t'\"\\|;&<>$()*?[")
+# Верхняя граница для bisect: строки с префиксом p лежат в [p, p + MAX_CHAR)
+MAX_CHAR = "\U0010ffff"
+
+def prefix_range(names, prefix):
+    """Границы [lo, hi) имен с префиксом prefix в отсортированном списке: O(log n)"""
+    lo = bisect_left(names, prefix)
+    hi = bisect_left(names, prefix + MAX_CHAR, lo)
+    return lo, hi
+
+def common_prefix(first, last):
+    """Общий префикс отсортированного диапазона равен общему префиксу его крайних строк"""
+    length = min(len(first), len(last))
+    i = 0
+    while i < length and first[i] == last[i]:
+        i += 1
+    return first[:i]
+
+def escape(name):
+    return "".join("\\" + char if char in SPECIAL_CHARS else char for char in name)
+
+def unescape(word):
+    chars = []
+    i = 0
+    while i < len(word):
+        if word[i] == "\\" and i + 1 < len(word):
+            i += 1
+        chars.append(word[i])
+        i += 1
+    return "".join(chars)
+
+class Completion:
+    """Результат дополнения: слово в text[start:end] заменяется на replacement.
+
+    candidates - первые варианты по порядку имен (не больше Completer.LIMIT), total -
+    сколько их всего.
+    """
+
+    def __init__(self, start, end, replacement, candidates, total):
+        self.start = start
+        self.end = end
+        self.replacement = replacement
+        self.candidates = candidates
+        self.total = total
+
+    def apply(self, text):
+        return text[:self.start] + self.replacement + text[self.end:]
+
+class Completer:
+    """Дополнение имен команд и путей VFS по Tab.
+
+    Пути берутся из отсортированного индекса имен каталога (VFSNode.sorted_names),
+    который add_child/remove_child поддерживают при mv и создании файлов, поэтому
+    поиск по префиксу - двоичный, даже в каталоге со 100 тысячами записей.
+    """
+
+    LIMIT = 200
+
+    def __init__(self, vfs, registry):
+        self.vfs = vfs
+        self.registry = registry
+
+    def complete(self, text, cursor=None):
+        """Completion для слова перед курсором или None, если дополнять нечего"""
+        cursor = len(text) if cursor is None else cursor
+        start = cursor
+        while start > 0 and not (text[start - 1].isspace() and (start < 2 or text[start - 2] != "\\")):
+            start -= 1
+        # "$(cmd" без пробела: слово начинается после скобки
+        substitution = text.rfind("$(", start, cursor)
+        if substitution >= 0:
+            start = substitution + 2
+        word = text[start:cursor]
+        before = text[:start].rstrip()
+        if not before or before.endswith(COMMAND_SEPARATORS):
+            if "/" not in word:
+                return self._complete_command(word, start, cursor)
+        return self._complete_path(word, start, cursor)
+
+    def _complete_command(self, word, start, end):
+        names = sorted(self.registry.names())
+        lo, hi = prefix_range(names, word)
+        if lo == hi:
+            return None
+        if hi - lo == 1:
+            return Completion(start, end, names[lo] + " ", names[lo:hi], 1)
+        return Completion(start, end, common_prefix(names[lo], names[hi - 1]), names[lo:hi], hi - lo)
+
+    def _complete_path(self, word, start, end):
+        path = unescape(word)
+        directory, slash, prefix = path.rpartition("/")
+        node = self.vfs.resolve(directory or "/") if slash else self.vfs.current_dir
+        if node is None or node.is_file:
+            return None
+        head = directory + slash
+
+        names = node.sorted_names()
+        if prefix:
+            ranges = [prefix_range(names, prefix)]
+        else:
+            # Скрытые имена (непрерывный блок [".", "/")) - только по префиксу "."
+            hidden_lo = bisect_left(names, ".")
+            hidden_hi = bisect_left(names, "/", hidden_lo)
+            ranges = [(0, hidden_lo), (hidden_hi, len(names))]
+        ranges = [(lo, hi) for lo, hi in ranges if lo < hi]
+        if not ranges:
+            return None
+
+        children = node.children
+        total = sum(hi - lo for lo, hi in ranges)
+        if total == 1:
+            name = names[ranges[0][0]]
+            suffix = " " if children[name].is_file else "/"
+            return Completion(start, end, escape(head + name) + suffix, [name], 1)
+
+        shared = common_prefix(names[ranges[0][0]], names[ranges[-1][1] - 1])
+        candidates = []
+        for lo, hi in ranges:
+            for name in names[lo:min(hi, lo + self.LIMIT - len(candidates))]:
+                candidates.append(name if children[name].is_file else name + "/")
+        return Completion(start, end, escape(head + shared), candidates, total)
+
+class History:
+    """История команд с навигацией Up/Down; сохраняется в файл построчно.
+
+    Новые строки дописываются в конец файла; когда файл вдвое превышает
+    max_entries, он перезаписывается последними max_entries строками.
+    """
+
+    def __init__(self, path=None, max_entries=1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = []
+        # Позиция навигации (len(entries) - вне истории) и набранная, но не выполненная строка
+        self.position = 0
+        self.draft = ""
+        self._lines_in_file = 0
+        self.load()
+
+    def load(self):
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                lines = [line.rstrip("\n") for line in f if line.strip()]
+            self._lines_in_file = len(lines)
+            self.entries = lines[-self.max_entries:]
+        self.position = len(self.entries)
+
+    def add(self, line):
+        line = line.strip()
+        self.position = len(self.entries)
+        self.draft = ""
+        if not line or (self.entries and self.entries[-1] == line):
+            return
+        self.entries.append(line)
+        if len(self.entries) > self.max_entries:
+            del self.entries[:len(self.entries) - self.max_entries]
+        self.position = len(self.entries)
+        self._save(line)
+
+    def _save(self, line):
+        if not self.path:
+            return
+        try:
+            if self._lines_in_file + 1 > 2 * self.max_entries:
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.writelines(entry + "\n" for entry in self.entries)
+                os.replace(tmp_path, self.path)
+                self._lines_in_file = len(self.entries)
+            else:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+                self._lines_in_file += 1
+        except OSError as e:
+            print(f"History save error: {e}")
+
+    def previous(self, current):
+        """Предыдущая строка истории (Up); current - текст в поле ввода"""
+        if self.position == len(self.entries):
+            self.draft = current
+        if self.position > 0:
+            self.position -= 1
+        return self.entries[self.position] if self.entries else current
+
+    def next(self):
+        """Следующая строка (Down); после последней - набранный текст"""
+        if self.position < len(self.entries):
+            self.position += 1
+        if self.position == len(self.entries):
+            return self.draft
+        return self.entries[self.position]
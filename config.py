@@ -7,21 +7,104 @@ class Config:
         self.vfs_path = None
         self.log_path = "vfs.log"
         self.script_path = None
+        self.log_flush_every = 1
+        self.log_flush_interval = None
+        self.log_max_bytes = None
+        self.log_backups = 3
+        self.headless = False
+        self.output_path = None
+        self.stop_on_error = False
+        self.script_delay = 0.3
+        self.save_snapshot_path = None
+        self.scrollback_lines = 5000
+        self.plugins = []
+        self.profile = False
+        self.profile_dump_path = None
+        self.script_patterns = []
+        self.jobs = None
+        self.results_dir = "results"
+        self.journal_path = None
+        self.journal_fsync = "interval"
+        self.journal_fsync_interval = 1.0
+        self.journal_compact_every = 10000
+        self.serve_address = None
+        self.serve_host_files = False
+        self.command_text = None
+        self.time_startup = False
+        self.replay_path = None
+        self.history_path = os.path.join(os.path.expanduser("~"), ".vfs_history")
+        self.history_size = 1000
         
-    def parse_args(self):
+    def parse_args(self, argv=None):
         parser = argparse.ArgumentParser(description="VFS Emulator")
-        parser.add_argument("--vfs-path", help="Path to VFS JSON file")
+        parser.add_argument("--vfs-path", help="Path to VFS JSON file or binary snapshot")
+        parser.add_argument("--save-snapshot", help="Save VFS to a binary snapshot on exit")
         parser.add_argument("--log-path", default="vfs.log", help="Path to log file")
         parser.add_argument("--script", help="Path to startup script")
+        parser.add_argument("--log-flush-every", type=int, default=1,
+                            help="Flush log to disk every N events")
+        parser.add_argument("--log-flush-interval", type=float, default=None,
+                            help="Flush log to disk at most every N seconds")
+        parser.add_argument("--log-max-bytes", type=int, default=None,
+                            help="Rotate log file when it exceeds N bytes")
+        parser.add_argument("--log-backups", type=int, default=3,
+                            help="Number of rotated log files to keep")
+        parser.add_argument("--headless", "--batch", dest="headless", action="store_true",
+                            help="Run without GUI: execute the script (or stdin) at full speed")
+        parser.add_argument("--output", help="Write headless output to file instead of stdout")
+        parser.add_argument("--stop-on-error", action="store_true",
+                            help="Stop headless run on the first failed command")
+        parser.add_argument("--script-delay", type=float, default=0.3,
+                            help="Delay in seconds between script lines in GUI mode")
+        parser.add_argument("--plugin", action="append", default=[], dest="plugins",
+                            help="Import MODULE and register its commands (repeatable)")
+        parser.add_argument("--scrollback-lines", type=int, default=5000,
+                            help="Maximum number of lines kept in the GUI output pane")
+        parser.add_argument("--profile", action="store_true",
+                            help="Collect per-command and VFS operation latencies (see the stats command)")
+        parser.add_argument("--profile-dump",
+                            help="Write cProfile statistics of the script run to FILE (pstats format)")
+        parser.add_argument("--scripts", action="append", default=[], dest="script_patterns",
+                            help="Run every script in DIR or matching GLOB in parallel (repeatable)")
+        parser.add_argument("--jobs", type=int, default=None,
+                            help="Number of worker processes for --scripts (default: CPU count)")
+        parser.add_argument("--results-dir", default="results",
+                            help="Directory for per-script logs, outputs and summary.xml")
+        parser.add_argument("--journal",
+                            help="Persist VFS changes to an append-only journal and replay it at startup")
+        parser.add_argument("--journal-fsync", choices=["always", "interval", "never"], default="interval",
+                            help="When to fsync the journal (default: interval)")
+        parser.add_argument("--journal-fsync-interval", type=float, default=1.0,
+                            help="Seconds between fsyncs with --journal-fsync interval")
+        parser.add_argument("--journal-compact-every", type=int, default=10000,
+                            help="Compact the journal into a snapshot after N operations (0 disables)")
+        parser.add_argument("--serve", metavar="ADDRESS",
+                            help="Serve the VFS to network clients on HOST:PORT or unix:PATH")
+        parser.add_argument("--serve-host-files", action="store_true",
+                            help="Allow network clients to run save, load and compact (host file access)")
+        parser.add_argument("-c", "--command", dest="command_text", metavar="COMMAND",
+                            help="Run a single command line without GUI and exit with its status")
+        parser.add_argument("--replay", metavar="LOG",
+                            help="Re-run the session recorded in an XML log and report diverging commands")
+        parser.add_argument("--history-file", default=self.history_path,
+                            help="File for GUI command history ('' disables saving)")
+        parser.add_argument("--history-size", type=int, default=1000,
+                            help="Number of commands kept in the GUI history")
+        parser.add_argument("--time-startup", action="store_true",
+                            help="Report the time spent in each startup phase to stderr")
         
-        args = parser.parse_args()
+        args = parser.parse_args(argv)
         
-        # Отладочный вывод параметров
-        print("=== VFS Emulator Configuration ===")
-        print(f"VFS Path: {args.vfs_path}")
-        print(f"Log Path: {args.log_path}")
-        print(f"Script Path: {args.script}")
-        print("==================================")
+        # Отладочный вывод параметров - только в интерактивных режимах; пакетный
+        # запуск (--headless, -c, --scripts) выводит лишь результаты команд
+        if args.serve or not (args.headless or args.command_text is not None or args.script_patterns
+                              or args.replay):
+            banner_out = sys.stderr if args.serve else sys.stdout
+            print("=== VFS Emulator Configuration ===", file=banner_out)
+            print(f"VFS Path: {args.vfs_path}", file=banner_out)
+            print(f"Log Path: {args.log_path}", file=banner_out)
+            print(f"Script Path: {args.script}", file=banner_out)
+            print("==================================", file=banner_out)
         
         if args.vfs_path:
             if not os.path.exists(args.vfs_path):
@@ -30,6 +113,41 @@ class Config:
             self.vfs_path = os.path.abspath(args.vfs_path)
             
         self.log_path = os.path.abspath(args.log_path)
+        self.log_flush_every = args.log_flush_every
+        self.log_flush_interval = args.log_flush_interval
+        self.log_max_bytes = args.log_max_bytes
+        self.log_backups = args.log_backups
+        self.headless = args.headless
+        self.stop_on_error = args.stop_on_error
+        self.script_delay = args.script_delay
+        self.scrollback_lines = max(1, args.scrollback_lines)
+        self.plugins = args.plugins
+        self.profile = args.profile
+        self.script_patterns = args.script_patterns
+        self.jobs = args.jobs
+        self.results_dir = os.path.abspath(args.results_dir)
+        if args.journal:
+            self.journal_path = os.path.abspath(args.journal)
+        self.journal_fsync = args.journal_fsync
+        self.journal_fsync_interval = args.journal_fsync_interval
+        self.journal_compact_every = args.journal_compact_every
+        self.serve_address = args.serve
+        self.serve_host_files = args.serve_host_files
+        self.command_text = args.command_text
+        self.time_startup = args.time_startup
+        self.history_path = os.path.abspath(args.history_file) if args.history_file else None
+        self.history_size = max(1, args.history_size)
+        if args.replay:
+            if not os.path.exists(args.replay):
+                print(f"Error: Log file not found: {args.replay}")
+                sys.exit(1)
+            self.replay_path = os.path.abspath(args.replay)
+        if args.profile_dump:
+            self.profile_dump_path = os.path.abspath(args.profile_dump)
+        if args.save_snapshot:
+            self.save_snapshot_path = os.path.abspath(args.save_snapshot)
+        if args.output:
+            self.output_path = os.path.abspath(args.output)
         
         if args.script:
             if not os.path.exists(args.script):
@@ -0,0 +1,123 @@
+from bisect import bisect_left, insort
+from fnmatch import fnmatchcase
+
+GLOB_CHARS = "*?["
+EMPTY = frozenset()
+
+class NodeIndex:
+    """Вторичные индексы VFS: имя, владелец и права -> множество узлов.
+
+    Строится одним обходом дерева и дальше поддерживается инкрементально
+    методами VFS, которые меняют дерево (mv, chown, создание файлов, откат).
+    """
+
+    def __init__(self):
+        self.by_name = {}
+        self.by_owner = {}
+        self.by_permissions = {}
+        # Отсортированные различные имена: glob с литеральным префиксом
+        # просматривает только имена с этим префиксом
+        self._names = []
+
+    @classmethod
+    def build(cls, root):
+        index = cls()
+        index.add_subtree(root)
+        return index
+
+    def add(self, node):
+        if self._add_key(self.by_name, node.name, node):
+            insort(self._names, node.name)
+        self._add_key(self.by_owner, node.owner, node)
+        self._add_key(self.by_permissions, node.permissions, node)
+
+    def remove(self, node):
+        if self._remove_key(self.by_name, node.name, node):
+            del self._names[bisect_left(self._names, node.name)]
+        self._remove_key(self.by_owner, node.owner, node)
+        self._remove_key(self.by_permissions, node.permissions, node)
+
+    def add_subtree(self, node):
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            self.add(current)
+            stack.extend(current.children.values())
+
+    def remove_subtree(self, node):
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            self.remove(current)
+            stack.extend(current.children.values())
+
+    def rename(self, node, old_name):
+        """Переносит узел под новое имя (node.name уже изменено)"""
+        if old_name == node.name:
+            return
+        if self._remove_key(self.by_name, old_name, node):
+            del self._names[bisect_left(self._names, old_name)]
+        if self._add_key(self.by_name, node.name, node):
+            insort(self._names, node.name)
+
+    def change_owner(self, node, old_owner):
+        """Переносит узел к новому владельцу (node.owner уже изменен)"""
+        self._remove_key(self.by_owner, old_owner, node)
+        self._add_key(self.by_owner, node.owner, node)
+
+    def _add_key(self, table, key, node):
+        """Добавляет узел; True, если ключ новый"""
+        nodes = table.get(key)
+        if nodes is None:
+            table[key] = {node}
+            return True
+        nodes.add(node)
+        return False
+
+    def _remove_key(self, table, key, node):
+        """Удаляет узел; True, если ключ больше не используется"""
+        nodes = table.get(key)
+        if nodes is None:
+            return False
+        nodes.discard(node)
+        if not nodes:
+            del table[key]
+            return True
+        return False
+
+    def match_names(self, pattern):
+        """Узлы, имя которых подходит под glob-шаблон"""
+        if not any(char in pattern for char in GLOB_CHARS):
+            return self.by_name.get(pattern, EMPTY)
+
+        prefix_end = min(pattern.find(char) for char in GLOB_CHARS if char in pattern)
+        prefix = pattern[:prefix_end]
+        names = self._names
+        matched = set()
+        i = bisect_left(names, prefix)
+        while i < len(names) and names[i].startswith(prefix):
+            if fnmatchcase(names[i], pattern):
+                matched.update(self.by_name[names[i]])
+            i += 1
+        return matched
+
+    def candidates(self, name=None, owner=None, permissions=None):
+        """Пересечение множеств по заданным условиям (None, если условий нет)"""
+        sets = []
+        if owner is not None:
+            sets.append(self.by_owner.get(owner, EMPTY))
+        if permissions is not None:
+            sets.append(self.by_permissions.get(permissions, EMPTY))
+        if name is not None:
+            sets.append(self.match_names(name))
+        if not sets:
+            return None
+
+        # Пересечение начинается с самого маленького множества
+        sets.sort(key=len)
+        result = sets[0]
+        for other in sets[1:]:
+            if not result:
+                break
+            result = result & other
+        return result
@@ -0,0 +1,234 @@
+import base64
+import json
+import os
+import tempfile
+import time
+import zlib
+
+FSYNC_POLICIES = ("always", "interval", "never")
+VERSION = 1
+
+class Journal:
+    """Журнал изменений VFS (write-ahead log), переживающий перезапуск.
+
+    Файл - строки "<crc32> <json>": первая описывает базовый образ, остальные -
+    операции mv, cp, chown, write и rm с абсолютными путями. При запуске базовый
+    образ загружается и операции применяются заново. Сжатие сохраняет дерево
+    в новый снапшот и начинает пустой журнал поверх него.
+    """
+
+    def __init__(self, path, fsync="interval", fsync_interval=1.0, compact_every=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = os.path.abspath(path)
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        # Автоматическое сжатие после N операций (None/0 - только командой compact)
+        self.compact_every = compact_every
+
+        self.base = None
+        self.generation = 0
+        self.records = 0
+        self.vfs = None
+        self._file = None
+        self._last_sync = time.monotonic()
+
+    def open(self, vfs, image_path=None):
+        """Восстанавливает состояние из журнала или начинает новый журнал поверх image_path.
+
+        Возвращает число примененных операций.
+        """
+        replayed = 0
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            replayed = self._recover(vfs)
+        else:
+            if image_path:
+                vfs.load_image(image_path)
+            self._start(image_path, 0)
+        self.vfs = vfs
+        vfs.journal = self
+        return replayed
+
+    def _recover(self, vfs):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        records = []
+        pos = 0
+        while pos < len(data):
+            end = data.find(b'\n', pos)
+            if end < 0:
+                break
+            record = self._decode(data[pos:end])
+            if record is None:
+                break
+            records.append(record)
+            pos = end + 1
+
+        if not records or not isinstance(records[0], dict):
+            raise ValueError(f"Invalid journal header: {self.path}")
+        header = records[0]
+        self.base = header.get("base")
+        self.generation = header.get("generation", 0)
+
+        if self.base:
+            vfs.load_image(self.base)
+        for number, record in enumerate(records[1:], 1):
+            try:
+                self.apply(vfs, record)
+            except Exception as e:
+                raise ValueError(f"Journal replay failed at record {number} ({record[0]}): {e}")
+        self.records = len(records) - 1
+
+        # Оборванная последняя запись (сбой во время записи) отбрасывается
+        if pos < len(data):
+            print(f"Journal: discarded {len(data) - pos} bytes of an incomplete record")
+            with open(self.path, 'r+b') as f:
+                f.truncate(pos)
+                os.fsync(f.fileno())
+        self._file = open(self.path, 'ab')
+        return self.records
+
+    def _decode(self, line):
+        checksum, sep, payload = line.partition(b' ')
+        if not sep:
+            return None
+        try:
+            if int(checksum, 16) != zlib.crc32(payload):
+                return None
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    def _encode(self, record):
+        payload = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return b'%08x %s\n' % (zlib.crc32(payload), payload)
+
+    def _start(self, base, generation):
+        """Атомарно заменяет журнал пустым с новым базовым образом"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        base = os.path.abspath(base) if base else None
+        header = self._encode({"version": VERSION, "base": base, "generation": generation})
+
+        directory = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".journal-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._sync_directory(directory)
+
+        old_base = self.base
+        self.base = base
+        self.generation = generation
+        self.records = 0
+        self._file = open(self.path, 'ab')
+        # Снапшот предыдущего поколения больше не нужен для восстановления
+        if old_base and old_base != base and self._is_own_snapshot(old_base) and os.path.exists(old_base):
+            os.remove(old_base)
+
+    def _sync_directory(self, directory):
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _snapshot_path(self, generation):
+        return f"{self.path}.{generation}.snap"
+
+    def _is_own_snapshot(self, path):
+        prefix = self.path + "."
+        return path.startswith(prefix) and path.endswith(".snap") and path[len(prefix):-5].isdigit()
+
+    def append(self, op, *args):
+        if self._file is None:
+            return
+        self._file.write(self._encode([op, *args]))
+        # Запись всегда уходит в ОС и переживает падение процесса;
+        # fsync защищает и от сбоя системы
+        self._file.flush()
+        self.records += 1
+        if self.fsync == "always":
+            os.fsync(self._file.fileno())
+        elif self.fsync == "interval" and time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+        if self.compact_every and self.records >= self.compact_every and self.vfs is not None:
+            self.compact(self.vfs)
+
+    def sync(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+    def compact(self, vfs):
+        """Сохраняет дерево в снапшот нового поколения и начинает пустой журнал.
+
+        Возвращает (число сжатых операций, путь снапшота).
+        """
+        compacted = self.records
+        generation = self.generation + 1
+        snapshot_path = self._snapshot_path(generation)
+        vfs.save_snapshot(snapshot_path)
+        self._start(snapshot_path, generation)
+        return compacted, snapshot_path
+
+    def rebase(self, image_path):
+        """Дерево целиком заменено образом image_path: журнал начинается заново поверх него"""
+        if image_path:
+            self._start(image_path, self.generation + 1)
+        elif self.vfs is not None:
+            self.compact(self.vfs)
+
+    def apply(self, vfs, record):
+        op, args = record[0], record[1:]
+        if op == "mv":
+            source, dest = args
+            node = self._resolve(vfs, source)
+            parent, name = vfs.split_path(dest)
+            if parent is None or parent.is_file:
+                raise ValueError(f"Invalid destination: {dest}")
+            vfs.move_node(node, parent, name)
+        elif op == "chown":
+            path, owner, *recursive = args
+            vfs.set_owner(self._resolve(vfs, path), owner, recursive=bool(recursive and recursive[0]))
+        elif op == "cp":
+            source, dest = args
+            node = self._resolve(vfs, source)
+            parent, name = vfs.split_path(dest)
+            if parent is None or parent.is_file:
+                raise ValueError(f"Invalid destination: {dest}")
+            vfs.copy_node(node, parent, name)
+        elif op == "write":
+            path, data, append = args
+            vfs.write_file(path, base64.b64decode(data), append=append)
+        elif op == "rm":
+            vfs.remove_node(self._resolve(vfs, args[0]))
+        else:
+            raise ValueError(f"Unknown operation: {op}")
+
+    def _resolve(self, vfs, path):
+        node = vfs.resolve(path)
+        if node is None:
+            raise ValueError(f"Path not found: {path}")
+        return node
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+        if self.vfs is not None and self.vfs.journal is self:
+            self.vfs.journal = None
@@ -0,0 +1,185 @@
+import json
+import re
+
+NUMBER_RE = re.compile(rb'-?\d+(\.\d+)?([eE][+-]?\d+)?')
+WHITESPACE = b' \t\r\n'
+LITERALS = {b'true': True, b'false': False, b'null': None}
+# Один токен за совпадение: скобка, строка целиком или скаляр. Запятые и
+# двоеточия пропускаются вместе с пробелами - роль токена (ключ или значение)
+# определяется по стеку контейнеров
+# Экранирование или пробельные символы внутри base64 (перенос строк MIME, \/):
+# по длине такой строки размер данных не вычислить
+INEXACT_RE = re.compile(rb'[\\\s]')
+TOKEN_RE = re.compile(rb'[ \t\r\n,:]*(?:([{}\[\]])|"([^"\\]*(?:\\.[^"\\]*)*)"|([^ \t\r\n,:\[\]{}"]+))')
+
+class JSONStreamError(ValueError):
+    pass
+
+class JSONEventReader:
+    """Потоковый разбор JSON-файла в события без загрузки файла целиком.
+
+    События: ('start_map',), ('end_map',), ('start_array',), ('end_array',),
+    ('key', name), ('value', value) и ('ref', offset, length, tail, exact) - для
+    строковых значений ключей из lazy_keys: строка не декодируется, а
+    возвращается смещение и длина ее содержимого в файле (tail - последние
+    байты строки, нужны для вычисления размера base64 без чтения; exact -
+    в строке нет экранирования и пробелов, и этот размер точен).
+    """
+
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, f, lazy_keys=(), chunk_size=None):
+        self.f = f
+        self.lazy_keys = set(lazy_keys)
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.buf = b''
+        self.pos = 0
+        self.base = 0  # смещение начала буфера в файле
+        self.eof = False
+
+    def _fill(self):
+        """Дочитывает следующий блок, отбрасывая уже разобранную часть буфера"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.base += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            buf = self.buf
+            pos = self.pos
+            n = len(buf)
+            while pos < n and buf[pos] in WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < n or not self._fill():
+                return
+
+    def _peek(self):
+        self._skip_whitespace()
+        if self.pos >= len(self.buf):
+            return None
+        return self.buf[self.pos:self.pos + 1]
+
+    def _find_string_end(self, start):
+        """Индекс закрывающей кавычки строки, начинающейся с start (или -1)"""
+        i = start
+        while True:
+            j = self.buf.find(b'"', i)
+            if j < 0:
+                return -1
+            k = j - 1
+            while k >= start and self.buf[k] == 0x5c:  # обратный слэш
+                k -= 1
+            if (j - 1 - k) % 2 == 0:
+                return j
+            i = j + 1
+
+    def _skip_string(self):
+        """Пропускает строку, не накапливая ее в памяти"""
+        self.pos += 1
+        offset = self.base + self.pos
+        length = 0
+        tail = b''
+        exact = True
+        while True:
+            end = self._find_string_end(self.pos)
+            if end >= 0:
+                length += end - self.pos
+                tail = (tail + self.buf[max(self.pos, end - 2):end])[-2:]
+                exact = exact and INEXACT_RE.search(self.buf, self.pos, end) is None
+                self.pos = end + 1
+                return offset, length, tail, exact
+            # Хвост из обратных слэшей оставляем в буфере: он может экранировать кавычку
+            keep = len(self.buf)
+            while keep > self.pos and self.buf[keep - 1] == 0x5c:
+                keep -= 1
+            length += keep - self.pos
+            tail = (tail + self.buf[max(self.pos, keep - 2):keep])[-2:]
+            exact = exact and INEXACT_RE.search(self.buf, self.pos, keep) is None
+            self.pos = keep
+            if not self._fill():
+                raise JSONStreamError("Unterminated string")
+
+    def __iter__(self):
+        # Стек контейнеров: True - объект, False - массив
+        stack = []
+        expect_key = False
+        last_key = None
+        lazy_keys = self.lazy_keys
+
+        while True:
+            buf = self.buf
+            match = TOKEN_RE.match(buf, self.pos)
+            if match is None:
+                read = self.base + len(self.buf)
+                ch = self._peek()
+                if ch is None:
+                    if stack:
+                        raise JSONStreamError("Unexpected end of file")
+                    return
+                if ch == b'"' and not expect_key and stack and stack[-1] and last_key in lazy_keys:
+                    # Длинная строка не помещается в буфер - пропускаем ее потоково
+                    yield ('ref',) + self._skip_string()
+                    expect_key = True
+                    continue
+                # _peek мог дочитать данные - тогда просто повторяем разбор
+                if self.base + len(self.buf) == read and not self._fill():
+                    raise JSONStreamError(f"Unexpected data at offset {self.base + self.pos}")
+                continue
+            if match.end() == len(buf) and not self.eof:
+                # Токен может быть обрезан концом буфера
+                self._fill()
+                continue
+
+            self.pos = match.end()
+            punct, string, scalar = match.groups()
+
+            if punct is not None:
+                if punct == b'{':
+                    stack.append(True)
+                    expect_key = True
+                    yield ('start_map',)
+                elif punct == b'[':
+                    stack.append(False)
+                    expect_key = False
+                    yield ('start_array',)
+                else:
+                    stack.pop()
+                    expect_key = bool(stack) and stack[-1]
+                    yield ('end_map',) if punct == b'}' else ('end_array',)
+            elif string is not None:
+                if expect_key:
+                    last_key = self._decode_string(string)
+                    expect_key = False
+                    yield ('key', last_key)
+                    continue
+                if stack and stack[-1] and last_key in lazy_keys:
+                    start, end = match.span(2)
+                    yield ('ref', self.base + start, end - start, buf[max(start, end - 2):end],
+                           INEXACT_RE.search(string) is None)
+                else:
+                    yield ('value', self._decode_string(string))
+                expect_key = bool(stack) and stack[-1]
+            else:
+                if scalar in LITERALS:
+                    yield ('value', LITERALS[scalar])
+                elif NUMBER_RE.fullmatch(scalar):
+                    yield ('value', json.loads(scalar))
+                else:
+                    raise JSONStreamError(f"Unexpected data at offset {self.base + match.start(3)}")
+                expect_key = bool(stack) and stack[-1]
+
+            if not stack:
+                return
+
+    def _decode_string(self, raw):
+        if b'\\' in raw:
+            return json.loads(b'"' + raw + b'"')
+        return raw.decode('utf-8')
@@ -1,39 +1,194 @@
 import xml.etree.ElementTree as ET
 from datetime import datetime
 import os
+import struct
+import threading
+import time
+
+# Индекс лога (файл LOG.idx): заголовок и запись фиксированной длины на событие -
+# время (секунды эпохи), смещение и длина события в XML, команда (первые 16 байт),
+# статус (1 - успех) и длительность (NaN, если не измерялась)
+INDEX_MAGIC = b'VFSLIDX1'
+INDEX_RECORD = struct.Struct('<dQI16sBf')
+INDEX_SUFFIX = ".idx"
 
 class XMLLogger:
-    def __init__(self, log_path):
+    """Потоковый XML-логгер: каждое событие дописывается в открытый файл один раз.
+
+    После каждого сброса файл - валидный XML: при сбросе после последнего
+    события заново пишется только закрывающий тег </vfs_log>.
+    """
+
+    HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n<vfs_log>'.encode('utf-8')
+    FOOTER = '</vfs_log>'.encode('utf-8')
+
+    def __init__(self, log_path, flush_every=1, flush_interval=None, max_bytes=None, backup_count=3,
+                 index=True):
         self.log_path = log_path
+        # Компактный индекс событий рядом с XML (см. logtool)
+        self.index = index
         os.makedirs(os.path.dirname(log_path) if os.path.dirname(log_path) else '.', exist_ok=True)
-        self.root = ET.Element("vfs_log")
-        
-    def log_command(self, command, args, success=True, message=""):
-        event = ET.SubElement(self.root, "event")
-        
+
+        # Политика сброса: каждые N событий и/или по таймеру (в секундах)
+        self.flush_every = max(1, int(flush_every)) if flush_every else 1
+        self.flush_interval = flush_interval
+        # Ротация по размеру: 0/None - без ротации
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self.events_written = 0
+        # Номера строк ввода - общие для всех исполнителей (сессий сервера), пишущих в лог
+        self.lines_logged = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._timer = None
+        self._lock = threading.RLock()
+        self._file = None
+        self._index_file = None
+        self._open()
+
+    def _open(self):
+        self._file = open(self.log_path, 'wb')
+        index_path = self.log_path + INDEX_SUFFIX
+        # Индекс нужен только обычному файлу (не /dev/null); старый индекс
+        # от предыдущего сеанса не должен описывать новый лог
+        if self.index and os.path.isfile(self.log_path):
+            self._index_file = open(index_path, 'wb')
+            self._index_file.write(INDEX_MAGIC)
+            self._index_file.flush()
+        elif os.path.exists(index_path):
+            os.remove(index_path)
+        self._file.write(self.HEADER)
+        self._size = len(self.HEADER)
+        self._write_footer()
+
+    def _write_footer(self):
+        # Закрывающий тег пишется после последнего события, а курсор
+        # возвращается на его начало - следующее событие перезапишет его.
+        # seek сбрасывает буфер, поэтому вызывается только при сбросе
+        self._file.write(self.FOOTER)
+        self._file.seek(self._size)
+
+    def next_line_number(self):
+        """Номер очередной строки ввода, уникальный в пределах лога"""
+        with self._lock:
+            self.lines_logged += 1
+            return self.lines_logged
+
+    def log_command(self, command, args, success=True, message="", duration=None, line=None, line_number=None):
+        event = ET.Element("event")
+        now = datetime.now()
+
         timestamp = ET.SubElement(event, "timestamp")
-        timestamp.text = datetime.now().isoformat()
-        
+        timestamp.text = now.isoformat()
+
         cmd_elem = ET.SubElement(event, "command")
         cmd_elem.text = command
-        
+
         args_elem = ET.SubElement(event, "arguments")
         args_elem.text = str(args)
-        
+
         status = ET.SubElement(event, "status")
         status.text = "success" if success else "error"
-        
+
+        if duration is not None:
+            # Время выполнения команды в секундах
+            duration_elem = ET.SubElement(event, "duration")
+            duration_elem.text = f"{duration:.6f}"
+
         if message:
             msg_elem = ET.SubElement(event, "message")
             msg_elem.text = message
-            
-        self._save_log()
-        
-    def _save_log(self):
+
+        if line is not None:
+            # Строка ввода, частью которой была команда (для воспроизведения сеанса)
+            line_elem = ET.SubElement(event, "line")
+            line_elem.text = line
+            if line_number is not None:
+                line_elem.set("number", str(line_number))
+
+        self._write_event(ET.tostring(event, encoding='utf-8'),
+                          (now.timestamp(), command, success, duration))
+
+    def _write_event(self, data, index_entry=None):
         try:
-            tree = ET.ElementTree(self.root)
-            with open(self.log_path, 'w', encoding='utf-8') as f:
-                f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-                tree.write(f, encoding='unicode', method='xml')
+            with self._lock:
+                if self._file is None:
+                    return
+                if self.max_bytes and self._size > len(self.HEADER) \
+                        and self._size + len(data) + len(self.FOOTER) > self.max_bytes:
+                    self._rotate()
+
+                self._file.write(data)
+                if self._index_file is not None and index_entry is not None:
+                    timestamp, command, success, duration = index_entry
+                    self._index_file.write(INDEX_RECORD.pack(
+                        timestamp, self._size, len(data), command.encode('utf-8')[:16],
+                        1 if success else 0, float('nan') if duration is None else duration
+                    ))
+                self._size += len(data)
+                self.events_written += 1
+                self._pending += 1
+
+                if self._pending >= self.flush_every:
+                    self.flush()
+                elif self.flush_interval:
+                    if time.monotonic() - self._last_flush >= self.flush_interval:
+                        self.flush()
+                    else:
+                        self._schedule_flush()
         except Exception as e:
-            print(f"Log save error: {e}")
\ No newline at end of file
+            print(f"Log save error: {e}")
+
+    def _schedule_flush(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._timer_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timer_flush(self):
+        with self._lock:
+            self._timer = None
+            if self._file is not None:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._write_footer()
+            if self._index_file is not None:
+                self._index_file.flush()
+            self._pending = 0
+            self._last_flush = time.monotonic()
+
+    def _rotate(self):
+        self._write_footer()
+        self._file.close()
+        self._close_index()
+        if self.backup_count > 0:
+            # Индекс переименовывается вместе со своим логом: vfs.log.1.idx
+            for suffix in ("", INDEX_SUFFIX):
+                for i in range(self.backup_count - 1, 0, -1):
+                    src = f"{self.log_path}.{i}{suffix}"
+                    if os.path.exists(src):
+                        os.replace(src, f"{self.log_path}.{i + 1}{suffix}")
+                if os.path.exists(self.log_path + suffix):
+                    os.replace(self.log_path + suffix, f"{self.log_path}.1{suffix}")
+        self._open()
+
+    def _close_index(self):
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._file is not None:
+                self._write_footer()
+                self._file.close()
+                self._file = None
+            self._close_index()
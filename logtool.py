@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""Запросы к XML-логу эмулятора и воспроизведение сеанса.
+
+python logtool.py query vfs.log --command mv --status error --since 2026-10-16T18:00
+python logtool.py stats vfs.log
+python logtool.py index vfs.log
+python main.py --replay vfs.log --vfs-path image.json --headless
+"""
+import argparse
+import ast
+import math
+import mmap
+import os
+import sys
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime
+
+from logger import INDEX_MAGIC, INDEX_RECORD, INDEX_SUFFIX
+
+EVENT_START = b"<event>"
+EVENT_END = b"</event>"
+# Сколько строк могут выполняться одновременно (сессии сервера) - их события
+# в логе перемежаются
+LINE_WINDOW = 1024
+
+class LogEvent:
+    """Событие лога; offset и length - положение <event> в файле, если известно"""
+    __slots__ = ('timestamp', 'command', 'args', 'status', 'duration', 'message',
+                 'line', 'line_number', 'offset', 'length')
+
+    def __init__(self, timestamp, command, args, status, duration=None, message="",
+                 line=None, line_number=None, offset=None, length=None):
+        self.timestamp = timestamp
+        self.command = command
+        self.args = args
+        self.status = status
+        self.duration = duration
+        self.message = message
+        self.line = line
+        self.line_number = line_number
+        self.offset = offset
+        self.length = length
+
+    @classmethod
+    def from_element(cls, element, offset=None, length=None):
+        duration = element.findtext("duration")
+        line = element.find("line")
+        number = line.get("number") if line is not None else None
+        return cls(
+            element.findtext("timestamp", ""),
+            element.findtext("command", ""),
+            element.findtext("arguments", "[]"),
+            element.findtext("status", ""),
+            float(duration) if duration else None,
+            element.findtext("message", ""),
+            (line.text or "") if line is not None else None,
+            int(number) if number else None,
+            offset,
+            length,
+        )
+
+    @property
+    def success(self):
+        return self.status == "success"
+
+    def arguments(self):
+        """Аргументы команды списком (в логе записан repr списка)"""
+        try:
+            value = ast.literal_eval(self.args)
+        except (ValueError, SyntaxError):
+            return []
+        return [str(arg) for arg in value] if isinstance(value, (list, tuple)) else []
+
+    def format(self):
+        text = f"{self.timestamp} {self.command} {self.args} {self.status}"
+        if self.duration is not None:
+            text += f" {self.duration:.6f}s"
+        if self.message:
+            text += f": {self.message}"
+        return text
+
+def iter_events(log_path):
+    """Потоковое чтение событий через iterparse: память не зависит от размера лога"""
+    context = ET.iterparse(log_path, events=("start", "end"))
+    _, root = next(context)
+    for kind, element in context:
+        if kind == "end" and element.tag == "event":
+            yield LogEvent.from_element(element)
+            # Разобранные события удаляются из дерева
+            root.clear()
+
+def _timestamp(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(value).timestamp()
+
+class LogIndex:
+    """Индекс XML-лога (файл LOG.idx, пишется XMLLogger).
+
+    Записи фиксированной длины в порядке событий: диапазон времени ищется
+    двоичным поиском, фильтр по команде и статусу не читает XML, а полное
+    событие читается по смещению. Если индекса нет или он отстает от лога
+    (сбой, лог без индекса), недостающие записи строятся сканированием XML.
+    """
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.index_path = log_path + INDEX_SUFFIX
+        # Упакованные записи подряд, без заголовка
+        self.data = self._load()
+
+    def _load(self):
+        data = b""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+        if not data.startswith(INDEX_MAGIC):
+            data = INDEX_MAGIC
+        # Неполная последняя запись (лог пишется прямо сейчас) отбрасывается
+        size = len(data) - len(INDEX_MAGIC)
+        records = bytearray(data[len(INDEX_MAGIC):len(data) - size % INDEX_RECORD.size])
+
+        end = 0
+        if records:
+            _, offset, length, _, _, _ = INDEX_RECORD.unpack_from(records, len(records) - INDEX_RECORD.size)
+            end = offset + length
+        if end > os.path.getsize(self.log_path):
+            # Индекс от другого (более длинного) лога - строится заново
+            records, end = bytearray(), 0
+        for record in self._scan(end):
+            records += INDEX_RECORD.pack(*record)
+        return records
+
+    def _scan(self, start):
+        """Записи индекса для событий XML, начинающихся после start"""
+        if os.path.getsize(self.log_path) == 0:
+            return
+        with open(self.log_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            pos = data.find(EVENT_START, start)
+            while pos >= 0:
+                end = data.find(EVENT_END, pos)
+                if end < 0:
+                    break
+                end += len(EVENT_END)
+                event = LogEvent.from_element(ET.fromstring(data[pos:end]))
+                yield (_timestamp(event.timestamp), pos, end - pos, event.command.encode('utf-8')[:16],
+                       1 if event.success else 0, float('nan') if event.duration is None else event.duration)
+                pos = data.find(EVENT_START, end)
+
+    def save(self):
+        """Записывает индекс на диск (атомарно)"""
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            f.write(self.data)
+        os.replace(tmp_path, self.index_path)
+        return len(self)
+
+    def __len__(self):
+        return len(self.data) // INDEX_RECORD.size
+
+    def records(self, start=0, stop=None):
+        stop = len(self) if stop is None else stop
+        view = memoryview(self.data)[start * INDEX_RECORD.size:stop * INDEX_RECORD.size]
+        return INDEX_RECORD.iter_unpack(view)
+
+    def _bisect(self, timestamp):
+        """Первая запись не раньше timestamp (время событий не убывает)"""
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if INDEX_RECORD.unpack_from(self.data, middle * INDEX_RECORD.size)[0] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def select(self, command=None, status=None, since=None, until=None):
+        """Записи (время, смещение, длина, команда, статус, длительность) по условиям"""
+        since, until = _timestamp(since), _timestamp(until)
+        start = self._bisect(since) if since is not None else 0
+        stop = self._bisect(until) if until is not None else len(self)
+        key = command.encode('utf-8')[:16].ljust(16, b'\0') if command is not None else None
+        success = None if status is None else (1 if status == "success" else 0)
+        for record in self.records(start, stop):
+            if key is not None and record[3] != key:
+                continue
+            if success is not None and record[4] != success:
+                continue
+            yield record
+
+    def query(self, command=None, status=None, since=None, until=None, limit=None):
+        """Полные события по условиям; XML читается только для найденных записей"""
+        found = 0
+        with open(self.log_path, 'rb') as f:
+            for record in self.select(command, status, since, until):
+                if limit is not None and found >= limit:
+                    break
+                f.seek(record[1])
+                event = LogEvent.from_element(ET.fromstring(f.read(record[2])), record[1], record[2])
+                # В индексе команда усечена до 16 байт
+                if command is not None and event.command != command:
+                    continue
+                found += 1
+                yield event
+
+    def stats(self):
+        """Число событий, ошибок и суммарная длительность по командам"""
+        totals = {}
+        for _, _, _, command, success, duration in self.records():
+            name = command.rstrip(b'\0').decode('utf-8', errors='replace')
+            entry = totals.setdefault(name, [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += 0 if success else 1
+            if not math.isnan(duration):
+                entry[2] += duration
+        return totals
+
+class _RecordingLogger:
+    """Пишет события воспроизведения в лог и запоминает их статусы для сверки"""
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.events = []
+
+    def log_command(self, command, args, success=True, **details):
+        self.events.append((command, success))
+        self.logger.log_command(command, args, success=success, **details)
+
+    def next_line_number(self):
+        return self.logger.next_line_number()
+
+def _group_lines(events, window=LINE_WINDOW):
+    """События сеанса, сгруппированные по строкам, в порядке первого события строки.
+
+    Номер строки уникален в пределах лога, поэтому перемежающиеся события
+    строк разных сессий собираются обратно; строка считается завершенной,
+    когда после нее начались еще window строк. Событие без строки (вызов
+    execute из кода) - отдельная группа.
+    """
+    groups = OrderedDict()
+    for position, event in enumerate(events):
+        if event.line is not None and event.line_number is not None:
+            key = (event.line_number, event.line)
+        else:
+            key = position
+        group = groups.get(key)
+        if group is not None:
+            group.append(event)
+            continue
+        groups[key] = [event]
+        if len(groups) > window:
+            yield groups.popitem(last=False)[1]
+    yield from groups.values()
+
+def replay(log_path, runner, stream=None):
+    """Выполняет сеанс из лога через BatchRunner и сверяет статусы команд.
+
+    Возвращает число строк, результат которых разошелся с логом.
+    """
+    stream = stream if stream is not None else sys.stderr
+    executor = runner.executor
+    recorder = _RecordingLogger(executor.logger)
+    executor.logger = recorder
+    diverged = 0
+    try:
+        for group in _group_lines(iter_events(log_path)):
+            recorder.events = []
+            first = group[0]
+            if first.line is not None:
+                runner.execute_line(first.line)
+                text = first.line
+            else:
+                # Событие без строки (вызов execute из кода) - команда с аргументами
+                runner.commands_run += 1
+                for chunk in executor.execute_iter(first.command, first.arguments()):
+                    runner.output.write(chunk)
+                if not executor.last_success:
+                    runner.errors += 1
+                text = f"{first.command} {' '.join(first.arguments())}".rstrip()
+            expected = [(event.command, event.success) for event in group]
+            if recorder.events != expected:
+                diverged += 1
+                stream.write(f"DIVERGED {first.timestamp} {text}: logged {_statuses(expected)}, "
+                             f"replayed {_statuses(recorder.events)}\n")
+            if executor.exit_requested:
+                break
+    finally:
+        executor.logger = recorder.logger
+    return diverged
+
+def _statuses(events):
+    return " ".join(f"{command}={'ok' if success else 'error'}" for command, success in events) or "nothing"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query VFS emulator XML logs")
+    commands = parser.add_subparsers(dest="action", required=True)
+
+    query = commands.add_parser("query", help="Print events matching the filters")
+    query.add_argument("log")
+    query.add_argument("--command", help="Command name")
+    query.add_argument("--status", choices=["success", "error"])
+    query.add_argument("--since", help="ISO timestamp (inclusive)")
+    query.add_argument("--until", help="ISO timestamp (exclusive)")
+    query.add_argument("--limit", type=int)
+    query.add_argument("--xml", action="store_true", help="Print raw <event> elements")
+    query.add_argument("--count", action="store_true", help="Print only the number of matching events")
+
+    stats = commands.add_parser("stats", help="Events, errors and total duration per command")
+    stats.add_argument("log")
+
+    index = commands.add_parser("index", help="Rebuild the LOG.idx sidecar from the XML log")
+    index.add_argument("log")
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.log):
+        print(f"Error: log file not found: {args.log}", file=sys.stderr)
+        return 1
+
+    try:
+        log_index = LogIndex(args.log)
+        if args.action == "index":
+            print(f"Indexed {log_index.save()} events into {log_index.index_path}")
+        elif args.action == "stats":
+            width = max([len(name) for name in log_index.stats()] + [len("command")])
+            print(f"{'command':<{width}}    events    errors  total_s")
+            for name, (events, errors, seconds) in sorted(log_index.stats().items()):
+                print(f"{name:<{width}}{events:>10}{errors:>10}{seconds:>9.3f}")
+        elif args.count and args.command is None:
+            print(sum(1 for _ in log_index.select(None, args.status, args.since, args.until)))
+        else:
+            events = log_index.query(args.command, args.status, args.since, args.until, args.limit)
+            if args.count:
+                print(sum(1 for _ in events))
+            elif args.xml:
+                with open(args.log, 'rb') as f:
+                    for event in events:
+                        f.seek(event.offset)
+                        sys.stdout.write(f.read(event.length).decode('utf-8') + "\n")
+            else:
+                for event in events:
+                    print(event.format())
+    except (ValueError, ET.ParseError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,150 @@
 #!/usr/bin/env python3
-import sys
-import tkinter as tk
-from tkinter import scrolledtext
 import time
+# Начало отсчета для --time-startup (до импорта остальных модулей)
+STARTED = time.perf_counter()
+
+import os
+import sys
+import contextlib
 import threading
+import queue
+from collections import deque
 
-from parser import CommandParser
 from commands import CommandExecutor
 from vfs import VFS
 from logger import XMLLogger
 from config import Config
+from batch import BatchRunner
+from profiler import Profiler, StartupTimer
+
+# tkinter, asyncio и multiprocessing импортируются только режимами, которым
+# они нужны: пакетный запуск не платит за GUI и сервер
+tk = None
+scrolledtext = None
+
+def import_tk():
+    global tk, scrolledtext
+    import tkinter as tk
+    from tkinter import scrolledtext
+
+def create_logger(config):
+    return XMLLogger(
+        config.log_path,
+        flush_every=config.log_flush_every,
+        flush_interval=config.log_flush_interval,
+        max_bytes=config.log_max_bytes,
+        backup_count=config.log_backups
+    )
+
+def create_vfs(config):
+    # Тестовое дерево строится, только если его не заменит образ
+    return VFS(sample=config.vfs_path is None)
+    
+def create_profiler(config):
+    return Profiler() if config.profile else None
+
+def open_image(vfs, config):
+    """Загружает образ; с --journal восстанавливает изменения из журнала.
+
+    Возвращает открытый журнал или None.
+    """
+    if not config.journal_path:
+        if config.vfs_path:
+            vfs.load_image(config.vfs_path)
+            # В stderr: в режимах -c, --headless и --serve stdout - это вывод команд
+            print(f"VFS loaded from {config.vfs_path}", file=sys.stderr)
+        return None
+        
+    from journal import Journal
+    journal = Journal(
+        config.journal_path,
+        fsync=config.journal_fsync,
+        fsync_interval=config.journal_fsync_interval,
+        compact_every=config.journal_compact_every
+    )
+    try:
+        replayed = journal.open(vfs, config.vfs_path)
+    except ValueError as e:
+        print(f"Journal error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if replayed:
+        print(f"Replayed {replayed} operations from {config.journal_path}", file=sys.stderr)
+    return journal
+
+def close_journal(journal):
+    if journal is not None:
+        journal.close()
+
+def save_snapshot_on_exit(vfs, config):
+    if config.save_snapshot_path:
+        count = vfs.save_snapshot(config.save_snapshot_path)
+        print(f"Saved {count} nodes to {config.save_snapshot_path}", file=sys.stderr)
+
+def trim_lines(text, max_lines):
+    """Последние max_lines строк текста (неполная последняя строка тоже считается)"""
+    if text.count("\n") < max_lines:
+        return text
+    pos = len(text) - 1 if text.endswith("\n") else len(text)
+    for _ in range(max_lines):
+        pos = text.rfind("\n", 0, pos)
+        if pos < 0:
+            return text
+    return text[pos + 1:]
+
+def load_plugins(executor, config):
+    try:
+        executor.registry.load_plugins(config.plugins)
+    except Exception as e:
+        print(f"Plugin error: {e}", file=sys.stderr)
+        sys.exit(1)
 
 class VFSEmulator:
-    def __init__(self):
-        self.config = Config().parse_args()
+    FLUSH_INTERVAL_MS = 50
+    PUMP_BUDGET = 0.02  # секунд выполнения команд за один тик главного цикла
+    
+    def __init__(self, config=None, timer=None):
+        self.config = config if config is not None else Config().parse_args()
+        timer = timer if timer is not None else StartupTimer()
         
-        self.vfs = VFS()
-        self.logger = XMLLogger(self.config.log_path)
-        self.parser = CommandParser()
-        self.executor = CommandExecutor(self.vfs, self.logger)
+        self.vfs = create_vfs(self.config)
+        self.logger = create_logger(self.config)
+        self.executor = CommandExecutor(self.vfs, self.logger, profiler=create_profiler(self.config))
+        load_plugins(self.executor, self.config)
+        self.journal = open_image(self.vfs, self.config)
+        timer.mark("image")
         
-        if self.config.vfs_path:
-            self.vfs.load_from_json(self.config.vfs_path)
+        from completion import Completer, History
+        self.completer = Completer(self.vfs, self.executor.registry)
+        self.history = History(self.config.history_path, self.config.history_size)
+        # Строка, для которой Tab уже дополнил общий префикс: второй Tab выводит варианты
+        self.completion_text = None
             
+        import_tk()
         self.root = tk.Tk()
         self.root.title("VFS Emulator - Virtual File System")
         self.root.geometry("800x600")
         
+        # Команды выполняются по очереди, вывод каждой выдается блоками
+        self.command_queue = deque()
+        self.active_output = None
+        self.pump_scheduled = False
+        # Строки скрипта из фонового потока; забираются главным потоком по таймеру
+        self.script_queue = queue.Queue()
+        # Накопленный вывод, который вставляется в виджет одной операцией
+        self.pending_output = []
+        self.pending_lines = 0
+        self.flush_scheduled = False
+        # cProfile запуска скрипта (--profile-dump)
+        self.script_profile = None
+        
         self.setup_gui()
+        self.root.after(self.FLUSH_INTERVAL_MS, self.poll_script_queue)
         
         if self.config.script_path:
             self.root.after(100, lambda: self.execute_script(self.config.script_path))
+        timer.mark("gui")
+        if self.config.time_startup:
+            timer.report()
         
     def setup_gui(self):
         # Output area
@@ -50,6 +164,9 @@ class VFSEmulator:
         self.input_entry = tk.Entry(self.input_frame, width=70, font=("Courier New", 10))
         self.input_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
         self.input_entry.bind('<Return>', self.execute_command)
+        self.input_entry.bind('<Up>', self.history_previous)
+        self.input_entry.bind('<Down>', self.history_next)
+        self.input_entry.bind('<Tab>', self.complete_input)
         self.input_entry.focus_set()
         
         self.output_area.config(state=tk.DISABLED)
@@ -63,21 +180,108 @@ class VFSEmulator:
         if command_text is None:
             command_text = self.input_entry.get()
             self.input_entry.delete(0, tk.END)
+            self.history.add(command_text)
+        
+        self.command_queue.append(command_text)
+        if self.active_output is None and not self.pump_scheduled:
+            self.pump_output()
+            
+    def set_input(self, text, cursor=None):
+        self.input_entry.delete(0, tk.END)
+        self.input_entry.insert(0, text)
+        self.input_entry.icursor(len(text) if cursor is None else cursor)
         
-        self.display_output(f"$ {command_text}\n")
+    def history_previous(self, event=None):
+        self.set_input(self.history.previous(self.input_entry.get()))
+        return "break"
         
-        try:
-            command, args = self.parser.parse(command_text)
-            if command == "exit":
-                self.root.quit()
-                return
+    def history_next(self, event=None):
+        self.set_input(self.history.next())
+        return "break"
+        
+    def complete_input(self, event=None):
+        text = self.input_entry.get()
+        cursor = self.input_entry.index(tk.INSERT)
+        completion = self.completer.complete(text, cursor)
+        if completion is None:
+            self.root.bell()
+            return "break"
+            
+        completed = completion.apply(text)
+        if completed != text:
+            self.set_input(completed, completion.start + len(completion.replacement))
+            self.completion_text = completed if completion.total > 1 else None
+        elif self.completion_text == text:
+            listing = "  ".join(completion.candidates)
+            if completion.total > len(completion.candidates):
+                listing += f"  ... ({completion.total - len(completion.candidates)} more)"
+            self.display_output(listing + "\n")
+        else:
+            self.completion_text = text
+            self.root.bell()
+        return "break"
+        
+    def run_command(self, command_text):
+        yield f"$ {command_text}\n"
+        
+        for chunk in self.executor.execute_line_iter(command_text):
+            yield chunk
+            
+        if self.executor.exit_requested:
+            self.root.quit()
+            return
+        yield "\n\n"
+        
+    def pump_output(self):
+        # Команды и блоки вывода обрабатываются в пределах бюджета времени,
+        # после чего управление возвращается главному циклу Tk
+        self.pump_scheduled = False
+        deadline = time.perf_counter() + self.PUMP_BUDGET
+        while time.perf_counter() < deadline:
+            if self.active_output is None:
+                if not self.command_queue:
+                    return
+                item = self.command_queue.popleft()
+                # В очереди - текст команды, готовый вывод (кортеж строк)
+                # или функция, вызываемая после предыдущих команд
+                if callable(item):
+                    item()
+                    continue
+                self.active_output = self.run_command(item) if isinstance(item, str) else iter(item)
                 
-            result = self.executor.execute(command, args)
-            self.display_output(result + "\n\n")
-        except Exception as e:
-            self.display_output(f"Error: {str(e)}\n\n")
+            chunk = next(self.active_output, None)
+            if chunk is None:
+                self.active_output = None
+            else:
+                self.display_output(chunk)
+                
+        if self.active_output is not None or self.command_queue:
+            self.pump_scheduled = True
+            self.root.after(1, self.pump_output)
+            
+    def poll_script_queue(self):
+        try:
+            while True:
+                kind, text = self.script_queue.get_nowait()
+                # Сообщения скрипта встают в ту же очередь, чтобы не обгонять вывод команд
+                if kind == "done":
+                    self.command_queue.append(self.finish_script_profile)
+                else:
+                    self.command_queue.append(text if kind == "command" else (text,))
+        except queue.Empty:
+            pass
+            
+        if self.command_queue and self.active_output is None and not self.pump_scheduled:
+            self.pump_output()
+        self.root.after(self.FLUSH_INTERVAL_MS, self.poll_script_queue)
             
     def execute_script(self, script_path):
+        # Команды скрипта выполняются в главном потоке - там и включается cProfile
+        if self.config.profile_dump_path and self.script_profile is None:
+            import cProfile
+            self.script_profile = cProfile.Profile()
+            self.script_profile.enable()
+            
         def run_script():
             try:
                 with open(script_path, 'r', encoding='utf-8') as f:
@@ -86,23 +290,196 @@ class VFSEmulator:
                 for line in lines:
                     line = line.strip()
                     if line and not line.startswith('#'):
-                        self.root.after(0, lambda l=line: self.execute_command(command_text=l))
-                        time.sleep(0.3)
+                        self.script_queue.put(("command", line))
+                        if self.config.script_delay:
+                            time.sleep(self.config.script_delay)
                         
             except Exception as e:
-                self.root.after(0, lambda: self.display_output(f"Script error: {str(e)}\n"))
+                self.script_queue.put(("output", f"Script error: {str(e)}\n"))
+            self.script_queue.put(("done", None))
                 
         threading.Thread(target=run_script, daemon=True).start()
             
+    def finish_script_profile(self):
+        if self.script_profile is not None:
+            self.script_profile.disable()
+            self.script_profile.dump_stats(self.config.profile_dump_path)
+            self.script_profile = None
+            self.display_output(f"Profile saved to {self.config.profile_dump_path}\n\n")
+            
     def display_output(self, text):
+        self.pending_output.append(text)
+        self.pending_lines += text.count("\n")
+        limit = self.config.scrollback_lines
+        if self.pending_lines > 2 * limit:
+            # До виджета дойдут только последние строки - остальное не копим
+            self.pending_output = [trim_lines("".join(self.pending_output), limit)]
+            self.pending_lines = limit
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.root.after(self.FLUSH_INTERVAL_MS, self.flush_output)
+            
+    def flush_output(self):
+        self.flush_scheduled = False
+        if not self.pending_output:
+            return
+        # Пачка длиннее прокрутки обрезается до вставки, а не после
+        text = trim_lines("".join(self.pending_output), self.config.scrollback_lines)
+        self.pending_output = []
+        self.pending_lines = 0
+        
         self.output_area.config(state=tk.NORMAL)
         self.output_area.insert(tk.END, text)
+        # Ограничиваем прокрутку: старые строки удаляются
+        line_count = int(self.output_area.index('end-1c').split('.')[0])
+        excess = line_count - self.config.scrollback_lines
+        if excess > 0:
+            self.output_area.delete('1.0', f'{excess + 1}.0')
         self.output_area.see(tk.END)
         self.output_area.config(state=tk.DISABLED)
         
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+            save_snapshot_on_exit(self.vfs, self.config)
+        finally:
+            close_journal(self.journal)
+            self.logger.close()
+
+def run_headless(config, timer=None):
+    timer = timer if timer is not None else StartupTimer()
+    vfs = create_vfs(config)
+    logger = create_logger(config)
+    
+    # Сообщения загрузки не должны смешиваться с результатами команд
+    with contextlib.redirect_stdout(sys.stderr):
+        journal = open_image(vfs, config)
+    timer.mark("image")
+        
+    one_shot = config.command_text is not None
+    output = open(config.output_path, 'w', encoding='utf-8') if config.output_path else sys.stdout
+    runner = BatchRunner(vfs, logger, output=output, stop_on_error=config.stop_on_error,
+                         profiler=create_profiler(config), profile_path=config.profile_dump_path,
+                         echo=not one_shot)
+    load_plugins(runner.executor, config)
+    timer.mark("ready")
+    try:
+        if one_shot:
+            status = runner.run_lines([config.command_text])
+        elif config.script_path:
+            status = runner.run_script(config.script_path)
+        else:
+            status = runner.run_lines(sys.stdin)
+        timer.mark("run")
+        save_snapshot_on_exit(vfs, config)
+    finally:
+        close_journal(journal)
+        logger.close()
+        if output is not sys.stdout:
+            output.close()
+            
+    # Однострочный запуск (-c) выводит только результат команды
+    if not one_shot:
+        runner.report()
+    if config.time_startup:
+        timer.report()
+    return status
+    
+def run_replay(config, timer=None):
+    from logtool import replay
+    
+    timer = timer if timer is not None else StartupTimer()
+    if config.log_path == config.replay_path:
+        # Лог воспроизведения не должен затереть воспроизводимый лог
+        base, ext = os.path.splitext(config.replay_path)
+        config.log_path = f"{base}.replay{ext}"
+        print(f"Logging replay to {config.log_path}", file=sys.stderr)
+        
+    vfs = create_vfs(config)
+    logger = create_logger(config)
+    with contextlib.redirect_stdout(sys.stderr):
+        journal = open_image(vfs, config)
+    timer.mark("image")
+    
+    output = open(config.output_path, 'w', encoding='utf-8') if config.output_path else sys.stdout
+    runner = BatchRunner(vfs, logger, output=output, profiler=create_profiler(config))
+    load_plugins(runner.executor, config)
+    timer.mark("ready")
+    start = time.perf_counter()
+    try:
+        diverged = replay(config.replay_path, runner)
+        runner.elapsed = time.perf_counter() - start
+        timer.mark("run")
+        save_snapshot_on_exit(vfs, config)
+    finally:
+        close_journal(journal)
+        logger.close()
+        if output is not sys.stdout:
+            output.close()
+        else:
+            output.flush()
+            
+    runner.report()
+    print(f"{diverged} lines diverged from {config.replay_path}", file=sys.stderr)
+    if config.time_startup:
+        timer.report()
+    return 1 if diverged else 0
+    
+def run_parallel(config):
+    from parallel import ParallelRunner, collect_scripts
+    scripts = collect_scripts(config.script_patterns)
+    if not scripts:
+        print("No scripts found", file=sys.stderr)
+        return 1
+        
+    runner = ParallelRunner(config.vfs_path, config.results_dir, config.jobs, config.stop_on_error)
+    with contextlib.redirect_stdout(sys.stderr):
+        status = runner.run(scripts)
+    runner.report()
+    return status
+
+def run_server(config, timer=None):
+    import asyncio
+    from server import VFSServer
+    
+    timer = timer if timer is not None else StartupTimer()
+    vfs = create_vfs(config)
+    logger = create_logger(config)
+    journal = open_image(vfs, config)
+    timer.mark("image")
+    
+    server = VFSServer(vfs, logger, profiler=create_profiler(config), host_files=config.serve_host_files)
+    load_plugins(server, config)
+    timer.mark("ready")
+    if config.time_startup:
+        timer.report()
+    try:
+        asyncio.run(server.serve_forever(config.serve_address))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        save_snapshot_on_exit(vfs, config)
+        close_journal(journal)
+        logger.close()
+    print(f"Served {server.commands_run} commands", file=sys.stderr)
+    return 0
+    
+def main():
+    timer = StartupTimer(STARTED)
+    timer.mark("imports")
+    config = Config().parse_args()
+    timer.mark("config")
+    if config.serve_address:
+        sys.exit(run_server(config, timer))
+    if config.replay_path:
+        sys.exit(run_replay(config, timer))
+    if config.script_patterns:
+        sys.exit(run_parallel(config))
+    if config.headless or config.command_text is not None:
+        sys.exit(run_headless(config, timer))
+        
+    emulator = VFSEmulator(config, timer)
+    emulator.run()
 
 if __name__ == "__main__":
-    emulator = VFSEmulator()
-    emulator.run()
\ No newline at end of file
+    main()
\ No newline at end of file
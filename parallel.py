@@ -0,0 +1,199 @@
+import gc
+import glob
+import multiprocessing
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+from batch import BatchRunner
+from logger import XMLLogger
+from vfs import VFS
+
+# Образ, загруженный в родительском процессе до запуска пула. Рабочие
+# процессы получают его через fork (copy-on-write) и не разбирают образ заново
+_shared_vfs = None
+# Снапшот исходного образа: после каждого скрипта рабочий процесс откатывается к нему
+PRISTINE_SNAPSHOT = "@pristine"
+
+def collect_scripts(patterns):
+    """Файлы скриптов по списку каталогов и glob-шаблонов (без повторов, по порядку)"""
+    scripts = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in sorted(os.listdir(pattern))]
+        else:
+            matches = sorted(glob.glob(pattern))
+        for path in matches:
+            path = os.path.abspath(path)
+            if os.path.isfile(path) and path not in seen:
+                seen.add(path)
+                scripts.append(path)
+    return scripts
+
+def _result_names(scripts):
+    """Уникальные имена файлов результатов по именам скриптов"""
+    names = []
+    used = set()
+    for path in scripts:
+        base = os.path.splitext(os.path.basename(path))[0]
+        name = base
+        suffix = 1
+        while name in used:
+            suffix += 1
+            name = f"{base}_{suffix}"
+        used.add(name)
+        names.append(name)
+    return names
+
+def _load_vfs(image_path):
+    # Тестовое дерево не строится, если его сразу заменит образ
+    vfs = VFS(sample=image_path is None)
+    if image_path:
+        vfs.load_image(image_path)
+    vfs.create_snapshot(PRISTINE_SNAPSHOT)
+    return vfs
+
+def _worker_vfs(image_path):
+    global _shared_vfs
+    if _shared_vfs is None:
+        # Без fork (spawn) образ загружается один раз в каждом рабочем процессе
+        _shared_vfs = _load_vfs(image_path)
+    return _shared_vfs
+
+def run_script_task(task):
+    """Выполняет один скрипт в рабочем процессе и возвращает сводку по нему"""
+    index, script_path, log_path, output_path, image_path, stop_on_error = task
+    result = {
+        "index": index,
+        "script": script_path,
+        "log": log_path,
+        "output": output_path,
+        "status": 1,
+        "commands": 0,
+        "errors": 0,
+        "elapsed": 0.0,
+        "message": "",
+    }
+    try:
+        vfs = _worker_vfs(image_path)
+        logger = XMLLogger(log_path)
+        try:
+            with open(output_path, 'w', encoding='utf-8') as output:
+                runner = BatchRunner(vfs, logger, output=output, stop_on_error=stop_on_error)
+                result["status"] = runner.run_script(script_path)
+        finally:
+            logger.close()
+            # Изменения скрипта отменяются за O(измененных узлов)
+            vfs.rollback(PRISTINE_SNAPSHOT)
+        result["commands"] = runner.commands_run
+        result["errors"] = runner.errors
+        result["elapsed"] = runner.elapsed
+    except Exception as e:
+        result["message"] = str(e)
+    return result
+
+class ParallelRunner:
+    """Выполняет независимые скрипты в пуле процессов.
+
+    Рабочие процессы создаются fork от процесса с загруженным образом, а
+    после каждого скрипта откатывают образ к исходному снапшоту, поэтому
+    изменения одного скрипта не видны другим.
+    """
+
+    SUMMARY_NAME = "summary.xml"
+
+    def __init__(self, image_path=None, results_dir="results", jobs=None, stop_on_error=False):
+        self.image_path = image_path
+        self.results_dir = results_dir
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.stop_on_error = stop_on_error
+
+        self.results = []
+        self.elapsed = 0.0
+
+    def run(self, scripts):
+        global _shared_vfs
+        os.makedirs(self.results_dir, exist_ok=True)
+        tasks = [
+            (index, script,
+             os.path.join(self.results_dir, f"{name}.log"),
+             os.path.join(self.results_dir, f"{name}.out"),
+             self.image_path, self.stop_on_error)
+            for index, (script, name) in enumerate(zip(scripts, _result_names(scripts)))
+        ]
+
+        start = time.perf_counter()
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+            _shared_vfs = _load_vfs(self.image_path)
+            # Объекты образа не трогает сборщик мусора, и страницы памяти
+            # остаются общими с рабочими процессами
+            gc.freeze()
+        else:
+            context = multiprocessing.get_context()
+
+        try:
+            with context.Pool(min(self.jobs, len(tasks) or 1)) as pool:
+                results = list(pool.imap_unordered(run_script_task, tasks))
+        finally:
+            _shared_vfs = None
+            gc.unfreeze()
+
+        self.elapsed = time.perf_counter() - start
+        self.results = sorted(results, key=lambda result: result["index"])
+        self.write_summary()
+        return self.exit_status()
+
+    def exit_status(self):
+        return 1 if any(result["status"] for result in self.results) else 0
+
+    def totals(self):
+        script_seconds = sum(result["elapsed"] for result in self.results)
+        return {
+            "scripts": len(self.results),
+            "failed": sum(1 for result in self.results if result["status"]),
+            "commands": sum(result["commands"] for result in self.results),
+            "errors": sum(result["errors"] for result in self.results),
+            "elapsed": self.elapsed,
+            "script_seconds": script_seconds,
+            "jobs": self.jobs,
+        }
+
+    def write_summary(self):
+        summary = ET.Element("vfs_run_summary")
+        for key, value in self.totals().items():
+            summary.set(key, f"{value:.6f}" if isinstance(value, float) else str(value))
+
+        for result in self.results:
+            script = ET.SubElement(summary, "script")
+            script.set("path", result["script"])
+            script.set("status", "success" if result["status"] == 0 else "error")
+            for key in ("commands", "errors"):
+                script.set(key, str(result[key]))
+            script.set("elapsed", f"{result['elapsed']:.6f}")
+            script.set("log", result["log"])
+            script.set("output", result["output"])
+            if result["message"]:
+                message = ET.SubElement(script, "message")
+                message.text = result["message"]
+
+        path = os.path.join(self.results_dir, self.SUMMARY_NAME)
+        ET.ElementTree(summary).write(path, encoding="utf-8", xml_declaration=True)
+        return path
+
+    def report(self, stream=None):
+        stream = stream if stream is not None else sys.stderr
+        totals = self.totals()
+        speedup = totals["script_seconds"] / self.elapsed if self.elapsed > 0 else 0.0
+        for result in self.results:
+            if result["status"]:
+                detail = result["message"] or f"{result['errors']} errors"
+                stream.write(f"FAILED {result['script']}: {detail}\n")
+        stream.write(
+            f"{totals['scripts']} scripts ({totals['failed']} failed), "
+            f"{totals['commands']} commands, {totals['errors']} errors, "
+            f"{self.elapsed:.3f}s on {self.jobs} jobs (speedup {speedup:.1f}x), "
+            f"summary in {os.path.join(self.results_dir, self.SUMMARY_NAME)}\n"
+        )
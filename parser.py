@@ -1,14 +1,266 @@
 import shlex
 
+OPERATORS = ("&&", ">>", "|", ">", ";")
+GLOB_CHARS = "*?["
+
+class GlobWord(str):
+    """Слово с * ? [ вне кавычек; pattern - шаблон, где символы из кавычек экранированы"""
+
+    def __new__(cls, text, pattern):
+        word = super().__new__(cls, text)
+        word.pattern = pattern
+        return word
+
+def escape_glob(text):
+    """Экранирует * ? [ для fnmatch: символы из кавычек сопоставляются буквально"""
+    if not any(char in text for char in GLOB_CHARS):
+        return text
+    return "".join(f"[{char}]" if char in GLOB_CHARS else char for char in text)
+
+class Pipeline:
+    """Команды, соединенные через |, и необязательное перенаправление вывода"""
+    def __init__(self, text=None):
+        self.stages = []
+        self.redirect = None  # (">" или ">>", путь в VFS)
+        self.text = text  # исходный текст конвейера (для отложенной подстановки $(...))
+
 class CommandParser:
     def parse(self, input_text):
         if not input_text.strip():
             raise ValueError("Empty command")
-            
+
         try:
             parts = shlex.split(input_text)
             command = parts[0].lower()
             args = parts[1:] if len(parts) > 1 else []
             return command, args
         except ValueError as e:
-            raise ValueError(f"Parse error: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Parse error: {str(e)}")
+
+    def parse_line(self, input_text):
+        """Разбирает строку с |, >, >>, ; и && в список (связка, Pipeline).
+
+        Связка первого конвейера - None, остальных - ";" или "&&". Синтаксис
+        проверяется для всей строки сразу, но $(...) не выполняются: конвейер
+        с подстановкой разбирается заново через parse_pipeline перед запуском,
+        когда предыдущие команды строки уже выполнены.
+        """
+        if not input_text.strip():
+            raise ValueError("Empty command")
+
+        sequence = []
+        segments = self.split_sequence(input_text)
+        for index, (connector, text) in enumerate(segments):
+            if not text.strip():
+                following = segments[index + 1][0] if index + 1 < len(segments) else None
+                if "&&" in (connector, following):
+                    raise ValueError("Parse error: empty command near &&")
+                continue
+            sequence.append((connector, self.parse_pipeline(text)))
+
+        if not sequence:
+            raise ValueError("Empty command")
+        return sequence
+
+    def split_sequence(self, text):
+        """Делит строку по ; и && вне кавычек и $(...): список (связка, текст конвейера)"""
+        segments = []
+        connector = None
+        start = 0
+        i = 0
+        n = len(text)
+        while i < n:
+            ch = text[i]
+            if ch == "\\":
+                i += 2
+            elif ch == "'":
+                end = text.find("'", i + 1)
+                if end < 0:
+                    raise ValueError("Parse error: No closing quotation")
+                i = end + 1
+            elif ch == '"':
+                i = self._skip_double_quoted(text, i)
+            elif text.startswith("$(", i):
+                _, i = self._read_substitution(text, i)
+            elif ch == ";" or text.startswith("&&", i):
+                segments.append((connector, text[start:i]))
+                connector = "&&" if ch == "&" else ";"
+                i += len(connector)
+                start = i
+            else:
+                i += 1
+        segments.append((connector, text[start:]))
+        return segments
+
+    def _skip_double_quoted(self, text, start):
+        """Позиция после строки в двойных кавычках, начинающейся с start"""
+        i = start + 1
+        while i < len(text):
+            ch = text[i]
+            if ch == '"':
+                return i + 1
+            if ch == "\\":
+                i += 2
+            elif text.startswith("$(", i):
+                _, i = self._read_substitution(text, i)
+            else:
+                i += 1
+        raise ValueError("Parse error: No closing quotation")
+
+    def parse_pipeline(self, text, substitute=None):
+        """Разбирает один конвейер (без ; и &&) в Pipeline.
+
+        substitute(text) выполняет $(...) и возвращает вывод команды; без него
+        подстановка остается в слове как есть (только проверка синтаксиса).
+        """
+        pipeline = Pipeline(text)
+        words = []
+        redirect_op = None
+
+        # None в конце завершает последнюю команду
+        for token, is_operator in self.tokenize(text, substitute) + [(None, True)]:
+            if redirect_op:
+                if is_operator:
+                    raise ValueError(f"Parse error: missing file name after {redirect_op}")
+                pipeline.redirect = (redirect_op, token)
+                redirect_op = None
+            elif not is_operator:
+                if pipeline.redirect:
+                    raise ValueError("Parse error: arguments after redirection")
+                words.append(token)
+            elif token in (">", ">>", "|"):
+                if pipeline.redirect:
+                    raise ValueError(f"Parse error: unexpected {token} after redirection")
+                self._add_stage(pipeline, words)
+                words = []
+                if token != "|":
+                    redirect_op = token
+            elif words or not pipeline.redirect:
+                self._add_stage(pipeline, words)
+                words = []
+        return pipeline
+
+    def _add_stage(self, pipeline, words):
+        if not words:
+            raise ValueError("Parse error: empty command in pipeline")
+        pipeline.stages.append((words[0].lower(), words[1:]))
+
+    def tokenize(self, text, substitute=None):
+        """Делит строку на слова и операторы (кавычки и \\ как в POSIX shell).
+
+        Возвращает список пар (текст, является ли оператором); операторы внутри
+        кавычек остаются частью слова.
+        """
+        tokens = []
+        word = []
+        # Слово как glob-шаблон; строится, только если в слове есть * ? [ вне кавычек
+        pattern = None
+        in_word = False
+        i = 0
+        n = len(text)
+
+        def finish():
+            nonlocal pattern
+            if in_word:
+                value = "".join(word)
+                tokens.append((GlobWord(value, "".join(pattern)) if pattern is not None else value, False))
+            word.clear()
+            pattern = None
+            return False
+
+        def add_literal(part):
+            word.append(part)
+            if pattern is not None:
+                pattern.append(escape_glob(part))
+
+        while i < n:
+            ch = text[i]
+            if ch.isspace():
+                in_word = finish()
+                i += 1
+            elif ch == "'":
+                end = text.find("'", i + 1)
+                if end < 0:
+                    raise ValueError("Parse error: No closing quotation")
+                add_literal(text[i + 1:end])
+                in_word = True
+                i = end + 1
+            elif ch == '"':
+                i += 1
+                while True:
+                    if i >= n:
+                        raise ValueError("Parse error: No closing quotation")
+                    ch = text[i]
+                    if ch == '"':
+                        i += 1
+                        break
+                    if ch == "\\" and i + 1 < n and text[i + 1] in '"\\$':
+                        add_literal(text[i + 1])
+                        i += 2
+                    elif text.startswith("$(", i):
+                        start = i
+                        inner, i = self._read_substitution(text, i)
+                        add_literal(substitute(inner).rstrip("\n") if substitute else text[start:i])
+                    else:
+                        add_literal(ch)
+                        i += 1
+                in_word = True
+            elif ch == "\\":
+                if i + 1 < n:
+                    add_literal(text[i + 1])
+                in_word = True
+                i += 2
+            elif text.startswith("$(", i):
+                start = i
+                inner, i = self._read_substitution(text, i)
+                # Без кавычек результат подстановки делится на слова
+                parts = substitute(inner).split() if substitute else [text[start:i]]
+                for index, part in enumerate(parts):
+                    if index:
+                        in_word = finish()
+                    add_literal(part)
+                    in_word = True
+            else:
+                for operator in OPERATORS:
+                    if text.startswith(operator, i):
+                        in_word = finish()
+                        tokens.append((operator, True))
+                        i += len(operator)
+                        break
+                else:
+                    if ch == "&":
+                        raise ValueError("Parse error: unsupported operator &")
+                    if ch in GLOB_CHARS and pattern is None:
+                        pattern = [escape_glob("".join(word))]
+                    word.append(ch)
+                    if pattern is not None:
+                        pattern.append(ch)
+                    in_word = True
+                    i += 1
+
+        if in_word:
+            finish()
+        return tokens
+
+    def _read_substitution(self, text, start):
+        """Возвращает содержимое $(...) и позицию после закрывающей скобки"""
+        depth = 0
+        quote = None
+        i = start + 1
+        while i < len(text):
+            ch = text[i]
+            if quote:
+                if ch == quote:
+                    quote = None
+                elif ch == "\\" and quote == '"':
+                    i += 1
+            elif ch in "'\"":
+                quote = ch
+            elif ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+                if depth == 0:
+                    return text[start + 2:i], i + 1
+            i += 1
+        raise ValueError("Parse error: unterminated $(")
@@ -0,0 +1,162 @@
+import contextlib
+import functools
+import sys
+import time
+from collections import deque
+
+# Операции VFS, которые инструментируются при включенном профилировании
+VFS_OPERATIONS = (
+    "resolve",
+    "iter_children",
+    "list_directory",
+    "calculate_size",
+    "find",
+    "compute_aggregates",
+    "move_node",
+    "write_file",
+    "load_image",
+    "save_snapshot",
+)
+
+class LatencyHistogram:
+    """Скользящее окно последних замеров одной операции (секунды)"""
+
+    def __init__(self, window=1000):
+        self.wall = deque(maxlen=window)
+        self.cpu = deque(maxlen=window)
+        self.count = 0
+        self.total_wall = 0.0
+        self.total_cpu = 0.0
+
+    def add(self, wall, cpu):
+        self.wall.append(wall)
+        self.cpu.append(cpu)
+        self.count += 1
+        self.total_wall += wall
+        self.total_cpu += cpu
+
+    def percentiles(self, samples, quantiles=(50, 95, 99)):
+        """Перцентили по ближайшему рангу для последних замеров окна"""
+        ordered = sorted(samples)
+        if not ordered:
+            return [0.0 for _ in quantiles]
+        last = len(ordered) - 1
+        return [ordered[min(last, max(0, -(-q * len(ordered) // 100) - 1))] for q in quantiles]
+
+class Profiler:
+    """Замеры времени (wall и CPU потока) команд и внутренних операций VFS.
+
+    Команды записываются под своим именем, операции VFS - с префиксом "vfs.".
+    """
+
+    COLUMNS = ("count", "p50", "p95", "p99", "cpu p50", "cpu p95", "cpu p99", "total s")
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.histograms = {}
+
+    def record(self, name, wall, cpu):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram(self.window)
+        histogram.add(wall, cpu)
+
+    def instrument(self, vfs):
+        """Подменяет методы экземпляра VFS обертками с замером времени.
+
+        Класс не меняется, поэтому другие экземпляры VFS работают без накладных расходов.
+        """
+        if getattr(vfs, "_profiler", None) is self:
+            return
+        vfs._profiler = self
+        for operation in VFS_OPERATIONS:
+            method = getattr(vfs, operation, None)
+            if method is not None:
+                setattr(vfs, operation, self._wrap(f"vfs.{operation}", method))
+
+    def _wrap(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            result = method(*args, **kwargs)
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            if hasattr(result, "__next__"):
+                # Ленивый результат: учитывается и время, потраченное на его чтение
+                return self._timed_iter(name, result, wall, cpu)
+            self.record(name, wall, cpu)
+            return result
+        return wrapper
+
+    def _timed_iter(self, name, iterator, wall, cpu):
+        try:
+            while True:
+                wall_start = time.perf_counter()
+                cpu_start = time.thread_time()
+                try:
+                    item = next(iterator)
+                finally:
+                    wall += time.perf_counter() - wall_start
+                    cpu += time.thread_time() - cpu_start
+                yield item
+        except StopIteration:
+            return
+        finally:
+            self.record(name, wall, cpu)
+
+    def reset(self):
+        self.histograms.clear()
+
+    def report(self, pattern=None):
+        """Таблица перцентилей в миллисекундах: сначала команды, затем операции VFS"""
+        names = [name for name in self.histograms if pattern is None or pattern in name]
+        if not names:
+            return "No samples recorded"
+        names.sort(key=lambda name: (name.startswith("vfs."), name))
+
+        width = max(len("operation"), max(len(name) for name in names)) + 2
+        lines = [f"{'operation':<{width}}" + "".join(f"{column:>10}" for column in self.COLUMNS)]
+        for name in names:
+            histogram = self.histograms[name]
+            values = [histogram.count]
+            values += [f"{value * 1000:.3f}" for value in histogram.percentiles(histogram.wall)]
+            values += [f"{value * 1000:.3f}" for value in histogram.percentiles(histogram.cpu)]
+            values.append(f"{histogram.total_wall:.3f}")
+            lines.append(f"{name:<{width}}" + "".join(f"{value:>10}" for value in values))
+        lines.append(f"(times in ms over the last {self.window} samples per operation)")
+        return "\n".join(lines)
+
+@contextlib.contextmanager
+def cprofile_to(path):
+    """Профилирует блок через cProfile и сохраняет статистику в path (pstats)"""
+    if not path:
+        yield None
+        return
+    import cProfile
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+
+class StartupTimer:
+    """Отметки этапов запуска (--time-startup): длительность каждого этапа от предыдущей отметки"""
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.marks = []
+
+    def mark(self, phase):
+        self.marks.append((phase, time.perf_counter()))
+
+    def report(self, stream=None):
+        stream = stream if stream is not None else sys.stderr
+        previous = self.start
+        phases = []
+        for phase, moment in self.marks:
+            phases.append(f"{phase} {(moment - previous) * 1000:.1f}ms")
+            previous = moment
+        stream.write(f"startup: {', '.join(phases)}; total {(previous - self.start) * 1000:.1f}ms\n")
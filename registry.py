@@ -0,0 +1,237 @@
+import importlib
+import os
+import sys
+
+ENTRY_POINT_GROUP = "vfs_emulator.commands"
+HELP_COLUMN = 23
+
+def _help_rows(rows, separator):
+    """Выровненные строки справки "текст  - описание".
+
+    Колонка расширяется под самый длинный текст секции, так что перед
+    разделителем всегда есть пробел.
+    """
+    width = max([HELP_COLUMN] + [len(text) + 1 for text, _ in rows])
+    return [f"{text:<{width}}{separator} {description}" for text, description in rows]
+
+def _declares_entry_points(group):
+    """Упоминает ли группу entry_points.txt какого-либо дистрибутива в sys.path.
+
+    Импорт importlib.metadata стоит десятки миллисекунд на каждом запуске, а
+    плагины обычно не установлены; полный поиск нужен, только если группа
+    где-то объявлена. Архивы в sys.path не просматриваются - для них True.
+    """
+    marker = f"[{group}]"
+    for entry in sys.path:
+        entry = entry or "."
+        if not os.path.isdir(entry):
+            if os.path.isfile(entry):
+                return True
+            continue
+        try:
+            names = os.listdir(entry)
+        except OSError:
+            continue
+        for name in names:
+            if name.endswith((".dist-info", ".egg-info")):
+                path = os.path.join(entry, name, "entry_points.txt")
+            elif name.endswith(".egg"):
+                path = os.path.join(entry, name, "EGG-INFO", "entry_points.txt")
+            else:
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    if marker in f.read():
+                        return True
+            except OSError:
+                pass
+    return False
+
+class ParsedArgs:
+    """Результат разбора аргументов команды по ее ArgSpec"""
+
+    def __init__(self, raw, flags, options, positional):
+        self.raw = raw
+        self.flags = flags
+        self.options = options
+        self.positional = positional
+        # Строки со стандартного ввода (предыдущая команда конвейера) или None
+        self.input = None
+        # Вывод уходит в конвейер или файл, а не на экран
+        self.piped = False
+
+    def __getitem__(self, index):
+        return self.positional[index]
+
+    def __len__(self):
+        return len(self.positional)
+
+    def __iter__(self):
+        return iter(self.positional)
+
+    def get(self, index, default=None):
+        return self.positional[index] if index < len(self.positional) else default
+
+class ArgSpec:
+    """Описание аргументов команды, разбираемых один раз при вызове.
+
+    flags - допустимые короткие флаги ("laR" разрешает -l, -a, -R и -la);
+    options - длинные опции {"--limit": int, "--verify": None}, где None
+    означает переключатель без значения; raw - аргументы не разбираются.
+    """
+
+    def __init__(self, flags="", options=None, min_args=0, max_args=None, raw=False):
+        self.flags = frozenset(flags)
+        self.options = dict(options or {})
+        self.min_args = min_args
+        self.max_args = max_args
+        self.raw = raw
+
+    def parse(self, args, usage):
+        if self.raw:
+            return ParsedArgs(args, frozenset(), {}, list(args))
+
+        flags = set()
+        options = {name.lstrip('-').replace('-', '_'): None for name in self.options}
+        positional = []
+
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            if arg == '--':
+                positional.extend(args[i + 1:])
+                break
+            if arg.startswith('--'):
+                name, has_value, value = arg.partition('=')
+                if name not in self.options:
+                    raise ValueError(f"Unknown option: {name}")
+                convert = self.options[name]
+                key = name[2:].replace('-', '_')
+                if convert is None:
+                    if has_value:
+                        raise ValueError(f"Option {name} does not take a value")
+                    options[key] = True
+                else:
+                    if not has_value:
+                        i += 1
+                        if i >= len(args):
+                            raise ValueError(f"Option {name} requires a value")
+                        value = args[i]
+                    try:
+                        options[key] = convert(value)
+                    except ValueError:
+                        raise ValueError(f"Invalid value for {name}: {value}")
+            elif arg.startswith('-') and len(arg) > 1 and self.flags:
+                unknown = set(arg[1:]) - self.flags
+                if unknown:
+                    raise ValueError(f"Unknown option: -{''.join(sorted(unknown))}")
+                flags.update(arg[1:])
+            else:
+                positional.append(arg)
+            i += 1
+
+        if len(positional) < self.min_args or \
+                (self.max_args is not None and len(positional) > self.max_args):
+            raise ValueError(f"Usage: {usage}")
+        return ParsedArgs(args, frozenset(flags), options, positional)
+
+class Command:
+    def __init__(self, name, handler, usage=None, help="", spec=None, option_help=(), examples=(),
+                 mutates=False, host_files=False):
+        self.name = name
+        self.handler = handler
+        self.usage = usage or name
+        self.help = help
+        self.spec = spec or ArgSpec()
+        self.option_help = list(option_help)
+        self.examples = list(examples)
+        # Команда меняет дерево VFS (сервер выполняет ее под блокировкой записи)
+        self.mutates = mutates
+        # Команда читает или пишет файлы хост-системы (сервер по умолчанию ее не дает)
+        self.host_files = host_files
+
+    def __call__(self, executor, args, input=None, piped=False):
+        parsed = self.spec.parse(args, self.usage)
+        parsed.input = input
+        parsed.piped = piped
+        return self.handler(executor, parsed)
+
+class CommandRegistry:
+    """Таблица команд: имя -> Command, диспетчеризация одним поиском в словаре"""
+
+    def __init__(self):
+        self._commands = {}
+
+    def register(self, command):
+        self._commands[command.name] = command
+        return command
+
+    def command(self, name, usage=None, help="", option_help=(), examples=(), mutates=False, host_files=False,
+                **spec):
+        """Декоратор: регистрирует функцию handler(executor, args) как команду"""
+        def decorator(handler):
+            self.register(Command(name, handler, usage, help, ArgSpec(**spec), option_help, examples, mutates,
+                                  host_files))
+            return handler
+        return decorator
+
+    def get(self, name):
+        return self._commands.get(name)
+
+    def __contains__(self, name):
+        return name in self._commands
+
+    def names(self):
+        return list(self._commands)
+
+    def copy(self):
+        registry = CommandRegistry()
+        registry._commands = dict(self._commands)
+        return registry
+
+    def without_host_files(self):
+        """Копия без команд, обращающихся к файлам хост-системы"""
+        registry = CommandRegistry()
+        registry._commands = {name: command for name, command in self._commands.items() if not command.host_files}
+        return registry
+
+    def load_plugins(self, modules=(), entry_points=True):
+        """Подключает команды из модулей и entry points группы vfs_emulator.commands.
+
+        Модуль плагина должен определять функцию register(registry).
+        """
+        loaded = []
+        for module_name in modules:
+            module = importlib.import_module(module_name)
+            module.register(self)
+            loaded.append(module_name)
+
+        if entry_points and _declares_entry_points(ENTRY_POINT_GROUP):
+            from importlib.metadata import entry_points as find_entry_points
+            for entry_point in find_entry_points(group=ENTRY_POINT_GROUP):
+                entry_point.load()(self)
+                loaded.append(entry_point.name)
+        return loaded
+
+    def help_text(self, name=None):
+        if name is not None:
+            command = self.get(name)
+            if command is None:
+                raise ValueError(f"Unknown command: {name}")
+            commands = [command]
+        else:
+            commands = list(self._commands.values())
+
+        lines = ["Available commands:"] if name is None else []
+        lines += _help_rows([(c.usage, c.help) for c in commands], "-")
+
+        options = [line for c in commands for line in c.option_help]
+        if options:
+            lines += ["", "Options:"]
+            lines += _help_rows(options, "-")
+
+        examples = [line for c in commands for line in c.examples]
+        if examples:
+            lines += ["", "Examples:"]
+            lines += _help_rows(examples, "#")
+        return "\n".join(lines)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Замер памяти на узел VFS: исходное представление (__dict__) против текущего VFSNode.
+
+Запуск: python scripts/bench_memory.py [--nodes N] [--fanout K]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vfs import VFSNode
+
+class LegacyVFSNode:
+    """Представление узла до перехода на __slots__ (для сравнения)"""
+    def __init__(self, name, is_file=False, content="", owner="user", permissions="rw-r--r--"):
+        self.name = name
+        self.is_file = is_file
+        self.content = content
+        self.owner = owner
+        self.permissions = permissions
+        self.children = {}
+        self.parent = None
+        
+    def add_child(self, node):
+        node.parent = self
+        self.children[node.name] = node
+
+def build_tree(node_class, total, fanout):
+    # Владельцы и права создаются заново для каждого узла, как при разборе JSON
+    root = node_class("", permissions="".join(["rwx", "r-x", "r-x"]))
+    dirs = [root]
+    created = 1
+    index = 0
+    while created < total:
+        parent = dirs[index]
+        index += 1
+        for i in range(fanout):
+            if created >= total:
+                break
+            if i < 2:
+                child = node_class(f"dir{created}", owner="".join(["us", "er"]),
+                                   permissions="".join(["rwx", "r-x", "r-x"]))
+                dirs.append(child)
+            else:
+                child = node_class(f"file{created}.txt", is_file=True, content="",
+                                   owner="".join(["us", "er"]), permissions="".join(["rw-", "r--", "r--"]))
+            parent.add_child(child)
+            created += 1
+    return root
+
+def measure(node_class, total, fanout):
+    gc.collect()
+    tracemalloc.start()
+    root = build_tree(node_class, total, fanout)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del root
+    return current / total
+
+def main():
+    parser = argparse.ArgumentParser(description="VFS node memory benchmark")
+    parser.add_argument("--nodes", type=int, default=200000)
+    parser.add_argument("--fanout", type=int, default=10)
+    args = parser.parse_args()
+    
+    before = measure(LegacyVFSNode, args.nodes, args.fanout)
+    after = measure(VFSNode, args.nodes, args.fanout)
+    print(json.dumps({
+        "nodes": args.nodes,
+        "fanout": args.fanout,
+        "bytes_per_node_before": round(before, 1),
+        "bytes_per_node_after": round(after, 1),
+        "reduction": round(1 - after / before, 3),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
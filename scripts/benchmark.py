@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Набор бенчмарков VFS с результатами в JSON для отслеживания регрессий.
+
+python scripts/benchmark.py --depth 4 --fanout 10 --files 20 --output bench.json
+python scripts/benchmark.py --image existing.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from generate_vfs import generate_image
+from logger import XMLLogger
+from vfs import VFS
+
+def timed(results, name, operations, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    results[name] = {
+        "seconds": round(elapsed, 6),
+        "operations": operations,
+        "ops_per_sec": round(operations / elapsed, 1) if elapsed > 0 else None,
+    }
+
+def collect_paths(vfs, limit):
+    """Пути к директориям и файлам образа (не более limit каждого вида)"""
+    dirs, files = [], []
+    stack = [vfs.root]
+    while stack and (len(dirs) < limit or len(files) < limit):
+        node = stack.pop()
+        if node.is_file:
+            if len(files) < limit:
+                files.append(node.get_path())
+        else:
+            if len(dirs) < limit:
+                dirs.append(node.get_path())
+            stack.extend(node.children.values())
+    return dirs, files
+
+def run_benchmarks(image, samples=1000, log_events=10000, seed=0):
+    results = {}
+    rng = random.Random(seed)
+    vfs = VFS()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        timed(results, "load_from_json", 1, lambda: vfs.load_from_json(image))
+    root = vfs.root
+    dirs, files = collect_paths(vfs, samples)
+    paths = [rng.choice(dirs + files) for _ in range(samples)]
+
+    # Первый проход заполняет кэш путей, второй идет по кэшу
+    timed(results, "find_node_cold", len(paths), lambda: [vfs._find_node(p) for p in paths])
+    timed(results, "find_node_warm", len(paths), lambda: [vfs._find_node(p) for p in paths])
+
+    timed(results, "list_directory", len(dirs), lambda: [vfs.list_directory(d) for d in dirs])
+    timed(results, "calculate_size_root", samples, lambda: [vfs.calculate_size(root) for _ in range(samples)])
+    timed(results, "compute_aggregates_root", 1, lambda: vfs.compute_aggregates(root))
+
+    movable = [d for d in dirs if d.count("/") >= 2][:samples]
+    def move_round_trip():
+        for path in movable:
+            node = vfs._find_node(path)
+            parent = node.parent
+            vfs.move_node(node, root, "__bench_tmp")
+            vfs.move_node(node, parent, path.rsplit("/", 1)[1])
+    timed(results, "mv_round_trip", 2 * len(movable), move_round_trip)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for flush_every in (1, 100):
+            logger = XMLLogger(os.path.join(tmp, f"bench_{flush_every}.log"), flush_every=flush_every)
+            def log_events_func():
+                for i in range(log_events):
+                    logger.log_command("ls", ["-l", f"/dir{i}"], success=True)
+                logger.close()
+            timed(results, f"logger_flush_every_{flush_every}", log_events, log_events_func)
+
+    return {
+        "image": {
+            "path": os.path.abspath(image),
+            "bytes": os.path.getsize(image),
+            "nodes": root.file_count + root.dir_count + 1,
+            "files": root.file_count,
+            "directories": root.dir_count + 1,
+        },
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="VFS emulator benchmarks")
+    parser.add_argument("--image", help="Existing JSON image (otherwise a synthetic one is generated)")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--file-size", type=int, default=64)
+    parser.add_argument("--samples", type=int, default=1000, help="Operations per path-based benchmark")
+    parser.add_argument("--log-events", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to file instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image = args.image
+        generator = None
+        if not image:
+            image = os.path.join(tmp, "synthetic.json")
+            generator = {"depth": args.depth, "fanout": args.fanout, "files": args.files,
+                         "file_size": args.file_size, "seed": args.seed}
+            start = time.perf_counter()
+            generate_image(image, args.depth, args.fanout, args.files, args.file_size, args.seed)
+            generator["seconds"] = round(time.perf_counter() - start, 6)
+
+        report = run_benchmarks(image, args.samples, args.log_events, args.seed)
+
+    report["generator"] = generator
+    report["environment"] = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Генератор синтетических JSON-образов VFS для нагрузочных тестов.
+
+Образ пишется потоково, поэтому можно создавать деревья из миллионов узлов:
+python scripts/generate_vfs.py big.json --depth 4 --fanout 10 --files 20 --file-size 256
+"""
+import argparse
+import base64
+import json
+import os
+import random
+
+OWNERS = ["root", "user", "alice", "bob"]
+FILE_PERMISSIONS = ["rw-r--r--", "rw-------", "rwxr-xr-x"]
+
+def count_nodes(depth, fanout, files):
+    """Число узлов в образе с заданными параметрами (включая корень)"""
+    dirs = sum(fanout ** level for level in range(depth + 1))
+    return dirs + dirs * files
+
+def generate_image(path, depth=3, fanout=5, files=10, file_size=64, seed=0, unique_ratio=1.0):
+    """Пишет образ: каждая директория до глубины depth содержит fanout
+    поддиректорий и files файлов по file_size байт. unique_ratio < 1 оставляет
+    часть файлов с одинаковым содержимым. Возвращает число узлов.
+    """
+    rng = random.Random(seed)
+    # Небольшой пул содержимого, чтобы не генерировать случайные байты на каждый файл
+    pool_size = 64
+    payloads = [base64.b64encode(rng.randbytes(file_size)).decode('ascii') for _ in range(pool_size)]
+    shared = payloads[0]
+
+    nodes = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        # Стек: (глубина, индекс следующего потомка); потомки пишутся по мере обхода
+        f.write('{"name": "root", "type": "directory", "children": [')
+        nodes += 1
+        stack = [(0, 0)]
+        while stack:
+            level, index = stack.pop()
+            total = files + (fanout if level < depth else 0)
+            if index >= total:
+                f.write(']}')
+                continue
+            stack.append((level, index + 1))
+            if index:
+                f.write(', ')
+
+            nodes += 1
+            if index < files:
+                content = payloads[nodes % pool_size] if rng.random() < unique_ratio else shared
+                f.write(json.dumps({
+                    "name": f"file{index}.dat",
+                    "type": "file",
+                    "content": content,
+                    "owner": OWNERS[nodes % len(OWNERS)],
+                    "permissions": FILE_PERMISSIONS[nodes % len(FILE_PERMISSIONS)],
+                }))
+            else:
+                f.write(json.dumps({"name": f"dir{index - files}", "type": "directory",
+                                    "owner": OWNERS[nodes % len(OWNERS)]})[:-1])
+                f.write(', "children": [')
+                stack.append((level + 1, 0))
+    return nodes
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic VFS JSON image")
+    parser.add_argument("output", help="Path to the JSON image to write")
+    parser.add_argument("--depth", type=int, default=3, help="Directory nesting depth")
+    parser.add_argument("--fanout", type=int, default=5, help="Subdirectories per directory")
+    parser.add_argument("--files", type=int, default=10, help="Files per directory")
+    parser.add_argument("--file-size", type=int, default=64, help="File size in bytes")
+    parser.add_argument("--unique-ratio", type=float, default=1.0, help="Share of files with distinct contents")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    nodes = generate_image(args.output, args.depth, args.fanout, args.files,
+                           args.file_size, args.seed, args.unique_ratio)
+    print(json.dumps({"output": os.path.abspath(args.output), "nodes": nodes,
+                      "bytes": os.path.getsize(args.output)}))
+
+if __name__ == "__main__":
+    main()
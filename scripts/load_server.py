@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Нагрузочный тест сервера VFS: тысячи одновременных клиентов.
+
+python scripts/load_server.py --clients 2000 --commands 20
+python scripts/load_server.py --address 127.0.0.1:7000 --clients 500
+
+Без --address сервер запускается в этом же процессе на свободном порту.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+
+from logger import XMLLogger
+from server import VFSServer
+from vfs import VFS
+
+PROMPT = VFSServer.PROMPT.encode()
+READ_COMMANDS = ["pwd", "ls /home", "ls -l /", "cat /home/user/README.md", "du /", "find / -name '*.txt'"]
+
+async def open_client(address):
+    if address.startswith("unix:"):
+        reader, writer = await asyncio.open_unix_connection(address[5:])
+    else:
+        host, _, port = address.rpartition(":")
+        reader, writer = await asyncio.open_connection(host or "127.0.0.1", int(port))
+    await reader.readuntil(PROMPT)
+    return reader, writer
+
+async def send(reader, writer, line):
+    """Отправляет команду и возвращает ее вывод (без приглашения)"""
+    writer.write(line.encode() + b"\n")
+    await writer.drain()
+    data = await reader.readuntil(PROMPT)
+    return data[:-len(PROMPT)].decode()
+
+async def client(address, number, commands, write_every, latencies):
+    reader, writer = await open_client(address)
+    try:
+        await send(reader, writer, "cd /home/user")
+        for i in range(commands):
+            if write_every and i % write_every == write_every - 1:
+                line = f"echo {number}-{i} >> /home/user/load-{number % 16}.txt"
+            else:
+                line = READ_COMMANDS[(number + i) % len(READ_COMMANDS)]
+            start = time.perf_counter()
+            await send(reader, writer, line)
+            latencies.append(time.perf_counter() - start)
+        # После exit сервер закрывает соединение без приглашения
+        writer.write(b"exit\n")
+        await reader.read()
+    finally:
+        writer.close()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+async def run(args):
+    server = None
+    address = args.address
+    if address is None:
+        vfs = VFS()
+        if args.image:
+            vfs.load_image(args.image)
+        server = VFSServer(vfs, XMLLogger(args.log_path, flush_every=1000))
+        await server.start("127.0.0.1:0")
+        host, port = server.addresses()[0][:2]
+        address = f"{host}:{port}"
+
+    latencies = []
+    start = time.perf_counter()
+    # Подключения открываются партиями, чтобы не переполнить очередь accept
+    semaphore = asyncio.Semaphore(args.connect_batch)
+
+    async def limited(number):
+        async with semaphore:
+            await client(address, number, args.commands, args.write_every, latencies)
+
+    results = await asyncio.gather(*(limited(n) for n in range(args.clients)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if isinstance(result, Exception)]
+
+    if server is not None:
+        await server.close()
+        server.logger.close()
+
+    print(f"{args.clients} clients, {len(latencies)} commands in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f} commands/s), {len(failed)} failed clients")
+    print(f"latency p50={percentile(latencies, 0.5) * 1000:.2f}ms "
+          f"p95={percentile(latencies, 0.95) * 1000:.2f}ms "
+          f"p99={percentile(latencies, 0.99) * 1000:.2f}ms")
+    if failed:
+        print(f"first failure: {failed[0]!r}")
+    return 1 if failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the VFS server")
+    parser.add_argument("--address", help="HOST:PORT or unix:PATH of a running server")
+    parser.add_argument("--image", help="VFS image for the in-process server")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--commands", type=int, default=20, help="Commands per client")
+    parser.add_argument("--write-every", type=int, default=10,
+                        help="Every Nth command appends to a file (0 - read-only load)")
+    parser.add_argument("--connect-batch", type=int, default=2000,
+                        help="Maximum number of simultaneously open connections")
+    parser.add_argument("--log-path", default=os.devnull)
+    args = parser.parse_args()
+
+    # Каждый клиент и его серверная сторона занимают по дескриптору
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = 2 * min(args.clients, args.connect_batch) + 64
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
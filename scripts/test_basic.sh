@@ -1,3 +1,6 @@
 #!/bin/bash
 echo "Testing basic functionality..."
 python main.py --script scripts/startup_script.txt --log-path test.log
+
+echo "Testing headless mode..."
+python main.py --headless --script scripts/startup_script.txt --log-path test.log
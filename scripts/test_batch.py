@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import io
+import os
+import tempfile
+from batch import BatchRunner
+from config import Config
+from logger import XMLLogger
+from main import VFSEmulator, trim_lines
+from vfs import VFS
+
+def test_batch_runner():
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = XMLLogger(os.path.join(tmp, "vfs.log"))
+        output = io.StringIO()
+        runner = BatchRunner(VFS(), logger, output=output)
+        
+        status = runner.run_lines(["# comment", "cd /home/user", "pwd", "", "exit", "pwd"])
+        logger.close()
+        
+        # exit останавливает выполнение, комментарии и пустые строки пропускаются
+        assert status == 0
+        assert runner.commands_run == 3
+        assert "$ pwd\n/home/user\n" in output.getvalue()
+
+def test_batch_runner_errors():
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = XMLLogger(os.path.join(tmp, "vfs.log"))
+        runner = BatchRunner(VFS(), logger, output=io.StringIO(), stop_on_error=True)
+        
+        status = runner.run_lines(["cd /missing", "pwd"])
+        logger.close()
+        
+        assert status == 1
+        assert runner.errors == 1
+        assert runner.commands_run == 1
+        
+def test_one_shot():
+    config = Config().parse_args(["-c", "cd /home; pwd", "--log-path", os.devnull])
+    assert config.command_text == "cd /home; pwd"
+    
+    # Дерево без тестовых данных - для запуска с образом
+    vfs = VFS(sample=False)
+    assert not vfs.root.children
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = XMLLogger(os.path.join(tmp, "vfs.log"))
+        output = io.StringIO()
+        runner = BatchRunner(VFS(), logger, output=output, echo=False)
+        status = runner.run_lines([config.command_text])
+        logger.close()
+        
+        # Без эха выводится только результат команды
+        assert status == 0
+        assert output.getvalue() == "Changed to directory: /home\n/home\n"
+        
+def test_gui_output_trim():
+    assert trim_lines("a\nb\nc\n", 2) == "b\nc\n"
+    assert trim_lines("a\nb\nc", 2) == "b\nc"
+    assert trim_lines("a\nb\n", 5) == "a\nb\n"
+    
+    # Буфер вывода между сбросами не растет больше двух окон прокрутки
+    # (без Tk: сброс уже запланирован, виджет не нужен)
+    emulator = VFSEmulator.__new__(VFSEmulator)
+    emulator.config = Config()
+    emulator.config.scrollback_lines = 100
+    emulator.pending_output = []
+    emulator.pending_lines = 0
+    emulator.flush_scheduled = True
+    for i in range(10000):
+        emulator.display_output(f"line {i}\n")
+        assert emulator.pending_lines <= 200
+    text = trim_lines("".join(emulator.pending_output), 100)
+    assert text.splitlines() == [f"line {i}" for i in range(9900, 10000)]
+    
+    print("All batch tests passed!")
+
+if __name__ == "__main__":
+    test_batch_runner()
+    test_batch_runner_errors()
+    test_one_shot()
+    test_gui_output_trim()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+from fnmatch import fnmatchcase
+from commands import CommandExecutor
+from logger import XMLLogger
+from vfs import VFS, VFSNode
+
+def make_executor(tmp):
+    return CommandExecutor(VFS(), XMLLogger(os.path.join(tmp, "vfs.log")))
+
+def test_ls_sorted_paging():
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp)
+        big = VFSNode("big", permissions="rwxr-xr-x")
+        executor.vfs.root.add_child(big)
+        for i in range(2000, 0, -1):
+            big.add_child(VFSNode(f"f{i:05d}", is_file=True))
+        big.add_child(VFSNode(".hidden", is_file=True))
+        
+        assert executor.execute("ls", ["-l", "--limit", "2", "/big"]).splitlines() == [
+            "-rw-r--r--     user        0 f00001",
+            "-rw-r--r--     user        0 f00002",
+        ]
+        assert executor.execute("ls", ["--offset=1999", "/big"]) == "f02000"
+        assert executor.execute("ls", ["-a", "--limit", "1", "/big"]) == ".hidden"
+        
+        # Индекс имен обновляется при перемещении
+        executor.execute("mv", ["/big/f00001", "/big/zzz"])
+        assert executor.execute("ls", ["--offset=1999", "/big"]) == "zzz"
+        
+        # Вывод выдается блоками, склейка совпадает с execute
+        chunks = list(executor.execute_iter("ls", ["-l", "/big"], chunk_lines=100))
+        assert len(chunks) == 20
+        assert "".join(chunks) == executor.execute("ls", ["-l", "/big"])
+        executor.logger.close()
+
+def test_ls_recursive():
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp)
+        result = executor.execute("ls", ["-R", "/home"])
+        assert result.split("\n\n") == [
+            "/home:\nuser",
+            "/home/user:\nREADME.md documents",
+            "/home/user/documents:\nfile1.txt file2.txt",
+        ]
+        assert executor.execute("ls", ["/missing"]) == "Error: Directory not found: /missing"
+        
+        # Несколько путей (в том числе из шаблона): файлы, затем директории с заголовками
+        assert executor.execute_line("ls /home/user/*") == (
+            "/home/user/README.md\n\n/home/user/documents:\nfile1.txt file2.txt")
+        assert executor.execute_line("ls -l /etc/config.conf").endswith(" /etc/config.conf")
+        executor.logger.close()
+
+def test_snapshot_rollback():
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp)
+        vfs = executor.vfs
+        before = executor.execute("ls", ["-lR", "/"])
+        size = vfs.root.size
+        
+        executor.execute_line("snapshot clean; cd /home/user; chown bob README.md")
+        executor.execute_line("mv documents /docs; echo data > new.txt; echo more >> README.md")
+        executor.execute_line("snapshot edited; mv /docs /home/user/documents")
+        assert executor.execute("snapshot", []) == "clean\t5 changes\nedited\t1 changes"
+        
+        assert executor.execute("rollback", ["clean"]) == "Rolled back to clean (5 changes undone)"
+        assert executor.execute("ls", ["-lR", "/"]) == before
+        assert vfs.root.size == size and vfs.verify_aggregates(vfs.root)
+        assert executor.execute("pwd", []) == "/"
+        
+        # Снапшоты после clean удалены, сам clean можно использовать повторно
+        assert executor.execute("snapshot", []) == "clean\t0 changes"
+        assert executor.execute("rollback", ["edited"]) == "Error: Snapshot not found: edited"
+        executor.execute("snapshot", ["-d", "clean"])
+        assert vfs._undo is None
+        executor.logger.close()
+
+def test_find_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp)
+        vfs = executor.vfs
+        
+        def brute_force(start, name=None, owner=None):
+            return [node.get_path() for node in vfs._walk_subtree(vfs._find_node(start))
+                    if (name is None or fnmatchcase(node.name, name))
+                    and (owner is None or node.owner == owner)]
+            
+        assert executor.execute("find", ["/", "-name", "*.txt"]).split("\n") == brute_force("/", "*.txt")
+        assert vfs._index is not None
+        
+        # Индексы следуют за mv, chown, созданием файлов и откатом
+        executor.execute_line("snapshot s; mv /home/user/documents /etc/docs; chown root /etc/docs/file1.txt")
+        executor.execute_line("echo x > /etc/docs/file3.txt")
+        for start, name, owner in (("/", "*.txt", None), ("/etc", "file*", "root"), ("/home", "*", None)):
+            args = [start, "-name", name] + (["-owner", owner] if owner else [])
+            assert executor.execute("find", args).split("\n") == brute_force(start, name, owner), args
+            
+        executor.execute("rollback", ["s"])
+        assert executor.execute("find", ["/", "-owner", "root", "-type", "f"]) == "/etc/config.conf"
+        assert executor.execute("find", ["/", "-name", "file3.txt"]) == ""
+        assert executor.execute("find", ["/home", "-perm", "rwxr-xr-x"]).split("\n") == \
+            ["/home", "/home/user", "/home/user/documents"]
+        executor.logger.close()
+        
+def test_bulk_commands():
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp)
+        vfs = executor.vfs
+        
+        # Шаблоны без кавычек раскрываются по путям VFS, в кавычках - нет
+        assert executor.execute_line("echo /home/user/documents/*.txt") == \
+            "/home/user/documents/file1.txt /home/user/documents/file2.txt"
+        assert executor.execute_line("echo '*.txt' /none/*") == "*.txt /none/*"
+        
+        executor.execute_line("snapshot s")
+        assert executor.execute_line("cp -r /home/user /home/copy") == "Copied /home/user to /home/copy"
+        assert executor.execute_line("cp /home/user /x") == "Error: -r not specified; omitting directory /home/user"
+        assert executor.execute_line("chown -R bob /home/copy") == "Changed owner of 6 nodes to bob"
+        assert executor.execute_line("mv /home/copy/documents/* /home/copy/.bashrc /etc") == "Moved 3 items to /etc"
+        assert executor.execute_line("mv /etc/file1.txt /home /missing") == "Error: Target is not a directory: /missing"
+        assert executor.execute_line("rm /home/copy") == "Error: Is a directory: /home/copy"
+        assert executor.execute_line("rm -r /home/copy /home/copy/README.md") == "Removed 3 nodes"
+        assert executor.execute("find", ["/", "-owner", "bob"]).split("\n") == \
+            ["/etc/.bashrc", "/etc/file1.txt", "/etc/file2.txt"]
+        assert vfs.verify_aggregates()
+        
+        # Откат отменяет копирование и смену владельца целиком
+        executor.execute_line("rollback s")
+        assert executor.execute("find", ["/", "-owner", "bob"]) == ""
+        assert vfs.root.file_count == 5 and vfs.root.dir_count == 4
+        executor.logger.close()
+        
+    print("All command tests passed!")
+
+if __name__ == "__main__":
+    test_ls_sorted_paging()
+    test_ls_recursive()
+    test_snapshot_rollback()
+    test_find_indexes()
+    test_bulk_commands()
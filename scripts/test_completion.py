@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import time
+from commands import CommandExecutor
+from completion import Completer, History
+from logger import XMLLogger
+from vfs import VFS, VFSNode
+
+def test_complete_commands_and_paths():
+    vfs = VFS()
+    executor = CommandExecutor(vfs, XMLLogger(os.devnull))
+    completer = Completer(vfs, executor.registry)
+
+    assert completer.complete("pw").apply("pw") == "pwd "
+    assert completer.complete("ls /ho").apply("ls /ho") == "ls /home/"
+    assert completer.complete("cat /home/user/RE").replacement == "/home/user/README.md "
+    assert completer.complete("cd home/user/documents/f").replacement == "home/user/documents/file"
+    assert completer.complete("ls | gr").apply("ls | gr") == "ls | grep "
+    assert completer.complete("echo $(pw").apply("echo $(pw") == "echo $(pwd "
+    assert completer.complete("ls /missing/x") is None
+
+    # Курсор в середине строки: дополняется слово перед ним
+    text = "ls /ho | wc"
+    completion = completer.complete(text, 6)
+    assert completion.apply(text) == "ls /home/ | wc"
+
+    # Скрытые имена - только по префиксу "."; пробелы экранируются
+    tmp = VFSNode("tmp")
+    vfs.root.add_child(tmp)
+    tmp.add_child(VFSNode(".hidden", is_file=True))
+    tmp.add_child(VFSNode("my file.txt", is_file=True))
+    assert completer.complete("ls /tmp/").candidates == ["my file.txt"]
+    assert completer.complete("ls /tmp/.").replacement == "/tmp/.hidden "
+    assert completer.complete("cat /tmp/my").replacement == "/tmp/my\\ file.txt "
+    assert completer.complete("cat /tmp/my\\ f").replacement == "/tmp/my\\ file.txt "
+
+def test_large_directory_and_mv():
+    vfs = VFS()
+    executor = CommandExecutor(vfs, XMLLogger(os.devnull))
+    completer = Completer(vfs, executor.registry)
+    big = VFSNode("tmp")
+    vfs.root.add_child(big)
+    for i in range(100000):
+        big.add_child(VFSNode(f"file{i:06d}", is_file=True))
+    completer.complete("ls /tmp/f")
+
+    start = time.perf_counter()
+    completion = completer.complete("ls /tmp/file0999")
+    elapsed = time.perf_counter() - start
+    assert completion.replacement == "/tmp/file0999"
+    assert completion.total == 100
+    assert completion.candidates[0] == "file099900"
+    assert elapsed < 0.005, elapsed
+
+    full = completer.complete("ls /tmp/")
+    assert full.total == 100000 and len(full.candidates) == Completer.LIMIT
+
+    # Индекс имен следует за mv
+    executor.execute_line("mv /tmp/file000123 /tmp/zz-moved")
+    assert completer.complete("ls /tmp/zz").replacement == "/tmp/zz-moved "
+    assert completer.complete("ls /tmp/file000123") is None
+    executor.execute_line("mv /tmp/zz-moved /home")
+    assert completer.complete("ls /tmp/zz") is None
+    assert completer.complete("ls /home/zz").replacement == "/home/zz-moved "
+
+def test_history():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history")
+        history = History(path, max_entries=3)
+        for line in ["ls", "pwd", "pwd", "cd /home", "cat a"]:
+            history.add(line)
+        assert history.entries == ["pwd", "cd /home", "cat a"]
+
+        # Up/Down с сохранением набранной строки
+        assert history.previous("draft") == "cat a"
+        assert history.previous("cat a") == "cd /home"
+        assert history.next() == "cat a"
+        assert history.next() == "draft"
+
+        # После перезапуска история читается из файла, файл не растет без предела
+        for line in ["a", "b", "c"]:
+            history.add(line)
+        reloaded = History(path, max_entries=3)
+        assert reloaded.entries == ["a", "b", "c"]
+        with open(path, encoding='utf-8') as f:
+            assert len(f.read().splitlines()) <= 6
+    print("All completion tests passed!")
+
+if __name__ == "__main__":
+    test_complete_commands_and_paths()
+    test_large_directory_and_mv()
+    test_history()
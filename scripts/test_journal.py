@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+from commands import CommandExecutor
+from journal import Journal
+from logger import XMLLogger
+from vfs import VFS
+
+def open_session(tmp, **options):
+    vfs = VFS()
+    journal = Journal(os.path.join(tmp, "vfs.journal"), **options)
+    replayed = journal.open(vfs)
+    executor = CommandExecutor(vfs, XMLLogger(os.path.join(tmp, "vfs.log")))
+    return executor, journal, replayed
+
+def state(executor):
+    return executor.execute_line("ls -laR /; cat /home/user/notes.txt; pwd")
+
+def test_journal_replay():
+    with tempfile.TemporaryDirectory() as tmp:
+        executor, journal, _ = open_session(tmp, fsync="always")
+        executor.execute_line("mv /home/user/documents /etc/docs; chown root /etc/docs/file1.txt")
+        executor.execute_line("echo первая > /home/user/notes.txt; echo вторая >> /home/user/notes.txt")
+        executor.execute_line("snapshot s; mv /etc/docs /docs; chown bob /docs; rollback s")
+        executor.execute_line("cp -r /etc/docs /copy; chown -R bob /copy; rm /copy/file2.txt")
+        expected = state(executor)
+        journal.close()
+        
+        # Оборванная запись в конце (сбой во время записи) отбрасывается
+        with open(journal.path, "ab") as f:
+            f.write(b'0badc0de ["mv","/etc","/x"')
+            
+        executor, journal, replayed = open_session(tmp)
+        assert replayed == 11
+        assert state(executor) == expected
+        assert "первая\nвторая" in expected
+        journal.close()
+        with open(journal.path, "rb") as f:
+            assert f.read().endswith(b"\n")
+
+def test_journal_compaction():
+    with tempfile.TemporaryDirectory() as tmp:
+        executor, journal, _ = open_session(tmp, compact_every=3)
+        for i in range(4):
+            executor.execute("mv", [f"/home/user/{'documents' if i == 0 else f'd{i - 1}'}", f"/home/user/d{i}"])
+            
+        # После трех операций журнал сжат в снапшот, в нем осталась одна запись
+        assert journal.generation == 1 and journal.records == 1
+        assert os.path.exists(journal.base)
+        first_base = journal.base
+        assert executor.execute("compact", []) == f"Compacted 1 operations into {journal.path}.2.snap"
+        assert not os.path.exists(first_base)
+        expected = state(executor)
+        journal.close()
+        
+        executor, journal, replayed = open_session(tmp)
+        assert replayed == 0
+        assert state(executor) == expected
+        assert executor.vfs._find_node("/home/user/d3/file1.txt") is not None
+        journal.close()
+        
+    print("All journal tests passed!")
+
+if __name__ == "__main__":
+    test_journal_replay()
+    test_journal_compaction()
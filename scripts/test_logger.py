@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from logger import XMLLogger
+
+def test_logger_streaming():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "vfs.log")
+        logger = XMLLogger(log_path, flush_every=1)
+        
+        # Пустой лог - уже валидный XML
+        assert ET.parse(log_path).getroot().tag == "vfs_log"
+        
+        logger.log_command("ls", [], success=True)
+        logger.log_command("cd", ["/nope"], success=False, message="Directory not found")
+        
+        # Файл валиден после каждого события, без закрытия логгера
+        events = ET.parse(log_path).getroot().findall("event")
+        assert len(events) == 2
+        assert events[1].find("status").text == "error"
+        assert events[1].find("message").text == "Directory not found"
+        logger.close()
+
+def test_logger_buffering():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "vfs.log")
+        logger = XMLLogger(log_path, flush_every=5)
+        empty_size = os.path.getsize(log_path)
+        
+        # До flush_every событий ничего не доходит до файла
+        for i in range(4):
+            logger.log_command("echo", [str(i)])
+        assert os.path.getsize(log_path) == empty_size
+        assert ET.parse(log_path).getroot().findall("event") == []
+        
+        logger.log_command("echo", ["4"])
+        assert len(ET.parse(log_path).getroot().findall("event")) == 5
+        logger.log_command("echo", ["5"])
+        logger.close()
+        assert len(ET.parse(log_path).getroot().findall("event")) == 6
+
+def test_logger_rotation():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "vfs.log")
+        logger = XMLLogger(log_path, flush_every=10, max_bytes=400, backup_count=2)
+        for i in range(20):
+            logger.log_command("echo", [str(i)])
+        logger.close()
+        
+        assert os.path.exists(log_path + ".1")
+        assert not os.path.exists(log_path + ".3")
+        for path in (log_path, log_path + ".1", log_path + ".2"):
+            assert os.path.getsize(path) <= 400
+            ET.parse(path)
+            # Индекс переименован вместе со своим логом
+            assert os.path.exists(path + ".idx")
+            
+    print("All logger tests passed!")
+
+if __name__ == "__main__":
+    test_logger_streaming()
+    test_logger_buffering()
+    test_logger_rotation()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+import io
+import os
+import tempfile
+from batch import BatchRunner
+from commands import CommandExecutor
+from logger import XMLLogger
+from logtool import LogIndex, iter_events, replay
+from vfs import VFS
+
+SESSION = ["cd /home", "mv user u2", "mv nope x", "ls | grep u", "echo $(pwd) > /f.txt", "cat /f.txt"]
+
+def record_session(log_path):
+    logger = XMLLogger(log_path)
+    executor = CommandExecutor(VFS(), logger)
+    for line in SESSION:
+        executor.execute_line(line)
+    logger.close()
+
+def test_log_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "vfs.log")
+        record_session(log_path)
+        
+        events = list(iter_events(log_path))
+        assert [event.command for event in events] == ["cd", "mv", "mv", "ls", "grep", "pwd", "echo", "cat"]
+        assert events[4].line == "ls | grep u" and events[4].line_number == 4
+        
+        index = LogIndex(log_path)
+        assert len(index) == len(events)
+        failed = list(index.query(command="mv", status="error"))
+        assert [event.arguments() for event in failed] == [["nope", "x"]]
+        assert failed[0].message == "Source not found: nope"
+        assert list(index.query(since=events[-1].timestamp)) and \
+            not list(index.query(until=events[0].timestamp))
+        
+        # Без файла индекса записи строятся сканированием XML
+        os.remove(index.index_path)
+        rebuilt = LogIndex(log_path)
+        assert [record[1:5] for record in rebuilt.records()] == [record[1:5] for record in index.records()]
+        assert rebuilt.stats()["mv"][:2] == [2, 1]
+
+def test_replay():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "vfs.log")
+        record_session(log_path)
+        
+        logger = XMLLogger(os.path.join(tmp, "replay.log"))
+        output = io.StringIO()
+        runner = BatchRunner(VFS(), logger, output=output)
+        assert replay(log_path, runner, stream=io.StringIO()) == 0
+        assert runner.vfs._find_node("/home/u2") is not None
+        assert "$ ls | grep u\nu2\n" in output.getvalue()
+        
+        # На другом дереве команды ведут себя иначе - расхождение видно по строкам
+        vfs = VFS()
+        vfs.move_node(vfs._find_node("/home/user"), vfs._find_node("/"), "user")
+        report = io.StringIO()
+        runner = BatchRunner(vfs, logger, output=io.StringIO())
+        assert replay(log_path, runner, stream=report) == 1
+        assert "DIVERGED" in report.getvalue() and "mv user u2" in report.getvalue()
+        logger.close()
+        
+def test_replay_shared_logger():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "vfs.log")
+        # Две сессии с общим логом выполняют одну строку одновременно:
+        # события перемежаются, но номера строк у них разные
+        logger = XMLLogger(log_path)
+        first = CommandExecutor(VFS(), logger).execute_line_iter("cd /home; pwd")
+        next(first)
+        CommandExecutor(VFS(), logger).execute_line("cd /home; pwd")
+        list(first)
+        logger.close()
+        
+        events = list(iter_events(log_path))
+        assert [event.line_number for event in events] == [1, 2, 2, 1]
+        
+        replay_logger = XMLLogger(os.path.join(tmp, "replay.log"))
+        runner = BatchRunner(VFS(), replay_logger, output=io.StringIO())
+        report = io.StringIO()
+        assert replay(log_path, runner, stream=report) == 0, report.getvalue()
+        assert runner.commands_run == 2
+        replay_logger.close()
+        
+    print("All logtool tests passed!")
+
+if __name__ == "__main__":
+    test_log_index()
+    test_replay()
+    test_replay_shared_logger()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from parallel import ParallelRunner, collect_scripts
+
+def test_parallel_runner():
+    with tempfile.TemporaryDirectory() as tmp:
+        scripts_dir = os.path.join(tmp, "scripts")
+        os.makedirs(scripts_dir)
+        scripts = {
+            "move.txt": "mv /home/user /home/moved\nls /home",
+            "list.txt": "ls /home",
+            "fail.txt": "cd /missing\npwd",
+        }
+        for name, text in scripts.items():
+            with open(os.path.join(scripts_dir, name), 'w', encoding='utf-8') as f:
+                f.write(text + "\n")
+                
+        found = collect_scripts([scripts_dir, os.path.join(scripts_dir, "*.txt")])
+        assert [os.path.basename(path) for path in found] == ["fail.txt", "list.txt", "move.txt"]
+        
+        results_dir = os.path.join(tmp, "results")
+        # Один рабочий процесс выполняет все скрипты, откатывая образ между ними
+        runner = ParallelRunner(results_dir=results_dir, jobs=1)
+        assert runner.run(found) == 1
+        
+        # Каждый скрипт видит исходный образ: mv из move.txt не виден list.txt
+        with open(os.path.join(results_dir, "list.out"), encoding='utf-8') as f:
+            assert "user" in f.read()
+        with open(os.path.join(results_dir, "move.out"), encoding='utf-8') as f:
+            assert "moved" in f.read()
+        assert ET.parse(os.path.join(results_dir, "move.log")).getroot().findall("event")
+        
+        summary = ET.parse(os.path.join(results_dir, "summary.xml")).getroot()
+        assert summary.get("scripts") == "3" and summary.get("failed") == "1"
+        assert [script.get("status") for script in summary.findall("script")] == ["error", "success", "success"]
+        
+    print("All parallel tests passed!")
+
+if __name__ == "__main__":
+    test_parallel_runner()
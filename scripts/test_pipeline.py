@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+from commands import CommandExecutor
+from logger import XMLLogger
+from parser import CommandParser
+from vfs import VFS
+
+def test_parse_line():
+    parser = CommandParser()
+    
+    sequence = parser.parse_line('ls -l /home | grep "a|b" >> out.txt; pwd && echo \'x y\'')
+    assert [connector for connector, _ in sequence] == [None, ";", "&&"]
+    first = sequence[0][1]
+    assert first.stages == [("ls", ["-l", "/home"]), ("grep", ["a|b"])]
+    assert first.redirect == (">>", "out.txt")
+    assert sequence[2][1].stages == [("echo", ["x y"])]
+    
+    for bad in ("ls |", "| ls", "ls >", "ls && ", "ls > a b", "ls & pwd"):
+        try:
+            parser.parse_line(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"Expected parse error for {bad!r}")
+
+def test_pipelines():
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = CommandExecutor(VFS(), XMLLogger(os.path.join(tmp, "vfs.log")))
+        
+        assert executor.execute_line("ls -R / | grep txt | head 1") == "file1.txt"
+        assert executor.execute_line("echo b > /f; echo a >> /f; cat /f | sort") == "a\nb"
+        assert executor.execute_line("wc -l /f") == "2"
+        assert executor.execute_line("cd /missing && pwd") == "Error: Directory not found: /missing"
+        assert executor.execute_line("cd $(echo /home) && pwd") == "Changed to directory: /home\n/home"
+        assert executor.vfs._find_node("/f").content == "b\na\n"
+        
+        # $(...) выполняется только перед запуском своего конвейера: не после
+        # неудачного && и после перенаправлений предыдущих команд строки
+        assert executor.execute_line("cd /nonexistent && echo $(rm -r /home)").startswith("Error")
+        assert executor.vfs._find_node("/home") is not None
+        assert executor.execute_line("echo /etc/config.conf > /g; cat $(cat /g)") == "setting=value"
+        assert executor.execute_line('echo "$(echo a; echo b)" && echo c') == "a\nb\nc"
+        
+        # head останавливает конвейер, не читая весь листинг
+        produced = []
+        def numbers(executor, args):
+            for i in range(10 ** 9):
+                produced.append(i)
+                yield str(i)
+        executor.registry.command("numbers")(numbers)
+        assert executor.execute_line("numbers | grep 1 | head 2") == "1\n10"
+        assert len(produced) == 11
+        executor.logger.close()
+        
+    print("All pipeline tests passed!")
+
+if __name__ == "__main__":
+    test_parse_line()
+    test_pipelines()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import io
+import os
+import pstats
+import tempfile
+import xml.etree.ElementTree as ET
+from batch import BatchRunner
+from commands import CommandExecutor
+from logger import XMLLogger
+from profiler import LatencyHistogram, Profiler
+from vfs import VFS
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram(window=100)
+    for i in range(1, 201):
+        histogram.add(i / 1000, 0.0)
+        
+    # В окне остаются последние 100 замеров (101..200 мс)
+    assert histogram.count == 200
+    assert histogram.percentiles(histogram.wall) == [0.150, 0.195, 0.199]
+
+def test_stats_command():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "vfs.log")
+        logger = XMLLogger(log_path)
+        profiler = Profiler()
+        executor = CommandExecutor(VFS(), logger, profiler=profiler)
+        
+        executor.execute_line("ls /home/user; du /; ls -R / | head 2")
+        stats = executor.execute("stats", [])
+        assert executor.last_success
+        assert profiler.histograms["ls"].count == 2
+        for name in ("du", "head", "vfs.resolve", "vfs.iter_children", "vfs.calculate_size"):
+            assert name in profiler.histograms, name
+        assert stats.splitlines()[0].split()[:2] == ["operation", "count"]
+        
+        assert "vfs.resolve" in executor.execute("stats", ["vfs."])
+        assert "du " not in executor.execute("stats", ["vfs."])
+        executor.execute("stats", ["--reset"])
+        assert "stats" in executor.execute("stats", []) and "ls" not in profiler.histograms
+        
+        # Длительность пишется в каждое событие лога, даже без профилировщика
+        plain = CommandExecutor(VFS(), logger)
+        assert "disabled" in plain.execute("stats", [])
+        logger.close()
+        events = ET.parse(log_path).getroot().findall("event")
+        assert all(float(event.find("duration").text) >= 0 for event in events)
+
+def test_cprofile_dump():
+    with tempfile.TemporaryDirectory() as tmp:
+        profile_path = os.path.join(tmp, "run.prof")
+        logger = XMLLogger(os.path.join(tmp, "vfs.log"))
+        runner = BatchRunner(VFS(), logger, output=io.StringIO(), profile_path=profile_path)
+        runner.run_lines(["ls -R /", "du /"])
+        logger.close()
+        
+        stats = pstats.Stats(profile_path)
+        assert any(name == "_run_stage" for (_, _, name) in stats.stats)
+        
+    print("All profiler tests passed!")
+
+if __name__ == "__main__":
+    test_histogram_percentiles()
+    test_stats_command()
+    test_cprofile_dump()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+import types
+from commands import BUILTINS, CommandExecutor
+from logger import XMLLogger
+from registry import ArgSpec
+from vfs import VFS
+
+def test_argspec():
+    spec = ArgSpec(flags="la", options={"--limit": int, "--verify": None}, max_args=1)
+    args = spec.parse(["-la", "--limit=5", "--verify", "/home"], "ls")
+    assert args.flags == {"l", "a"}
+    assert args.options == {"limit": 5, "verify": True}
+    assert list(args) == ["/home"]
+    
+    for bad in (["-x"], ["--limit"], ["--limit", "x"], ["a", "b"], ["--other"]):
+        try:
+            spec.parse(bad, "ls")
+        except ValueError:
+            continue
+        raise AssertionError(f"Expected ValueError for {bad}")
+
+def test_plugin_registration():
+    plugin = types.ModuleType("vfs_test_plugin")
+    
+    def register(registry):
+        @registry.command("hello", usage="hello NAME", help="Greet someone", min_args=1, max_args=1)
+        def _hello(executor, args):
+            return f"Hello, {args[0]} from {executor.vfs.current_dir.get_path()}"
+            
+    plugin.register = register
+    sys.modules[plugin.__name__] = plugin
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = CommandExecutor(VFS(), XMLLogger(os.path.join(tmp, "vfs.log")))
+        assert executor.registry.load_plugins([plugin.__name__], entry_points=False) == [plugin.__name__]
+        
+        assert executor.execute("hello", ["world"]) == "Hello, world from /"
+        assert executor.execute("hello", []) == "Error: Usage: hello NAME"
+        assert "hello NAME" in executor.execute("help", [])
+        
+        # Длинные usage и примеры не сливаются с описанием
+        help_lines = executor.execute("help", []).splitlines()
+        assert any(line.startswith("chown [-R] OWNER PATH... ") for line in help_lines)
+        for line in help_lines:
+            assert " - " in line or " # " in line or not line or line.endswith(":")
+        # Плагин не меняет общий набор встроенных команд
+        assert "hello" not in BUILTINS
+        executor.logger.close()
+        
+    print("All registry tests passed!")
+
+if __name__ == "__main__":
+    test_argspec()
+    test_plugin_registration()
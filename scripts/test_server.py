@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import socket
+import tempfile
+import time
+from logger import XMLLogger
+from server import ReadWriteLock, VFSServer
+from vfs import VFS
+
+PROMPT = VFSServer.PROMPT.encode()
+
+async def send(reader, writer, line):
+    writer.write(line.encode() + b"\n")
+    await writer.drain()
+    data = await reader.readuntil(PROMPT)
+    return data[:-len(PROMPT)].decode().strip()
+
+def test_sessions():
+    async def scenario(log_path):
+        vfs = VFS()
+        server = VFSServer(vfs, XMLLogger(log_path))
+        await server.start("127.0.0.1:0")
+        host, port = server.addresses()[0][:2]
+
+        async def client(number):
+            reader, writer = await asyncio.open_connection(host, port)
+            await reader.readuntil(PROMPT)
+            # У каждой сессии свой текущий каталог
+            target = "/home/user" if number % 2 else "/etc"
+            await send(reader, writer, f"cd {target}")
+            await send(reader, writer, f"echo {number} >> /home/user/shared.txt")
+            assert await send(reader, writer, "pwd") == target
+            writer.write(b"exit\n")
+            await reader.read()
+            writer.close()
+
+        await asyncio.gather(*(client(n) for n in range(300)))
+        assert not server.sessions
+
+        # Изменения всех сессий видны в общем дереве
+        reader, writer = await asyncio.open_connection(host, port)
+        await reader.readuntil(PROMPT)
+        lines = (await send(reader, writer, "cat /home/user/shared.txt")).splitlines()
+        assert sorted(map(int, lines)) == list(range(300))
+        assert "Error" in await send(reader, writer, "cd /missing")
+        assert await send(reader, writer, "pwd") == "/"
+        writer.close()
+
+        await server.close()
+        server.logger.close()
+        assert server.commands_run == 300 * 4 + 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(os.path.join(tmp, "server.log")))
+
+def test_host_file_commands():
+    async def scenario(tmp):
+        snapshot = os.path.join(tmp, "vfs.snap")
+        server = VFSServer(VFS(), XMLLogger(os.path.join(tmp, "server.log")))
+        await server.start("127.0.0.1:0")
+        host, port = server.addresses()[0][:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        await reader.readuntil(PROMPT)
+        # Клиенты сети не читают и не пишут файлы хоста
+        for line in (f"save {snapshot}", f"load {snapshot}", "compact"):
+            assert "Unknown command" in await send(reader, writer, line), line
+        assert not os.path.exists(snapshot)
+        assert "save" not in await send(reader, writer, "help")
+        writer.write(b"exit\n")
+        await reader.read()
+        writer.close()
+        await server.close()
+        server.logger.close()
+
+        # С явного разрешения команды доступны
+        server = VFSServer(VFS(), XMLLogger(os.devnull), host_files=True)
+        assert server.registry.get("save") is not None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(tmp))
+
+def test_stalled_client():
+    async def scenario():
+        vfs = VFS()
+        vfs.write_file("/home/user/big.txt", ("x" * 63 + "\n") * 500000)
+        server = VFSServer(vfs, XMLLogger(os.devnull))
+        server.LOCKED_DRAIN_TIMEOUT = 0.3
+        await server.start("127.0.0.1:0")
+        host, port = server.addresses()[0][:2]
+
+        # Клиент запускает длинный вывод и ничего не читает
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, (host, port))
+        _, stalled = await asyncio.open_connection(sock=sock)
+        stalled.write(b"cat /home/user/big.txt\n")
+        await stalled.drain()
+        await asyncio.sleep(0.1)
+
+        # Запись другой сессии ждет блокировку не дольше LOCKED_DRAIN_TIMEOUT
+        reader, writer = await asyncio.open_connection(host, port)
+        await reader.readuntil(PROMPT)
+        start = time.perf_counter()
+        await send(reader, writer, "echo done > /home/user/new.txt")
+        assert time.perf_counter() - start < 5
+        assert vfs.resolve("/home/user/new.txt") is not None
+        assert len(server.sessions) == 1
+        writer.write(b"exit\n")
+        await reader.read()
+        writer.close()
+        stalled.close()
+        await server.close()
+
+    asyncio.run(scenario())
+
+def test_read_write_lock():
+    async def scenario():
+        lock = ReadWriteLock()
+        events = []
+
+        async def reader(name, delay):
+            async with lock.read():
+                events.append(f"{name}+")
+                await asyncio.sleep(delay)
+                events.append(f"{name}-")
+
+        async def writer(name):
+            async with lock.write():
+                events.append(f"{name}+")
+                await asyncio.sleep(0)
+                events.append(f"{name}-")
+
+        first = asyncio.create_task(reader("r1", 0.01))
+        await asyncio.sleep(0)
+        # r2 пришел после ждущего писателя и ждет за ним
+        await asyncio.gather(writer("w"), reader("r2", 0), first)
+        assert events == ["r1+", "r1-", "w+", "w-", "r2+", "r2-"]
+
+    asyncio.run(scenario())
+    print("All server tests passed!")
+
+if __name__ == "__main__":
+    test_sessions()
+    test_host_file_commands()
+    test_stalled_client()
+    test_read_write_lock()
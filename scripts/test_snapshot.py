@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+import os
+import tempfile
+from snapshot import MappedContent, is_snapshot
+from vfs import VFS
+
+def walk(node):
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        yield current
+        stack.extend(current.children.values())
+
+def test_snapshot_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "image.snap")
+        vfs = VFS()
+        vfs._find_node("/etc/config.conf").content = "ключ=значение"
+        assert vfs.save_snapshot(path) == 10
+        assert is_snapshot(path)
+        
+        loaded = VFS()
+        # Загрузка ничего не пишет в stdout - там только вывод команд
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            loaded.load_snapshot(path)
+        assert stdout.getvalue() == ""
+        original = [(n.get_path(), n.is_file, n.owner, n.permissions) for n in walk(vfs.root)]
+        restored = [(n.get_path(), n.is_file, n.owner, n.permissions) for n in walk(loaded.root)]
+        assert original == restored
+        
+        # Содержимое не копируется при загрузке, а читается из mmap
+        config = loaded._find_node("/etc/config.conf")
+        assert isinstance(config._content, MappedContent)
+        assert config._content.read_bytes() == "ключ=значение".encode("utf-8")
+        assert config.content == "ключ=значение"
+        assert loaded.verify_aggregates(loaded.root)
+        
+        # Повторное сохранение того же дерева дает идентичный файл
+        again = os.path.join(tmp, "again.snap")
+        loaded.save_snapshot(again)
+        loaded.save_snapshot(path)
+        with open(path, "rb") as a, open(again, "rb") as b:
+            assert a.read() == b.read()
+            
+    print("All snapshot tests passed!")
+
+if __name__ == "__main__":
+    test_snapshot_roundtrip()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+import base64
+import json
+import os
+import tempfile
+from json_stream import JSONEventReader
+from vfs import VFS, VFSNode, LazyContent
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vfs_examples")
+
+def test_aggregates():
+    vfs = VFS()
+    root = vfs.root
+    
+    assert vfs.calculate_size(root) == vfs.compute_aggregates(root)[0]
+    assert root.file_count == 5
+    assert root.dir_count == 4
+    
+    # Изменение содержимого обновляет всех предков
+    readme = vfs._find_node("/home/user/README.md")
+    readme.content = readme.content + "!!!"
+    assert vfs.verify_aggregates(root)
+    
+    # Перемещение поддерева переносит агрегаты
+    user_dir = vfs._find_node("/home/user")
+    etc_dir = vfs._find_node("/etc")
+    home_size = vfs._find_node("/home").size
+    etc_dir.add_child(vfs._find_node("/home").remove_child("user"))
+    assert vfs._find_node("/home").size == 0
+    assert etc_dir.size == len("setting=value") + home_size
+    assert vfs.verify_aggregates(root)
+    assert vfs.verify_aggregates(user_dir)
+
+def test_aggregates_loaded():
+    vfs = VFS()
+    vfs.load_from_json(os.path.join(EXAMPLES, "complex.json"))
+    assert vfs.verify_aggregates(vfs.root)
+    assert vfs.root.file_count == 3
+    
+    # Глубокое дерево не упирается в лимит рекурсии
+    node = vfs.root
+    for i in range(2000):
+        child = VFSNode(f"d{i}")
+        node.add_child(child)
+        node = child
+    node.add_child(VFSNode("leaf", is_file=True, content="x"))
+    assert vfs.verify_aggregates(vfs.root)
+    
+def test_path_resolution():
+    vfs = VFS()
+    user_dir = vfs._find_node("/home/user")
+    
+    assert vfs._find_node("/home//user/") is user_dir
+    assert vfs._find_node("/home/user/../user/./documents").get_path() == "/home/user/documents"
+    assert vfs._find_node("/missing") is None
+    
+    assert vfs.change_directory("home")
+    assert vfs._find_node("user") is user_dir
+    assert not vfs.change_directory("user/README.md")
+    assert vfs.current_dir.get_path() == "/home"
+    
+    # После перемещения кэш путей не отдает старые узлы
+    vfs.move_node(user_dir, vfs._find_node("/etc"), "u")
+    assert vfs._find_node("/home/user") is None
+    assert vfs._find_node("/etc/u/documents/file1.txt").get_path() == "/etc/u/documents/file1.txt"
+    assert user_dir.get_path() == "/etc/u"
+    
+def test_lazy_loading():
+    image = {"name": "root", "type": "directory", "meta": {"children": [1]}, "children": [
+        {"name": "a.txt", "type": "file", "content": "SGVsbG8gV29ybGQh", "owner": "alice"},
+        {"name": "sub", "type": "directory", "children": [
+            {"name": "b.txt", "type": "file", "content": "YQ=="},
+            {"name": "empty", "type": "file", "content": ""},
+        ]},
+    ]}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "image.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(image, f, indent=2)
+            
+        vfs = VFS()
+        vfs.load_from_json(path)
+        a_node = vfs._find_node("/a.txt")
+        
+        # До чтения содержимое не декодировано, но размеры уже известны
+        assert isinstance(a_node._content, LazyContent)
+        assert vfs.calculate_size(vfs.root) == 13
+        assert vfs.root.file_count == 3 and vfs.root.dir_count == 1
+        assert a_node.owner == "alice"
+        assert list(vfs.root.children) == ["a.txt", "sub"]
+        
+        assert a_node.content == "Hello World!"
+        assert vfs._find_node("/sub/b.txt").content == "a"
+        assert vfs.verify_aggregates(vfs.root)
+        
+        eager = VFS()
+        eager.load_from_json(path, lazy=False)
+        assert eager._find_node("/sub/b.txt")._content == b"a"
+        
+def test_binary_dedup():
+    binary = bytes(range(256))
+    text = "ключ=значение".encode("utf-8")
+    files = [binary, binary, text, binary]
+    image = {"name": "root", "type": "directory", "children": [
+        {"name": f"f{i}", "type": "file", "content": base64.b64encode(data).decode("ascii")}
+        for i, data in enumerate(files)
+    ]}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "image.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(image, f)
+            
+        vfs = VFS()
+        vfs.load_from_json(path)
+        nodes = [vfs._find_node(f"/f{i}") for i in range(len(files))]
+        
+        # Размеры в байтах, двоичные данные не искажаются
+        assert [node.size for node in nodes] == [256, 256, 25, 256]
+        assert vfs.calculate_size(vfs.root) == 3 * 256 + 25
+        assert nodes[0].data == binary and nodes[2].content == "ключ=значение"
+        
+        # Одинаковое содержимое хранится одним объектом
+        assert nodes[0].data is nodes[1].data is nodes[3].data
+        assert len(vfs.contents) == 2
+        
+        # Записи не попадают в хранилище: старые версии файла не удерживаются
+        for i in range(100):
+            vfs.write_file("/log", f"{i}\n", append=True)
+        assert len(vfs.contents) == 2
+        assert vfs._find_node("/log").content.count("\n") == 100
+    
+def test_wrapped_base64():
+    wrapped = bytes(range(200))
+    slashes = b"\xff" * 30
+    image = {"name": "root", "type": "directory", "children": [
+        # MIME-переносы строк (base64.encodebytes) и экранированный / в JSON
+        {"name": "wrapped", "type": "file", "content": base64.encodebytes(wrapped).decode("ascii")},
+        {"name": "slashes", "type": "file", "content": "__SLASHES__"},
+        {"name": "plain", "type": "file", "content": base64.b64encode(b"plain").decode("ascii")},
+    ]}
+    text = json.dumps(image).replace("__SLASHES__", base64.b64encode(slashes).decode("ascii").replace("/", "\\/"))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "image.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+            
+        vfs = VFS()
+        vfs.load_from_json(path)
+        # Размеры точные сразу после загрузки, а не только после чтения
+        assert vfs.root.size == 200 + 30 + 5
+        assert vfs.verify_aggregates(vfs.root)
+        assert isinstance(vfs._find_node("/plain")._content, LazyContent)
+        assert vfs._find_node("/wrapped").data == wrapped
+        assert vfs._find_node("/slashes").data == slashes
+        assert vfs.verify_aggregates(vfs.root)
+        
+        # Длинная строка, пропускаемая по частям буфера, помечается так же
+        with open(path, "rb") as f:
+            refs = [event for event in JSONEventReader(f, lazy_keys=("content",), chunk_size=16)
+                    if event[0] == "ref"]
+        assert [event[4] for event in refs] == [False, False, True]
+        
+    print("All VFS tests passed!")
+
+if __name__ == "__main__":
+    test_aggregates()
+    test_aggregates_loaded()
+    test_path_resolution()
+    test_lazy_loading()
+    test_binary_dedup()
+    test_wrapped_base64()
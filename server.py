@@ -0,0 +1,226 @@
+import asyncio
+import contextlib
+from collections import deque
+
+from commands import BUILTINS, CommandExecutor
+
+class ReadWriteLock:
+    """Асинхронная блокировка чтения/записи для сессий в одном цикле asyncio.
+
+    Ожидающие обслуживаются по очереди: читатель, пришедший после ждущего
+    писателя, ждет за ним, поэтому поток команд чтения не может бесконечно
+    откладывать mv и chown. Освобождение будит только тех, кто получает
+    блокировку, а не всех ожидающих.
+    """
+
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._waiters = deque()  # (писатель?, future) в порядке прихода
+
+    @contextlib.asynccontextmanager
+    async def read(self):
+        await self._acquire(False)
+        try:
+            yield
+        finally:
+            self._readers -= 1
+            self._wake()
+
+    @contextlib.asynccontextmanager
+    async def write(self):
+        await self._acquire(True)
+        try:
+            yield
+        finally:
+            self._writer = False
+            self._wake()
+
+    async def _acquire(self, writer):
+        if not self._waiters and not self._writer and not (writer and self._readers):
+            self._grant(writer)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((writer, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Блокировка уже выдана отмененной задаче - возвращаем ее
+                if writer:
+                    self._writer = False
+                else:
+                    self._readers -= 1
+            self._wake()
+            raise
+
+    def _grant(self, writer):
+        if writer:
+            self._writer = True
+        else:
+            self._readers += 1
+
+    def _wake(self):
+        waiters = self._waiters
+        while waiters and not self._writer:
+            writer, future = waiters[0]
+            if future.done():
+                waiters.popleft()
+                continue
+            if writer and self._readers:
+                break
+            waiters.popleft()
+            self._grant(writer)
+            future.set_result(None)
+            if writer:
+                break
+
+class Session:
+    """Подключение: свой CommandExecutor и свой текущий каталог над общим деревом"""
+
+    def __init__(self, server, peer):
+        self.peer = peer
+        self.executor = CommandExecutor(server.vfs, server.logger, server.registry, server.profiler)
+        self.cwd = server.vfs.root
+        self.commands_run = 0
+
+class VFSServer:
+    """Сетевой REPL: много сессий над одним VFS в одном цикле asyncio.
+
+    Команды выполняются в потоке цикла; вывод отдается блоками, и следующий
+    блок вычисляется только после того, как клиент принял предыдущий.
+
+    Вывод не копится в памяти, но блокировка держится, пока клиент его
+    принимает. Поэтому внутри блокировки клиент ждется не дольше
+    LOCKED_DRAIN_TIMEOUT: кто не читает вывод, отключается, и остальные
+    сессии не простаивают. Медленный, но живой клиент на большом выводе
+    тоже может быть отключен - это плата за ограниченную память сервера.
+    """
+
+    PROMPT = "$ "
+    CHUNK_LINES = 256
+    WRITE_BUFFER_HIGH = 64 * 1024
+    DRAIN_TIMEOUT = 30.0  # секунд ожидания медленного клиента вне блокировки
+    LOCKED_DRAIN_TIMEOUT = 2.0  # то же, пока сессия держит блокировку
+    MAX_LINE = 64 * 1024
+    BACKLOG = 4096  # очередь accept для всплеска одновременных подключений
+
+    def __init__(self, vfs, logger, registry=None, profiler=None, host_files=False):
+        self.vfs = vfs
+        self.logger = logger
+        registry = registry if registry is not None else BUILTINS.copy()
+        # save, load и compact работают с файлами хоста и с деревом всех
+        # сессий - клиентам они доступны только с явного разрешения
+        self.registry = registry if host_files else registry.without_host_files()
+        self.profiler = profiler
+        self.lock = ReadWriteLock()
+        self.sessions = set()
+        self.commands_run = 0
+        self._server = None
+
+    async def start(self, address):
+        """address - "HOST:PORT" для TCP или "unix:PATH" для UNIX-сокета"""
+        if address.startswith("unix:"):
+            self._server = await asyncio.start_unix_server(self.handle, address[5:], limit=self.MAX_LINE,
+                                                          backlog=self.BACKLOG)
+        else:
+            host, _, port = address.rpartition(":")
+            self._server = await asyncio.start_server(self.handle, host or "127.0.0.1", int(port),
+                                                      limit=self.MAX_LINE, backlog=self.BACKLOG)
+        return self._server
+
+    def addresses(self):
+        return [sock.getsockname() for sock in self._server.sockets] if self._server else []
+
+    async def serve_forever(self, address):
+        server = await self.start(address)
+        print(f"Serving VFS on {', '.join(str(name) for name in self.addresses())}")
+        async with server:
+            await server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def handle(self, reader, writer):
+        writer.transport.set_write_buffer_limits(high=self.WRITE_BUFFER_HIGH)
+        session = Session(self, writer.get_extra_info("peername"))
+        self.sessions.add(session)
+        try:
+            await self._send(writer, f"=== VFS Emulator ===\n{self.PROMPT}")
+            while True:
+                try:
+                    data = await reader.readline()
+                except ValueError:
+                    await self._send(writer, f"Error: line too long\n{self.PROMPT}")
+                    break
+                if not data:
+                    break
+                line = data.decode("utf-8", errors="replace").strip()
+                tail = ""
+                if line:
+                    if await self.run_line(session, line, writer):
+                        tail = "\n"
+                    if session.executor.exit_requested:
+                        await self._send(writer, tail)
+                        break
+                await self._send(writer, tail + self.PROMPT)
+        except ConnectionError:
+            pass
+        except asyncio.TimeoutError:
+            # Клиент не принимает вывод: непереданные данные отбрасываются
+            writer.transport.abort()
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+            with contextlib.suppress(ConnectionError, asyncio.TimeoutError):
+                await asyncio.wait_for(writer.wait_closed(), self.DRAIN_TIMEOUT)
+
+    async def run_line(self, session, line, writer):
+        """Выполняет строку под блокировкой; True, если команда что-то вывела"""
+        session.commands_run += 1
+        self.commands_run += 1
+        executor = session.executor
+        lock = self.lock.write() if executor.line_mutates(line) else self.lock.read()
+        async with lock:
+            self._check_cwd(session)
+            output = executor.execute_line_iter(line, self.CHUNK_LINES)
+            written = False
+            try:
+                while True:
+                    chunk = self._step(session, output)
+                    if chunk is None:
+                        break
+                    if chunk:
+                        # Блокировка держится, пока клиент не примет вывод
+                        await self._send(writer, chunk, self.LOCKED_DRAIN_TIMEOUT)
+                        written = True
+            finally:
+                output.close()
+        return written
+
+    def _step(self, session, output):
+        """Следующий блок вывода команды с текущим каталогом этой сессии"""
+        vfs = self.vfs
+        vfs.current_dir = session.cwd
+        try:
+            return next(output, None)
+        finally:
+            session.cwd = vfs.current_dir
+
+    def _check_cwd(self, session):
+        # Каталог сессии мог быть удален другой сессией или заменен load
+        node = session.cwd
+        while node.parent is not None:
+            node = node.parent
+        if node is not self.vfs.root:
+            session.cwd = self.vfs.root
+
+    async def _send(self, writer, text, timeout=None):
+        if text:
+            writer.write(text.encode("utf-8"))
+        # Ожидание только при заполненном буфере: вывод следующего блока
+        # не вычисляется, пока клиент не примет предыдущие
+        if writer.transport.get_write_buffer_size() > self.WRITE_BUFFER_HIGH:
+            await asyncio.wait_for(writer.drain(), timeout or self.DRAIN_TIMEOUT)
@@ -0,0 +1,175 @@
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+from vfs import VFSNode, ContentRef, ContentStore
+
+MAGIC = b'VFSSNAP1'
+# magic, число узлов, число строк, смещения таблицы узлов, строк и блока содержимого
+HEADER = struct.Struct('<8sQQQQQ')
+# родитель (-1 у корня), флаги, имя, владелец, права (индексы строк), смещение и длина содержимого
+NODE = struct.Struct('<iIIIIQQ')
+STRING_LEN = struct.Struct('<I')
+FLAG_FILE = 1
+
+class MappedContent(ContentRef):
+    """Содержимое файла - место в отображенном в память блоке снапшота.
+
+    При загрузке данные не читаются; первое чтение копирует срез mmap в bytes.
+    """
+    __slots__ = ('snapshot', 'offset')
+
+    def __init__(self, snapshot, offset, size, store=None):
+        super().__init__(size, store)
+        self.snapshot = snapshot
+        self.offset = offset
+
+    def read_bytes(self):
+        start = self.snapshot.blob_offset + self.offset
+        return self.snapshot.mm[start:start + self.size]
+
+class Snapshot:
+    """Открытый снапшот: держит mmap, пока на него ссылается содержимое файлов"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+
+        magic, self.node_count, self.string_count, self.node_offset, \
+            self.string_offset, self.blob_offset = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a VFS snapshot: {path}")
+
+    def read_strings(self):
+        strings = []
+        pos = self.string_offset
+        for _ in range(self.string_count):
+            (length,) = STRING_LEN.unpack_from(self.mm, pos)
+            pos += STRING_LEN.size
+            strings.append(str(self.view[pos:pos + length], 'utf-8'))
+            pos += length
+        return strings
+
+    def build_tree(self, store=None):
+        strings = self.read_strings()
+        # Одинаковое содержимое записано в блок один раз - файлы делят одну ссылку
+        refs = {}
+        table = self.view[self.node_offset:self.node_offset + self.node_count * NODE.size]
+
+        nodes = []
+        children = []
+        for parent, flags, name, owner, permissions, offset, length in NODE.iter_unpack(table):
+            is_file = bool(flags & FLAG_FILE)
+            content = b""
+            if is_file:
+                content = refs.get(offset)
+                if content is None:
+                    content = refs[offset] = MappedContent(self, offset, length, store)
+            node = VFSNode(
+                strings[name],
+                is_file=is_file,
+                content=content,
+                owner=strings[owner],
+                permissions=strings[permissions]
+            )
+            nodes.append(node)
+            children.append([])
+            if parent >= 0:
+                children[parent].append(len(nodes) - 1)
+
+        # Потомки имеют больший индекс, чем родитель: при обходе с конца узел
+        # еще не подвешен к своему родителю, и add_child не обходит предков
+        for index in range(len(nodes) - 1, -1, -1):
+            node = nodes[index]
+            for child in children[index]:
+                node.add_child(nodes[child])
+        return nodes[0] if nodes else VFSNode("")
+
+def content_bytes(node):
+    """Байты содержимого файла; ссылка на образ не подменяет содержимое узла"""
+    content = node._content
+    if isinstance(content, ContentRef):
+        return content._data if content._data is not None else content.read_bytes()
+    return content
+
+def save_snapshot(root, path):
+    """Сохраняет дерево в снапшот; файл заменяется атомарно.
+
+    Одинаковое содержимое записывается в блок один раз (по хешу).
+    """
+    node_count = root.file_count + root.dir_count + 1 if not root.is_file else 1
+    strings = {}
+    blobs = {}
+
+    def intern(value):
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, 'wb') as out, tempfile.TemporaryFile() as blob:
+            out.write(b'\0' * HEADER.size)
+            node_offset = HEADER.size
+            blob_size = 0
+            written = 0
+
+            # Прямой обход: индекс родителя всегда меньше индекса потомка
+            stack = [(root, -1)]
+            while stack:
+                node, parent = stack.pop()
+                index = written
+                offset = length = 0
+                if node.is_file:
+                    data = content_bytes(node)
+                    address = ContentStore.address(data)
+                    if address in blobs:
+                        offset, length = blobs[address]
+                    else:
+                        offset, length = blobs[address] = blob_size, len(data)
+                        blob.write(data)
+                        blob_size += length
+                out.write(NODE.pack(
+                    parent, FLAG_FILE if node.is_file else 0,
+                    intern(node.name), intern(node.owner), intern(node.permissions),
+                    offset, length
+                ))
+                written += 1
+                stack.extend((child, index) for child in reversed(list(node.children.values())))
+
+            if written != node_count:
+                raise ValueError("Snapshot node count mismatch")
+
+            string_offset = out.tell()
+            for value in strings:
+                data = value.encode('utf-8')
+                out.write(STRING_LEN.pack(len(data)))
+                out.write(data)
+
+            blob_offset = out.tell()
+            blob.seek(0)
+            shutil.copyfileobj(blob, out)
+
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, written, len(strings), node_offset, string_offset, blob_offset))
+
+        # Старый файл мог быть отображен в память другим процессом - не перезаписываем его
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written
+
+def load_snapshot(path, store=None):
+    return Snapshot(path).build_tree(store)
+
+def is_snapshot(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
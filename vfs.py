@@ -1,37 +1,264 @@
 import json
 import base64
-from pathlib import Path
+import hashlib
+import sys
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from types import MappingProxyType
+
+from json_stream import JSONEventReader
+
+class ContentStore:
+    """Хранилище содержимого с адресацией по хешу: одинаковые данные хранятся один раз.
+
+    Сюда попадает только содержимое, прочитанное из образа (его объем ограничен
+    образом); записи команд не интернируются - иначе каждая версия файла
+    оставалась бы в памяти и после перезаписи или rm.
+    """
+    
+    def __init__(self):
+        self._blobs = {}
+        
+    @staticmethod
+    def address(data):
+        return hashlib.blake2b(data, digest_size=16).digest()
+    
+    def intern(self, data):
+        """Возвращает общий объект bytes с тем же содержимым"""
+        key = self.address(data)
+        blob = self._blobs.get(key)
+        if blob is None:
+            blob = self._blobs[key] = bytes(data)
+        return blob
+    
+    def __len__(self):
+        return len(self._blobs)
+
+class ContentRef(ABC):
+    """Недекодированное содержимое файла: размер в байтах известен, данные читаются по требованию.
+
+    Одна ссылка может быть общей для нескольких файлов с одинаковым содержимым;
+    прочитанные данные запоминаются и попадают в ContentStore.
+    """
+    __slots__ = ('size', 'store', '_data')
+    
+    def __init__(self, size, store=None):
+        self.size = size
+        self.store = store
+        self._data = None
+        
+    def __len__(self):
+        return self.size
+    
+    @abstractmethod
+    def read_bytes(self):
+        """Читает содержимое из источника (образа или снапшота)"""
+    
+    def resolve(self):
+        if self._data is None:
+            data = self.read_bytes()
+            self._data = self.store.intern(data) if self.store is not None else data
+        return self._data
+
+class LazyContent(ContentRef):
+    """Ссылка на base64-содержимое файла внутри JSON-образа.
+
+    Хранит только смещение и длину строки в файле; декодируется при первом чтении.
+    """
+    __slots__ = ('path', 'offset', 'length')
+    
+    def __init__(self, path, offset, length, tail=b'', store=None):
+        super().__init__(max(0, length * 3 // 4 - tail.count(b'=')), store)
+        self.path = path
+        self.offset = offset
+        self.length = length
+        
+    def read_bytes(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            raw = f.read(self.length)
+        if b'\\' in raw:
+            raw = json.loads(b'"' + raw + b'"').encode('ascii')
+        return base64.b64decode(raw)
+
+# Общий пустой словарь потомков для всех файлов (только для чтения)
+NO_CHILDREN = MappingProxyType({})
 
 class VFSNode:
+    # Без __dict__ у каждого узла; владельцы и права интернируются,
+    # поэтому миллионы узлов делят несколько строковых объектов
+    __slots__ = ('name', 'is_file', 'owner', 'permissions', 'children', 'parent',
+                 '_path', 'size', 'file_count', 'dir_count', '_content', '_sorted_names')
+    
     def __init__(self, name, is_file=False, content="", owner="user", permissions="rw-r--r--"):
         self.name = name
         self.is_file = is_file
-        self.content = content
-        self.owner = owner
-        self.permissions = permissions
-        self.children = {}
+        self.owner = sys.intern(owner)
+        self.permissions = sys.intern(permissions)
+        self.children = NO_CHILDREN if is_file else {}
         self.parent = None
+        self._path = None
+        # Отсортированный индекс имен потомков - строится при первом листинге
+        self._sorted_names = None
+        # Агрегаты поддерева: для директорий - суммарный размер файлов,
+        # число файлов и поддиректорий; для файла - размер содержимого
+        self.size = 0
+        self.file_count = 0
+        self.dir_count = 0
+        self._content = b""
+        self.content = content
+        
+    @property
+    def data(self):
+        """Содержимое файла в байтах; ссылка на образ читается при первом обращении"""
+        if isinstance(self._content, ContentRef):
+            self._content = self._content.resolve()
+            # Размер ссылки вычислен без декодирования; у некорректного base64
+            # он может не совпасть с данными - агрегаты исправляются
+            delta = len(self._content) - self.size
+            if delta:
+                self.size += delta
+                if self.parent:
+                    self.parent._update_aggregates(delta, 0, 0)
+        return self._content
+    
+    @property
+    def content(self):
+        """Содержимое как текст UTF-8 (недекодируемые байты заменяются)"""
+        return self.data.decode('utf-8', errors='replace')
+    
+    @content.setter
+    def content(self, value):
+        # Принимает str (кодируется в UTF-8), bytes или ContentRef
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        self._content = value
+        if self.is_file:
+            delta = len(value) - self.size
+            self.size += delta
+            if delta and self.parent:
+                self.parent._update_aggregates(delta, 0, 0)
+                
+    def content_length(self):
+        return len(self._content)
+    
+    def _update_aggregates(self, size, files, dirs):
+        current = self
+        while current:
+            current.size += size
+            current.file_count += files
+            current.dir_count += dirs
+            current = current.parent
+            
+    def _subtree_counts(self):
+        if self.is_file:
+            return self.size, 1, 0
+        return self.size, self.file_count, self.dir_count + 1
         
     def add_child(self, node):
+        if self.is_file:
+            raise ValueError(f"Not a directory: {self.get_path()}")
+        if node.name in self.children:
+            self.remove_child(node.name)
         node.parent = self
         self.children[node.name] = node
+        if self._sorted_names is not None:
+            insort(self._sorted_names, node.name)
+        self._update_aggregates(*node._subtree_counts())
+        
+    def remove_child(self, name):
+        node = self.children.pop(name)
+        if self._sorted_names is not None:
+            del self._sorted_names[bisect_left(self._sorted_names, name)]
+        size, files, dirs = node._subtree_counts()
+        self._update_aggregates(-size, -files, -dirs)
+        node.parent = None
+        node._invalidate_paths()
+        return node
         
     def get_child(self, name):
         return self.children.get(name)
     
+    def sorted_names(self):
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self.children)
+        return self._sorted_names
+    
+    def iter_children(self, offset=0, limit=None, show_hidden=True):
+        """Потомки в порядке имен, с пропуском offset и не более limit штук"""
+        names = self.sorted_names()
+        ranges = [(0, len(names))]
+        if not show_hidden:
+            # Скрытые имена образуют в отсортированном списке непрерывный блок
+            start = bisect_left(names, ".")
+            end = bisect_left(names, "/")
+            ranges = [(0, start), (end, len(names))]
+            
+        remaining = limit
+        for start, end in ranges:
+            if offset >= end - start:
+                offset -= end - start
+                continue
+            for i in range(start + offset, end):
+                if remaining is not None:
+                    if remaining <= 0:
+                        return
+                    remaining -= 1
+                yield self.children[names[i]]
+            offset = 0
+    
     def get_path(self):
-        path_parts = []
+        if self._path is not None:
+            return self._path
+            
+        # Поднимаемся только до ближайшего предка с готовым путем
+        chain = []
         current = self
-        while current and current.name:
-            path_parts.insert(0, current.name)
+        while current and current.name and current._path is None:
+            chain.append(current)
             current = current.parent
-        return "/" + "/".join(path_parts) if path_parts else "/"
+            
+        prefix = current._path if current and current.name else ""
+        for node in reversed(chain):
+            prefix = node._path = f"{prefix}/{node.name}"
+        if not chain:
+            self._path = "/"
+        return self._path
+    
+    def _invalidate_paths(self):
+        # Путь кэшируется только если он кэширован у всех предков,
+        # поэтому обход можно обрывать на узлах без кэша
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node._path is None:
+                continue
+            node._path = None
+            stack.extend(node.children.values())
 
 class VFS:
-    def __init__(self):
+    PATH_CACHE_SIZE = 4096
+    
+    def __init__(self, sample=True):
         self.root = VFSNode("")
         self.current_dir = self.root
-        self._create_sample_structure()  # ДОБАВЛЕНО: создаем тестовые данные
+        self._path_cache = OrderedDict()
+        # Содержимое файлов, записанных в этой сессии или прочитанных из образа
+        self.contents = ContentStore()
+        # Журнал отмены: обратные операции для изменений после первого снапшота
+        # (None, пока снапшотов нет - тогда изменения ничего не стоят)
+        self._undo = None
+        # Имя снапшота -> (длина журнала отмены, текущий каталог)
+        self._snapshots = {}
+        # Вторичные индексы для find (index.NodeIndex); строятся при первом поиске
+        self._index = None
+        # Журнал изменений на диске (journal.Journal) или None
+        self.journal = None
+        # Тестовые данные не нужны, если дерево сразу заменяется образом
+        if sample:
+            self._create_sample_structure()
         
     def _create_sample_structure(self):
         """Создает тестовую структуру файлов по умолчанию"""
@@ -64,121 +291,542 @@ class VFS:
         
         self.current_dir = self.root
         
-    def load_from_json(self, json_path):
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    def load_from_json(self, json_path, lazy=True):
+        """Загружает JSON-образ потоково; содержимое файлов читается при первом обращении (если lazy)"""
+        store = ContentStore()
+        with open(json_path, 'rb') as f:
+            events = JSONEventReader(f, lazy_keys=("content",))
+            root = self._build_tree(events, json_path, lazy, store)
+            
+        if root is None:
+            raise ValueError(f"Invalid VFS image: {json_path}")
+        self._set_root(root, store, json_path)
+        
+    def load_image(self, path):
+        """Загружает JSON-образ или бинарный снапшот (формат определяется по сигнатуре)"""
+        import snapshot
+        if snapshot.is_snapshot(path):
+            self.load_snapshot(path)
+        else:
+            self.load_from_json(path)
             
-        self.root = self._build_tree(data, None)
+    def load_snapshot(self, path):
+        import snapshot
+        store = ContentStore()
+        self._set_root(snapshot.load_snapshot(path, store), store, path)
+        
+    def _set_root(self, root, store=None, source=None):
+        self._record(("root", self.root, self.current_dir))
+        self._index = None
+        self.contents = store if store is not None else ContentStore()
+        self.root = root
+        # Корень образа - это "/", а не директория с именем из образа
+        self.root.name = ""
         self.current_dir = self.root
-        print(f"VFS loaded from {json_path}")
+        self._path_cache.clear()
+        if self.journal is not None:
+            self.journal.rebase(source)
+        
+    def save_snapshot(self, path):
+        import snapshot
+        return snapshot.save_snapshot(self.root, path)
+        
+    def _build_tree(self, events, json_path, lazy=True, store=None):
+        """Строит дерево из потока JSON-событий без рекурсии.
+
+        Содержимое файлов остается ссылкой LazyContent (если lazy), поэтому
+        память зависит от формы дерева, а не от объема данных.
+        """
+        frames = []       # незавершенные узлы: (атрибуты, дочерние узлы)
+        key = None
+        in_children = []  # для каждого кадра: находимся ли внутри "children"
+        skip_depth = 0    # глубина вложенности неизвестных полей
+        root = None
         
-    def _build_tree(self, data, parent):
-        if data["type"] == "file":
-            content = base64.b64decode(data.get("content", "")).decode('utf-8') if data.get("content") else ""
-            node = VFSNode(
-                data["name"], 
+        for event in events:
+            kind = event[0]
+            if skip_depth:
+                if kind in ('start_map', 'start_array'):
+                    skip_depth += 1
+                elif kind in ('end_map', 'end_array'):
+                    skip_depth -= 1
+                continue
+                
+            if kind == 'key':
+                key = event[1]
+            elif kind == 'start_map':
+                if frames and not in_children[-1]:
+                    skip_depth = 1
+                    continue
+                frames.append(({}, []))
+                in_children.append(False)
+            elif kind == 'start_array':
+                if frames and key == "children" and not in_children[-1]:
+                    in_children[-1] = True
+                else:
+                    skip_depth = 1
+            elif kind == 'end_array':
+                in_children[-1] = False
+            elif kind == 'value':
+                frames[-1][0][key] = event[1]
+            elif kind == 'ref':
+                _, offset, length, tail, exact = event
+                content = LazyContent(json_path, offset, length, tail, store=store)
+                # Размер base64 с переносами строк или экранированием по длине не
+                # вычислить - такое содержимое декодируется сразу
+                frames[-1][0][key] = content if lazy and exact else content.resolve()
+            elif kind == 'end_map':
+                attrs, children = frames.pop()
+                in_children.pop()
+                node = self._make_node(attrs)
+                for child in children:
+                    node.add_child(child)
+                if frames:
+                    frames[-1][1].append(node)
+                else:
+                    root = node
+        return root
+    
+    def _make_node(self, data):
+        if data.get("type") == "file":
+            return VFSNode(
+                data.get("name", ""), 
                 is_file=True, 
-                content=content,
+                content=data.get("content") or "",
                 owner=data.get("owner", "user"),
                 permissions=data.get("permissions", "rw-r--r--")
             )
-        else:
-            node = VFSNode(
-                data["name"],
-                is_file=False,
-                owner=data.get("owner", "user"),
-                permissions=data.get("permissions", "rwxr-xr-x")
-            )
-            for child_data in data.get("children", []):
-                child_node = self._build_tree(child_data, node)
-                node.add_child(child_node)
-                
-        if parent:
-            parent.add_child(node)
-            
-        return node
+        return VFSNode(
+            data.get("name", ""),
+            is_file=False,
+            owner=data.get("owner", "user"),
+            permissions=data.get("permissions", "rwxr-xr-x")
+        )
     
     def change_directory(self, path):
-        if path == "/" or path == "":
-            self.current_dir = self.root
-            return True
+        if path == "":
+            path = "/"
             
-        if path.startswith("/"):
-            target_dir = self.root
-            path_parts = [p for p in path[1:].split("/") if p]
-        else:
-            target_dir = self.current_dir
-            path_parts = [p for p in path.split("/") if p]
+        target_dir = self.resolve(path)
+        if not target_dir or target_dir.is_file:
+            return False
             
-        for part in path_parts:
-            if part == "..":
-                if target_dir.parent:
-                    target_dir = target_dir.parent
-            elif part == ".":
-                continue
-            elif part:
-                if part in target_dir.children and not target_dir.children[part].is_file:
-                    target_dir = target_dir.children[part]
-                else:
-                    return False
-                    
         self.current_dir = target_dir
         return True
     
     def list_directory(self, path="."):
-        if path == ".":
-            target_dir = self.current_dir
-        elif path == "/":
-            target_dir = self.root
-        else:
-            target_dir = self._find_node(path)
-            if not target_dir or target_dir.is_file:
-                return None
-                
-        items = []
-        for name, node in target_dir.children.items():
-            items.append({
-                'name': name,
-                'type': 'file' if node.is_file else 'directory',
-                'permissions': node.permissions,
-                'owner': node.owner,
-                'size': len(node.content) if node.is_file else 0
-            })
-            
-        return items
+        items = self.iter_directory(path)
+        return list(items) if items is not None else None
+    
+    def iter_directory(self, path=".", offset=0, limit=None, show_hidden=True):
+        """Генератор записей каталога в порядке имен (None, если каталога нет)"""
+        target_dir = self.current_dir if path == "." else self._find_node(path)
+        if not target_dir or target_dir.is_file:
+            return None
+        return (self._dir_entry(node)
+                for node in self.iter_children(target_dir, offset, limit, show_hidden))
+    
+    def iter_children(self, node, offset=0, limit=None, show_hidden=True):
+        """Потомки каталога в порядке имен (точка входа для листинга)"""
+        return node.iter_children(offset, limit, show_hidden)
+    
+    def _dir_entry(self, node):
+        return {
+            'name': node.name,
+            'type': 'file' if node.is_file else 'directory',
+            'permissions': node.permissions,
+            'owner': node.owner,
+            'size': node.size if node.is_file else 0
+        }
     
     def _find_node(self, path):
-        if path == "/":
-            return self.root
-            
+        return self.resolve(path)
+    
+    def resolve(self, path):
+        """Находит узел по абсолютному или относительному пути (с LRU-кэшем)"""
         if path.startswith("/"):
-            current = self.root
-            path_parts = [p for p in path[1:].split("/") if p]
+            base = self.root
         else:
-            current = self.current_dir
-            path_parts = [p for p in path.split("/") if p]
+            base = self.current_dir
+        parts = [p for p in path.split("/") if p and p != "."]
+        
+        if ".." in parts:
+            # Пути с ".." не кэшируются - обходим как есть
+            return self._walk(base, parts)
             
-        for part in path_parts:
+        base_path = base.get_path()
+        if base_path == "/":
+            key = "/" + "/".join(parts)
+        else:
+            key = base_path + "/" + "/".join(parts) if parts else base_path
+            
+        node = self._path_cache.get(key)
+        if node is not None and node.get_path() == key:
+            self._path_cache.move_to_end(key)
+            return node
+            
+        node = self._walk(base, parts)
+        if node is not None:
+            self._path_cache[key] = node
+            if len(self._path_cache) > self.PATH_CACHE_SIZE:
+                self._path_cache.popitem(last=False)
+        return node
+    
+    def _walk(self, current, parts):
+        for part in parts:
             if part == "..":
                 if current.parent:
                     current = current.parent
-            elif part == ".":
-                continue
-            elif part and part in current.children:
-                current = current.children[part]
             else:
-                return None
+                current = current.children.get(part)
+                if current is None:
+                    return None
         return current
     
+    def move_node(self, node, dest_parent, dest_name):
+        self._record(("move", node, node.parent, node.name))
+        old_name = node.name
+        source = node.get_path() if self.journal is not None else None
+        node.parent.remove_child(node.name)
+        node.name = dest_name
+        dest_parent.add_child(node)
+        if self._index is not None:
+            self._index.rename(node, old_name)
+        self.invalidate_path_cache()
+        if self.journal is not None:
+            self.journal.append("mv", source, node.get_path())
+        
+    def remove_node(self, node):
+        """Удаляет узел вместе с поддеревом"""
+        parent = node.parent
+        if parent is None:
+            raise ValueError("Cannot remove root directory")
+        path = node.get_path()
+        
+        # Текущий каталог внутри удаляемого поддерева переходит к родителю
+        current = self.current_dir
+        while current is not None and current is not node:
+            current = current.parent
+        if current is node:
+            self.current_dir = parent
+            
+        self._record(("remove", node, parent))
+        parent.remove_child(node.name)
+        if self._index is not None:
+            self._index.remove_subtree(node)
+        self.invalidate_path_cache()
+        if self.journal is not None:
+            self.journal.append("rm", path)
+        
+    def split_path(self, path):
+        """Родительский каталог и имя последнего компонента пути"""
+        parent_path, sep, name = path.rstrip("/").rpartition("/")
+        if not sep:
+            return self.current_dir, name
+        return self._find_node(parent_path or "/"), name
+        
+    def write_file(self, path, text, append=False):
+        node = self._find_node(path)
+        if node is None:
+            parent, name = self.split_path(path)
+            if not parent or parent.is_file or not name or name in ("..", "."):
+                raise ValueError(f"Cannot create file: {path}")
+            node = VFSNode(name, is_file=True)
+            parent.add_child(node)
+            self._record(("create", node))
+            if self._index is not None:
+                self._index.add(node)
+        elif not node.is_file:
+            raise ValueError(f"Is a directory: {path}")
+        else:
+            # Старое содержимое сохраняется как есть, без декодирования ContentRef
+            self._record(("content", node, node._content))
+            
+        # text - строка (пишется в UTF-8) или bytes
+        written = text.encode('utf-8') if isinstance(text, str) else bytes(text)
+        node.content = node.data + written if append else written
+        if self.journal is not None:
+            self.journal.append("write", node.get_path(), base64.b64encode(written).decode('ascii'), append)
+        return node
+        
+    def set_owner(self, node, owner, recursive=False):
+        """Меняет владельца узла, с recursive - всего поддерева за один проход.
+
+        Возвращает число узлов, у которых владелец изменился.
+        """
+        owner = sys.intern(owner)
+        if not recursive:
+            self._record(("owner", node, node.owner))
+            old_owner = node.owner
+            node.owner = owner
+            if self._index is not None:
+                self._index.change_owner(node, old_owner)
+            if self.journal is not None:
+                self.journal.append("chown", node.get_path(), owner)
+            return 1
+            
+        index = self._index
+        changed = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            stack.extend(current.children.values())
+            old_owner = current.owner
+            if old_owner == owner:
+                continue
+            current.owner = owner
+            changed.append((current, old_owner))
+            if index is not None:
+                index.change_owner(current, old_owner)
+        # Одна запись отмены и одна запись журнала на все поддерево
+        self._record(("owners", node, changed))
+        if self.journal is not None:
+            self.journal.append("chown", node.get_path(), owner, True)
+        return len(changed)
+        
+    def copy_node(self, node, dest_parent, dest_name):
+        """Копирует узел с поддеревом в dest_parent под именем dest_name.
+
+        Копии делят содержимое файлов с оригиналом; агрегаты копии считаются
+        одним проходом, а к предкам dest_parent добавляются один раз.
+        """
+        source = node.get_path() if self.journal is not None else None
+        # Прямой обход: индекс родителя меньше индекса потомка
+        copies = []
+        stack = [(node, -1)]
+        while stack:
+            current, parent = stack.pop()
+            copies.append((VFSNode(current.name, is_file=current.is_file, content=current._content,
+                                   owner=current.owner, permissions=current.permissions), parent))
+            position = len(copies) - 1
+            stack.extend((child, position) for child in current.children.values())
+            
+        # С конца: узел подвешивается к родителю, который сам еще не подвешен
+        for copy, parent in reversed(copies[1:]):
+            copies[parent][0].add_child(copy)
+        root = copies[0][0]
+        root.name = dest_name
+        dest_parent.add_child(root)
+        
+        self._record(("create", root))
+        if self._index is not None:
+            self._index.add_subtree(root)
+        self.invalidate_path_cache()
+        if self.journal is not None:
+            self.journal.append("cp", source, root.get_path())
+        return root
+        
+    def glob(self, pattern):
+        """Пути, подходящие под шаблон * ? [...] (как в shell), в порядке имен.
+
+        Относительный шаблон дает относительные пути; скрытые имена
+        подходят, только если компонент шаблона начинается с точки.
+        """
+        absolute = pattern.startswith("/")
+        parts = [part for part in pattern.split("/") if part]
+        matches = [(self.root if absolute else self.current_dir, "/" if absolute else "")]
+        for part in parts:
+            literal = not any(char in part for char in "*?[")
+            next_matches = []
+            for node, path in matches:
+                if node.is_file:
+                    continue
+                prefix = path if not path or path.endswith("/") else path + "/"
+                if part in (".", ".."):
+                    target = node if part == "." else (node.parent or node)
+                    next_matches.append((target, prefix + part))
+                elif literal:
+                    child = node.children.get(part)
+                    if child is not None:
+                        next_matches.append((child, prefix + part))
+                else:
+                    hidden = part.startswith(".")
+                    for name in node.sorted_names():
+                        if (hidden or not name.startswith(".")) and fnmatchcase(name, part):
+                            next_matches.append((node.children[name], prefix + name))
+            matches = next_matches
+        if pattern.endswith("/"):
+            return [path + "/" for node, path in matches if not node.is_file]
+        return [path for _, path in matches]
+        
+    def invalidate_path_cache(self):
+        self._path_cache.clear()
+        
+    def _record(self, entry):
+        if self._undo is not None:
+            self._undo.append(entry)
+            
+    def create_snapshot(self, name):
+        """Запоминает состояние дерева: O(1), дальше журналируются только изменения"""
+        if self._undo is None:
+            self._undo = []
+        self._snapshots[name] = (len(self._undo), self.current_dir)
+        
+    def rollback(self, name):
+        """Возвращает дерево к снапшоту name за O(изменений после него).
+
+        Снапшоты, созданные позже name, удаляются; сам name остается.
+        """
+        if name not in self._snapshots:
+            raise ValueError(f"Snapshot not found: {name}")
+        mark, current_dir = self._snapshots[name]
+        
+        undone = len(self._undo) - mark
+        compact = False
+        while len(self._undo) > mark:
+            # Отмену замены корня или удаления поддерева нельзя записать
+            # операциями журнала - тогда журнал сжимается в снапшот
+            compact = not self._undo_entry(self._undo.pop()) or compact
+            
+        self._snapshots = {key: value for key, value in self._snapshots.items() if value[0] <= mark}
+        self.current_dir = current_dir
+        self._path_cache.clear()
+        if compact and self.journal is not None:
+            self.journal.compact(self)
+        return undone
+        
+    def _undo_entry(self, entry):
+        """Применяет обратную операцию; False, если ее нельзя записать в журнал"""
+        kind, node = entry[0], entry[1]
+        index = self._index
+        if kind == "owner":
+            old_owner = node.owner
+            node.owner = entry[2]
+            if index is not None:
+                index.change_owner(node, old_owner)
+            if self.journal is not None:
+                self.journal.append("chown", node.get_path(), node.owner)
+        elif kind == "owners":
+            for current, old_owner in reversed(entry[2]):
+                owner = current.owner
+                current.owner = old_owner
+                if index is not None:
+                    index.change_owner(current, owner)
+                if self.journal is not None:
+                    self.journal.append("chown", current.get_path(), old_owner)
+        elif kind == "content":
+            node.content = entry[2]
+            if self.journal is not None:
+                self.journal.append("write", node.get_path(), base64.b64encode(node.data).decode('ascii'), False)
+        elif kind == "create":
+            path = node.get_path()
+            node.parent.remove_child(node.name)
+            if index is not None:
+                index.remove_subtree(node)
+            if self.journal is not None:
+                self.journal.append("rm", path)
+        elif kind == "move":
+            old_name = node.name
+            source = node.get_path()
+            node.parent.remove_child(node.name)
+            node.name = entry[3]
+            entry[2].add_child(node)
+            if index is not None:
+                index.rename(node, old_name)
+            if self.journal is not None:
+                self.journal.append("mv", source, node.get_path())
+        elif kind == "remove":
+            entry[2].add_child(node)
+            if index is not None:
+                index.add_subtree(node)
+            return False
+        elif kind == "root":
+            self.root = node
+            self.current_dir = entry[2]
+            self._index = None
+            return False
+        return True
+            
+    def delete_snapshot(self, name):
+        if self._snapshots.pop(name, None) is None:
+            raise ValueError(f"Snapshot not found: {name}")
+        if not self._snapshots:
+            # Снапшотов не осталось - журнал больше не нужен
+            self._undo = None
+        
+    def list_snapshots(self):
+        """Пары (имя, число изменений после снапшота) в порядке создания"""
+        total = len(self._undo) if self._undo is not None else 0
+        return sorted(((name, total - mark) for name, (mark, _) in self._snapshots.items()),
+                      key=lambda item: -item[1])
+    
+    def get_index(self):
+        if self._index is None:
+            from index import NodeIndex
+            self._index = NodeIndex.build(self.root)
+        return self._index
+        
+    def find(self, start=None, name=None, owner=None, node_type=None, permissions=None):
+        """Узлы поддерева start, подходящие под все условия, в порядке обхода с сортировкой имен.
+
+        Условия по имени, владельцу и правам отвечаются по индексам без обхода
+        дерева; node_type - "f" или "d".
+        """
+        if start is None:
+            start = self.current_dir
+        want_file = None if node_type is None else node_type == "f"
+        
+        candidates = self.get_index().candidates(name, owner, permissions)
+        if candidates is None or (not start.is_file and
+                                  start.file_count + start.dir_count < len(candidates)):
+            # Без индексируемых условий (или если поддерево меньше множества
+            # кандидатов) дешевле обойти поддерево
+            return (node for node in self._walk_subtree(start)
+                    if (want_file is None or node.is_file == want_file)
+                    and (candidates is None or node in candidates))
+            
+        matches = []
+        for node in candidates:
+            if want_file is not None and node.is_file != want_file:
+                continue
+            if start is not self.root:
+                ancestor = node
+                while ancestor is not None and ancestor is not start:
+                    ancestor = ancestor.parent
+                if ancestor is None:
+                    continue
+            matches.append(node)
+        # Сортировка по компонентам пути совпадает с порядком обхода
+        matches.sort(key=lambda node: node.get_path().split("/"))
+        return matches
+        
+    def _walk_subtree(self, start):
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            yield node
+            if not node.is_file:
+                stack.extend(reversed(list(self.iter_children(node))))
+                
     def calculate_size(self, node=None):
         if node is None:
             node = self.current_dir
+        return node.size
+    
+    def compute_aggregates(self, node=None):
+        """Итеративно пересчитывает (размер, файлы, директории) поддерева без кэша"""
+        if node is None:
+            node = self.current_dir
+        if node.is_file:
+            return node.content_length(), 0, 0
             
+        size = files = dirs = 0
+        stack = list(node.children.values())
+        while stack:
+            current = stack.pop()
+            if current.is_file:
+                size += current.content_length()
+                files += 1
+            else:
+                dirs += 1
+                stack.extend(current.children.values())
+        return size, files, dirs
+    
+    def verify_aggregates(self, node=None):
+        """Сверяет кэшированные агрегаты с полным обходом поддерева"""
+        if node is None:
+            node = self.current_dir
+        expected = self.compute_aggregates(node)
         if node.is_file:
-            return len(node.content)
-        else:
-            total = 0
-            for child in node.children.values():
-                total += self.calculate_size(child)
-            return total
-        
\ No newline at end of file
+            return (node.size, 0, 0) == expected
+        return (node.size, node.file_count, node.dir_count) == expected